@@ -0,0 +1,41 @@
+"""Benchmark of appending data to a Darr array in chunks of different
+sizes, with `iterappend` and with a buffered `Appender`.
+
+Run as::
+
+    python benchmarks/bench_appender.py
+
+"""
+import time
+
+import numpy as np
+
+import darr
+from darr.utils import tempdirfile
+
+
+def bench_append(chunklen, nrows=200000, rowshape=(8,), dtype='float64'):
+    chunk = np.ones((chunklen,) + rowshape, dtype=dtype)
+    nchunks = max(nrows // chunklen, 1)
+    results = {}
+    with tempdirfile() as path:
+        a = darr.create_array(path, shape=(0,) + rowshape, dtype=dtype)
+        t0 = time.perf_counter()
+        a.iterappend(chunk for _ in range(nchunks))
+        results['iterappend'] = time.perf_counter() - t0
+        a = darr.create_array(path, shape=(0,) + rowshape, dtype=dtype,
+                              overwrite=True)
+        t0 = time.perf_counter()
+        with a.appender() as ap:
+            for _ in range(nchunks):
+                ap.write(chunk)
+        results['appender'] = time.perf_counter() - t0
+    mb = nchunks * chunk.nbytes / 1e6
+    return {method: mb / t for method, t in results.items()}
+
+
+if __name__ == '__main__':
+    for chunklen in (1, 100, 100000):
+        results = bench_append(chunklen)
+        print(f'chunklen {chunklen:>6}: ' + ', '.join(
+            f'{method} {mbs:8.1f} MB/s' for method, mbs in results.items()))
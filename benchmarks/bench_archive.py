@@ -0,0 +1,55 @@
+"""Benchmark of archiving a Darr array as one compressed stream (default)
+and in blocks that are compressed in parallel (`workers=`), and of
+extracting these archives sequentially and in parallel.
+
+Run as::
+
+    python benchmarks/bench_archive.py
+
+"""
+import os
+import timeit
+
+import numpy as np
+
+import darr
+from darr.utils import tempdir
+
+
+def bench_archive(size=16_000_000, compressiontype='gz', workers=None):
+    if workers is None:
+        workers = os.cpu_count()
+    results = {}
+    with tempdir() as dirname:
+        rng = np.random.default_rng(0)
+        # compressible but not trivial values
+        values = rng.integers(0, 1000, size=size, dtype='int32')
+        a = darr.asarray(os.path.join(dirname, 'a.darr'), values)
+        for label, w in (('serial', None), (f'workers={workers}', workers)):
+            archivepath = os.path.join(dirname, f'{label}.tar.'
+                                                f'{compressiontype}')
+
+            def archive():
+                a.archive(archivepath, compressiontype=compressiontype,
+                          workers=w, overwrite=True)
+
+            results[f'archive {label}'] = min(timeit.repeat(archive,
+                                                            number=1,
+                                                            repeat=3))
+            extractpath = os.path.join(dirname, f'extracted_{label}')
+
+            def extract():
+                darr.extract_archive(archivepath, path=extractpath,
+                                     workers=w, overwrite=True)
+
+            results[f'extract {label}'] = min(timeit.repeat(extract,
+                                                            number=1,
+                                                            repeat=3))
+    return results
+
+
+if __name__ == '__main__':
+    for compressiontype in ('gz', 'xz'):
+        print(f'{compressiontype}:')
+        for label, t in bench_archive(compressiontype=compressiontype).items():
+            print(f'  {label:20}: {t:6.3f} s')
@@ -0,0 +1,57 @@
+"""Benchmark of the time that importing Darr takes.
+
+Darr is imported in new Python processes with `python -X importtime`, and
+the cumulative import time of darr, of numpy (which darr imports), and of
+darr excluding numpy are reported. Which rarely used modules are not
+imported by `import darr` is tested in darr/tests/test_importtime.py;
+import times are only benchmarked, as they depend on the machine.
+
+Run as::
+
+    python benchmarks/bench_importtime.py
+
+"""
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+import darr
+
+
+def _importtimes(stderr):
+    """Parses the output of 'python -X importtime' into a dictionary with
+    the cumulative import times of modules, in seconds."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def bench_importtime(repeat=5):
+    env = dict(os.environ)
+    # the darr that is imported here, also when run from a source tree
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(Path(darr.__file__).parent.parent)] +
+        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    results = []
+    for _ in range(repeat):
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import darr'],
+            env=env, capture_output=True, text=True, check=True).stderr
+        times = _importtimes(stderr)
+        results.append((times['darr'], times.get('numpy', 0.)))
+    return min(results)
+
+
+if __name__ == '__main__':
+    tdarr, tnumpy = bench_importtime()
+    print(f"{'import':20} {'ms':>9}")
+    print(f"{'darr':20} {tdarr * 1e3:9.1f}")
+    print(f"{'numpy':20} {tnumpy * 1e3:9.1f}")
+    print(f"{'darr without numpy':20} {(tdarr - tnumpy) * 1e3:9.1f}")
@@ -0,0 +1,39 @@
+"""Benchmark of reading a Darr array once, chunk by chunk, with copied
+chunks (default), read-only views (`copy=False`) and a reusable output
+buffer (`out=`).
+
+Run as::
+
+    python benchmarks/bench_iterchunks.py
+
+"""
+import timeit
+
+import numpy as np
+
+import darr
+from darr.utils import tempdirfile
+
+
+def bench_iterchunks(shape=(4000000, 8), chunklen=65536):
+    results = {}
+    with tempdirfile() as path:
+        a = darr.create_array(path, shape=shape, fill=1., overwrite=True)
+        out = np.empty((chunklen,) + shape[1:], dtype=a.dtype)
+        variants = {'copy=True': {},
+                    'copy=False': {'copy': False},
+                    'out=buffer': {'out': out}}
+        for label, kwargs in variants.items():
+
+            def readall():
+                for chunk in a.iterchunks(chunklen=chunklen, **kwargs):
+                    chunk.sum()
+
+            results[label] = min(timeit.repeat(readall, number=1, repeat=3))
+    return results
+
+
+if __name__ == '__main__':
+    nbytes = 4000000 * 8 * 8
+    for label, t in bench_iterchunks().items():
+        print(f'{label:10}: {t:6.3f} s ({nbytes / t / 1e9:5.2f} GB/s)')
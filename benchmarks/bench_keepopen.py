@@ -0,0 +1,40 @@
+"""Micro-benchmark of random single-row read access to a Darr array, with
+and without keeping the data file open (`keepopen` parameter of `Array`).
+
+Run as::
+
+    python benchmarks/bench_keepopen.py
+
+"""
+import timeit
+
+import numpy as np
+
+import darr
+from darr.utils import tempdirfile
+
+
+def bench_randomlookup(nlookups=10000, shape=(100000, 8), dtype='float64'):
+    rng = np.random.default_rng(0)
+    indices = rng.integers(0, shape[0], size=nlookups)
+    results = {}
+    with tempdirfile() as path:
+        darr.create_array(path, shape=shape, dtype=dtype, overwrite=True)
+        for keepopen in (False, True):
+            a = darr.Array(path, keepopen=keepopen)
+
+            def lookup():
+                for i in indices:
+                    a[i]
+
+            t = min(timeit.repeat(lookup, number=1, repeat=3))
+            a.close()
+            results[keepopen] = t / nlookups
+    return results
+
+
+if __name__ == '__main__':
+    results = bench_randomlookup()
+    for keepopen, t in results.items():
+        print(f'keepopen={keepopen!s:5}: {t * 1e6:8.2f} us per lookup')
+    print(f'speedup: {results[False] / results[True]:.1f}x')
@@ -0,0 +1,75 @@
+"""Benchmark of the overhead of the inter-process locks that Darr holds while
+changing arrays, when there is no contention for them.
+
+Every change to an array acquires and releases an exclusive lock on its lock
+file, and checks whether other processes changed the array in the meantime.
+The benchmark times small appends and writing single values to an array that
+is kept open, which are the operations where the overhead is relatively
+largest, with locking and with locking disabled, and reports the
+difference.
+
+Run as::
+
+    python benchmarks/bench_locking.py
+
+"""
+import timeit
+
+import darr
+from darr.filelock import FileLock
+from darr.utils import tempdirfile
+
+
+class NoLock(FileLock):
+    """Lock that does nothing, to time operations without locking."""
+
+    def acquire(self, shared=False, blocking=True):
+        return False
+
+    def release(self):
+        pass
+
+    def increment_generation(self):
+        return None
+
+
+def bench_locking(n=2000):
+    results = {}
+    with tempdirfile() as path:
+        a = darr.create_array(path, shape=(1000, 4), dtype='float64',
+                              accessmode='r+', overwrite=True)
+        a2 = darr.Array(path, accessmode='r+', keepopen=True)
+        row = [[1., 2., 3., 4.]]
+
+        def append():
+            for i in range(n):
+                a.append(row)
+
+        def deferredappend():
+            with a.deferred_updates():
+                for i in range(n):
+                    a.append(row)
+
+        def setitem():
+            for i in range(n):
+                a2[i % 1000] = row[0]
+
+        operations = {'append': (a, append),
+                      'deferred append': (a, deferredappend),
+                      'setitem (keepopen)': (a2, setitem)}
+        for label, (array, operation) in operations.items():
+            lock = array._lock
+            t = min(timeit.repeat(operation, number=1, repeat=5)) / n
+            array._lock = NoLock(lock.path)
+            tnolock = min(timeit.repeat(operation, number=1, repeat=5)) / n
+            array._lock = lock
+            results[label] = (t, tnolock)
+        a2.close()
+    return results
+
+
+if __name__ == '__main__':
+    print(f"{'operation':20} {'µs/op':>9} {'no lock':>9} {'overhead':>9}")
+    for label, (t, tnolock) in bench_locking().items():
+        print(f'{label:20} {t * 1e6:9.1f} {tnolock * 1e6:9.1f} '
+              f'{(t - tnolock) / t:9.1%}')
@@ -0,0 +1,41 @@
+"""Benchmark of a chunked out-of-core transform of a Darr array, comparing
+a sequential `iterchunks` loop with `map_chunks` using several workers.
+
+Run as::
+
+    python benchmarks/bench_mapchunks.py
+
+"""
+import time
+
+import numpy as np
+
+import darr
+from darr.utils import tempdirfile
+
+
+def transform(chunk):
+    return np.sqrt(np.abs(np.sin(chunk) * np.cos(chunk)))
+
+
+def bench_mapchunks(shape=(2000000, 16), chunklen=50000,
+                    workers=(1, 2, 4)):
+    results = {}
+    with tempdirfile() as path, tempdirfile() as outpath:
+        a = darr.create_array(path, shape=shape, fill=1.5, overwrite=True)
+        t0 = time.perf_counter()
+        darr.asarray(outpath, (transform(c) for c in
+                               a.iterchunks(chunklen=chunklen)),
+                     overwrite=True)
+        results['iterchunks'] = time.perf_counter() - t0
+        for n in workers:
+            t0 = time.perf_counter()
+            a.map_chunks(transform, chunklen=chunklen, workers=n,
+                         out=outpath, overwrite=True)
+            results[f'map_chunks workers={n}'] = time.perf_counter() - t0
+    return results
+
+
+if __name__ == '__main__':
+    for label, t in bench_mapchunks().items():
+        print(f'{label:22}: {t:6.2f} s')
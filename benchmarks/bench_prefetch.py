@@ -0,0 +1,57 @@
+"""Benchmark of reading a Darr array chunk by chunk from a cold page cache,
+while processing each chunk, with and without prefetching (`prefetch=`).
+Processing is simulated by sleeping, so that it overlaps with reading when
+chunks are prefetched.
+
+The data file is evicted from the page cache before each run, by advising
+the operating system that it is not needed (`posix_fadvise`). Where this
+is not supported, the file is read from a warm cache and the benchmark
+shows less difference.
+
+Run as::
+
+    python benchmarks/bench_prefetch.py
+
+"""
+import os
+import time
+import timeit
+
+import darr
+from darr.utils import tempdirfile
+
+
+def evict(path):
+    """Drop the pages of a file from the page cache, if possible."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def bench_prefetch(shape=(4000000, 8), chunklen=65536, processtime=0.005):
+    results = {}
+    with tempdirfile() as path:
+        a = darr.create_array(path, shape=shape, fill=1., overwrite=True)
+        datapath = a.path / 'arrayvalues.bin'
+        variants = {'prefetch=None': {},
+                    'prefetch=2': {'prefetch': 2},
+                    'copy=False': {'copy': False},
+                    'copy=False prefetch=2': {'copy': False, 'prefetch': 2}}
+        for label, kwargs in variants.items():
+
+            def readall():
+                for chunk in a.iterchunks(chunklen=chunklen, **kwargs):
+                    chunk.sum()
+                    time.sleep(processtime)
+
+            results[label] = min(timeit.repeat(readall,
+                                               setup=lambda: evict(datapath),
+                                               number=1, repeat=3))
+    return results
+
+
+if __name__ == '__main__':
+    for label, t in bench_prefetch().items():
+        print(f'{label:22}: {t:6.3f} s')
@@ -0,0 +1,316 @@
+"""Benchmark suite of the I/O hot paths of Darr.
+
+Each benchmark is timed a number of times, and the minimum and median times
+are stored in a JSON file, together with the versions of Darr, NumPy and
+Python, so that results of different releases or machines can be compared.
+Only the standard library and Darr's own dependencies are needed.
+
+Run as::
+
+    python benchmarks/suite.py
+
+Options:
+
+    --output FILE       JSON file to write results to. Default is
+                        benchmarks/results/<darr version>.json.
+    --dir DIR           Directory in which to create test data, to benchmark
+                        a specific disk. Default is the system temporary
+                        directory.
+    --scale FACTOR      Multiply data sizes by this factor. Default is 1.
+    --repeat N          Number of times each benchmark is run. Default is 5.
+    --filter TEXT       Only run benchmarks whose name contains TEXT.
+
+To compare two result files, which reports benchmarks that became slower
+than a threshold ratio (default 1.2) and exits with status 1 if there are
+any::
+
+    python benchmarks/suite.py --compare old.json new.json [--threshold R]
+
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+
+from pathlib import Path
+
+import numpy as np
+
+import darr
+from darr.utils import tempdir
+
+# name: benchmark generator function
+benchmarks = {}
+
+
+def benchmark(func):
+    """Register a benchmark.
+
+    A benchmark is a generator function that is called with a directory for
+    test data and a scale factor. It performs its setup and then yields
+    tuples of a case name and a function to time, or of a case name, a
+    function to time and a function that is called, untimed, before each
+    run. The benchmark's full name is its function name followed by the case
+    name.
+
+    """
+    benchmarks[func.__name__] = func
+    return func
+
+
+def _values(nrows, ncols=8, seed=0):
+    return np.random.default_rng(seed).random((nrows, ncols))
+
+
+@benchmark
+def asarray(dirname, scale):
+    values = _values(int(1_000_000 * scale))
+    path = dirname / 'a.darr'
+    yield 'ndarray', lambda: darr.asarray(path, values, overwrite=True)
+    chunks = np.array_split(values, 100)
+    yield 'generator', lambda: darr.asarray(path, (c for c in chunks),
+                                            overwrite=True)
+    small = _values(10)
+    counter = iter(range(10 ** 9))
+
+    def manysmall():
+        for _ in range(100):
+            darr.asarray(dirname / f's{next(counter)}.darr', small)
+
+    yield '100small', manysmall
+
+
+@benchmark
+def create_array(dirname, scale):
+    shape = (int(1_000_000 * scale), 8)
+    path = dirname / 'a.darr'
+    yield 'zeros', lambda: darr.create_array(path, shape=shape,
+                                             overwrite=True)
+    yield 'fill', lambda: darr.create_array(path, shape=shape, fill=1.,
+                                            overwrite=True)
+
+
+@benchmark
+def getitem(dirname, scale):
+    nrows = int(1_000_000 * scale)
+    darr.asarray(dirname / 'a.darr', _values(nrows))
+    indices = np.random.default_rng(0).integers(0, nrows, size=1000)
+    for keepopen in (False, True):
+        a = darr.Array(dirname / 'a.darr', keepopen=keepopen)
+
+        def random(a=a):
+            for i in indices:
+                a[i]
+
+        def sequential(a=a):
+            for start in range(0, nrows, 10_000):
+                a[start:start + 10_000]
+
+        yield f'random_keepopen{keepopen}', random
+        yield f'sequential_keepopen{keepopen}', sequential
+
+
+@benchmark
+def iterchunks(dirname, scale):
+    a = darr.asarray(dirname / 'a.darr', _values(int(1_000_000 * scale)))
+    for copy in (True, False):
+
+        def readall(copy=copy):
+            for chunk in a.iterchunks(chunklen=10_000, copy=copy):
+                pass
+
+        yield f'copy{copy}', readall
+
+
+@benchmark
+def append(dirname, scale):
+    nrows = int(100_000 * scale)
+    values = _values(nrows)
+    path = dirname / 'a.darr'
+
+    def setup():
+        darr.create_array(path, shape=(0, 8), overwrite=True)
+
+    for chunklen in (100, 1000, 10_000):
+        chunks = np.array_split(values, max(1, nrows // chunklen))
+
+        def appendchunks(chunks=chunks):
+            a = darr.Array(path, accessmode='r+')
+            for chunk in chunks:
+                a.append(chunk)
+
+        def iterappendchunks(chunks=chunks):
+            a = darr.Array(path, accessmode='r+')
+            a.iterappend(chunks)
+
+        yield f'append_chunklen{chunklen}', appendchunks, setup
+        yield f'iterappend_chunklen{chunklen}', iterappendchunks, setup
+
+
+@benchmark
+def raggedarray(dirname, scale):
+    n = int(10_000 * scale)
+    rng = np.random.default_rng(0)
+    subarrays = [np.arange(l) for l in rng.integers(0, 100, size=n)]
+    path = dirname / 'r.darr'
+
+    def setup():
+        darr.create_raggedarray(path, atom=(), dtype='int64',
+                                overwrite=True)
+
+    def appendloop():
+        ra = darr.RaggedArray(path, accessmode='r+')
+        for a in subarrays[:1000]:
+            ra.append(a)
+
+    def iterappend():
+        ra = darr.RaggedArray(path, accessmode='r+')
+        ra.iterappend(subarrays)
+
+    yield 'append1000', appendloop, setup
+    yield 'iterappend', iterappend, setup
+    ra = darr.asraggedarray(dirname / 'r2.darr', subarrays)
+    indices = rng.integers(0, n, size=1000)
+
+    def index():
+        for i in indices:
+            ra[i]
+
+    def iterate():
+        for a in ra:
+            pass
+
+    yield 'index1000', index
+    yield 'iterate', iterate
+
+
+@benchmark
+def copy(dirname, scale):
+    a = darr.asarray(dirname / 'a.darr', _values(int(1_000_000 * scale)))
+    yield 'samedtype', lambda: a.copy(dirname / 'b.darr', overwrite=True)
+    yield 'float32', lambda: a.copy(dirname / 'b.darr', dtype='float32',
+                                    overwrite=True)
+
+
+@benchmark
+def truncate_array(dirname, scale):
+    nrows = int(1_000_000 * scale)
+    values = _values(nrows)
+    path = dirname / 'a.darr'
+
+    def setup():
+        darr.asarray(path, values, overwrite=True)
+
+    yield 'half', lambda: darr.truncate_array(darr.Array(path, 'r+'),
+                                              nrows // 2), setup
+
+
+@benchmark
+def archive(dirname, scale):
+    # compressible values
+    values = np.random.default_rng(0).integers(
+        0, 100, size=(int(500_000 * scale), 8)).astype('int32')
+    a = darr.asarray(dirname / 'a.darr', values)
+    for compressiontype in ('gz', 'xz'):
+        filepath = dirname / f'a.tar.{compressiontype}'
+        yield compressiontype, lambda c=compressiontype, f=filepath: \
+            a.archive(f, compressiontype=c, overwrite=True)
+
+
+@benchmark
+def checksums(dirname, scale):
+    a = darr.asarray(dirname / 'a.darr', _values(int(1_000_000 * scale)),
+                     accessmode='r+')
+    yield 'sha256checksums', lambda: a.datadir.sha256checksums()
+    a.update_checksums()
+    yield 'verify_checksums', lambda: a.verify_checksums()
+
+
+def timebenchmark(func, setup=None, repeat=5):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run(dirname=None, scale=1., repeat=5, filter=None, report=print):
+    results = {}
+    for name, func in benchmarks.items():
+        with tempdir(dirname=dirname) as benchdir:
+            for case in func(Path(benchdir), scale):
+                casename, timedfunc, setup = (case + (None,))[:3]
+                fullname = f'{name}.{casename}'
+                if (filter is not None) and (filter not in fullname):
+                    continue
+                times = timebenchmark(timedfunc, setup=setup, repeat=repeat)
+                results[fullname] = {'min': min(times),
+                                     'median': statistics.median(times),
+                                     'repeat': repeat}
+                report(f'{fullname:45} {min(times):9.4f} s')
+    return {'darr': darr.__version__,
+            'numpy': np.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'scale': scale,
+            'results': results}
+
+
+def compare(oldpath, newpath, threshold=1.2, report=print):
+    """Compare minimum times of two result files and return the names of
+    benchmarks that became slower by more than `threshold` times."""
+    with open(oldpath) as f:
+        old = json.load(f)
+    with open(newpath) as f:
+        new = json.load(f)
+    report(f"{'benchmark':45} {old['darr'][:12]:>12} {new['darr'][:12]:>12} "
+           f"{'ratio':>7}")
+    regressions = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        told = old['results'][name]['min']
+        tnew = new['results'][name]['min']
+        ratio = tnew / told
+        flag = ''
+        if ratio > threshold:
+            regressions.append(name)
+            flag = '  slower'
+        report(f'{name:45} {told:12.4f} {tnew:12.4f} {ratio:7.2f}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark suite of Darr I/O hot paths.')
+    parser.add_argument('--output')
+    parser.add_argument('--dir')
+    parser.add_argument('--scale', type=float, default=1.)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+    if args.compare is not None:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        return 1 if regressions else 0
+    results = run(dirname=args.dir, scale=args.scale, repeat=args.repeat,
+                  filter=args.filter)
+    output = args.output
+    if output is None:
+        output = Path(__file__).parent / 'results' / f"{results['darr']}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+    print(f'results written to {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,34 @@
 from .array import *
 from .raggedarray import *
 from .datadir import DataDir, create_datadir
-from .tests import test
+from . import stats
+from .utils import darrversion
+
+# rarely used parts, which are only imported when first accessed, to keep
+# importing darr fast (name: module)
+_lazyattributes = {'extract_archive': 'archive',
+                   'test': 'tests'}
+_lazysubmodules = ('aio',)
+
+
+def __getattr__(name):
+    if name == '__version__':
+        return darrversion()
+    if name in _lazyattributes:
+        import importlib
+        module = importlib.import_module(f'.{_lazyattributes[name]}',
+                                         __name__)
+        return getattr(module, name)
+    if name in _lazysubmodules:
+        import importlib
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazyattributes) +
+                  list(_lazysubmodules) + ['__version__'])
 
-from . import _version
-__version__ = _version.get_versions()['version']
 
 def open(path, accessmode='r'):
     dd = DataDir(path)
@@ -15,5 +39,4 @@ def open(path, accessmode='r'):
         return RaggedArray(path=path, accessmode=accessmode)
     else:
         raise ValueError(f"'{arraytype}' not supported in this version of "
-                         f"Darr ({__version__}) ")
-
+                         f"Darr ({darrversion()}) ")
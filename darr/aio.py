@@ -0,0 +1,397 @@
+"""Asyncio interface to Darr arrays.
+
+Reading and writing Darr arrays involves blocking disk I/O. The classes in
+this module wrap arrays so that these operations are run in an executor
+(by default the event loop's default executor, which has a bounded number
+of worker threads), and can be awaited without blocking the event loop.
+This way, many arrays can be read from and written to concurrently by one
+process.
+
+Operations on the same array are performed one at a time, in the order in
+which they were requested. Operations on different arrays run concurrently.
+
+Examples
+--------
+>>> import asyncio
+>>> import darr.aio
+>>> async def main():
+...     a = await darr.aio.asarray('test.darr', range(10), accessmode='r+',
+...                                overwrite=True)
+...     await a.append([10, 11])
+...     print(await a.read(slice(8, None)))
+...     async for chunk in a.iterchunks(chunklen=5, prefetch=2):
+...         print(chunk)
+>>> asyncio.run(main())
+[ 8  9 10 11]
+[0 1 2 3 4]
+[5 6 7 8 9]
+[10 11]
+
+"""
+import asyncio
+
+from collections import deque
+from functools import partial
+
+from .array import Array, asarray as _asarray
+from .raggedarray import RaggedArray, asraggedarray as _asraggedarray
+
+__all__ = ['AsyncArray', 'AsyncRaggedArray', 'asarray', 'asraggedarray',
+           'open_array', 'open_raggedarray']
+
+
+async def _runinexecutor(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor,
+                                      partial(func, *args, **kwargs))
+
+
+class _AsyncBase:
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._lock = asyncio.Lock()
+
+    async def _run(self, func, *args, **kwargs):
+        """Private method to run a blocking operation on the array in the
+        executor, after previously requested operations have finished."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor,
+                                          partial(func, *args, **kwargs))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # the operation cannot be interrupted; the next one may only
+                # start when it is done
+                await asyncio.wait([future])
+                raise
+
+    async def _prefetched(self, func, argslist, prefetch):
+        """Private async generator that yields the results of `func` called
+        with each of the argument tuples in `argslist`, while the next
+        `prefetch` results are already being read."""
+        pending = deque()
+        try:
+            for args in argslist:
+                pending.append(asyncio.ensure_future(self._run(func, *args)))
+                if len(pending) > prefetch:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class AsyncArray(_AsyncBase):
+    """Asyncio interface to a Darr array.
+
+    Within a coroutine, use `open_array` to open an array from a path, which
+    does not block the event loop while the array is opened. When used as an
+    async context manager, the array is closed on exit, unless it was
+    provided as a Darr array object.
+
+    Parameters
+    ----------
+    array: str, pathlib.Path or darr.Array
+        Path to a Darr array, or a Darr array object.
+    accessmode: {'r', 'r+'}, default 'r'
+        File access mode of the data, if `array` is a path. `r` means
+        read-only, `r+` means read-write.
+    executor: <concurrent.futures.Executor, None>
+        Executor in which blocking operations are run. Default is None,
+        which means the default executor of the event loop.
+
+    """
+
+    def __init__(self, array, accessmode='r', executor=None):
+        super().__init__(executor=executor)
+        # arrays that are provided are left open for their owner
+        self._ownsarray = not isinstance(array, Array)
+        if self._ownsarray:
+            # keep the data file open, as arrays are typically accessed many
+            # times; 'close' closes it
+            array = Array(array, accessmode=accessmode, keepopen=True)
+        self._array = array
+
+    @property
+    def array(self):
+        """The underlying Darr array. Do not use it concurrently with
+        operations of the async array."""
+        return self._array
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+    @property
+    def shape(self):
+        return self._array.shape
+
+    @property
+    def path(self):
+        return self._array.path
+
+    def __len__(self):
+        return len(self._array)
+
+    def __repr__(self):
+        return f'AsyncArray at "{self._array.path}"'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        if self._ownsarray:
+            await self.close()
+
+    async def read(self, index=slice(None)):
+        """Read values from the array.
+
+        Parameters
+        ----------
+        index: index, default slice(None)
+            Any index that can be used with Darr arrays. Default is all
+            values.
+
+        Returns
+        -------
+        numpy array
+
+        """
+        return await self._run(self._array.__getitem__, index)
+
+    async def write(self, index, value):
+        """Write values to the array at `index`."""
+        await self._run(self._array.__setitem__, index, value)
+
+    async def append(self, array):
+        """Append an array-like object to the array, along the first axis.
+
+        Parameters
+        ----------
+        array: array-like object
+
+        """
+        await self._run(self._array.append, array)
+
+    async def iterappend(self, arrayiterable):
+        """Append data from an iterable or an async iterable that yields
+        array-like objects.
+
+        The array description and README.txt files are only updated at the
+        end (see `darr.Array.deferred_updates`).
+
+        """
+        if not hasattr(arrayiterable, '__aiter__'):
+            await self._run(self._array.iterappend, arrayiterable)
+            return
+        deferred = self._array.deferred_updates()
+        await self._run(deferred.__enter__)
+        try:
+            async for array in arrayiterable:
+                await self._run(self._array.iterappend, [array])
+        finally:
+            await self._run(deferred.__exit__, None, None, None)
+
+    async def iterchunks(self, chunklen, stepsize=None, startindex=None,
+                         endindex=None, include_remainder=True, prefetch=1):
+        """Async iterator over the array, yielding chunks of a given length
+        and with a given stepsize.
+
+        The next `prefetch` chunks are read in the background while the
+        current chunk is being processed.
+
+        Parameters
+        ----------
+        chunklen: int
+            Size of chunk for across the first axis.
+        stepsize: <int, None>
+            Size of the shift per iteration across the first axis. Default
+            is None, which means that `stepsize` equals `chunklen`.
+        startindex: <int, None>
+            Start index value. Default is None, which means to start at the
+            beginning.
+        endindex: <int, None>
+            End index value. Default is None, which means to end at the end.
+        include_remainder: <True, False>
+            Determines if the remainder at the end of the array, if it exist,
+            should be yielded or not. Default is True.
+        prefetch: int, default 1
+            Number of chunks to read ahead. Use 0 to only read a chunk when
+            it is requested.
+
+        """
+        if prefetch < 0:
+            raise ValueError(f"'prefetch' cannot be negative ({prefetch})")
+        indices = self._array.iterindices(chunklen, stepsize=stepsize,
+                                          startindex=startindex,
+                                          endindex=endindex,
+                                          include_remainder=include_remainder)
+        argslist = ((slice(start, end),) for start, end in indices)
+        async for chunk in self._prefetched(self._array.__getitem__,
+                                            argslist, prefetch):
+            yield chunk
+
+    async def close(self):
+        """Close the data file of the array, if it is kept open."""
+        await self._run(self._array.close)
+
+
+class AsyncRaggedArray(_AsyncBase):
+    """Asyncio interface to a Darr ragged array.
+
+    Within a coroutine, use `open_raggedarray` to open a ragged array from
+    a path, which does not block the event loop while it is opened.
+
+    Parameters
+    ----------
+    raggedarray: str, pathlib.Path or darr.RaggedArray
+        Path to a Darr ragged array, or a Darr ragged array object.
+    accessmode: {'r', 'r+'}, default 'r'
+        File access mode of the data, if `raggedarray` is a path. `r`
+        means read-only, `r+` means read-write.
+    executor: <concurrent.futures.Executor, None>
+        Executor in which blocking operations are run. Default is None,
+        which means the default executor of the event loop.
+
+    """
+
+    def __init__(self, raggedarray, accessmode='r', executor=None):
+        super().__init__(executor=executor)
+        if not isinstance(raggedarray, RaggedArray):
+            raggedarray = RaggedArray(raggedarray, accessmode=accessmode)
+        self._raggedarray = raggedarray
+
+    @property
+    def raggedarray(self):
+        """The underlying Darr ragged array. Do not use it concurrently with
+        operations of the async ragged array."""
+        return self._raggedarray
+
+    @property
+    def dtype(self):
+        return self._raggedarray.dtype
+
+    @property
+    def atom(self):
+        return self._raggedarray.atom
+
+    @property
+    def path(self):
+        return self._raggedarray.path
+
+    def __len__(self):
+        return len(self._raggedarray)
+
+    def __repr__(self):
+        return f'AsyncRaggedArray at "{self._raggedarray.path}"'
+
+    async def read(self, index):
+        """Read subarrays from the ragged array.
+
+        Parameters
+        ----------
+        index: int, slice, sequence of ints or boolean mask
+            An integer returns one subarray; other indices return a list of
+            subarrays.
+
+        """
+        return await self._run(self._raggedarray.__getitem__, index)
+
+    async def append(self, array):
+        """Append an array-like object to the ragged array as a new
+        subarray."""
+        await self._run(self._raggedarray.append, array)
+
+    async def iterappend(self, arrayiterable, batchlen=1024):
+        """Append subarrays from an iterable or an async iterable.
+
+        Subarrays from an async iterable are collected in batches of at most
+        `batchlen`, each of which is written in one go.
+
+        """
+        if not hasattr(arrayiterable, '__aiter__'):
+            await self._run(self._raggedarray.iterappend, arrayiterable,
+                            batchlen=batchlen)
+            return
+        batch = []
+        async for array in arrayiterable:
+            batch.append(array)
+            if len(batch) == batchlen:
+                await self._run(self._raggedarray.iterappend, batch,
+                                batchlen=batchlen)
+                batch = []
+        if batch:
+            await self._run(self._raggedarray.iterappend, batch,
+                            batchlen=batchlen)
+
+    async def iter_arrays(self, startindex=0, endindex=None, batchlen=1024,
+                          prefetch=1):
+        """Async iterator over the ragged array, yielding subarrays.
+
+        Subarrays are read in batches of `batchlen`. The next `prefetch`
+        batches are read in the background while the current one is being
+        processed.
+
+        Parameters
+        ----------
+        startindex: int, default 0
+            Start index value.
+        endindex: <int, None>
+            End index value. Default is None, which means to end at the end.
+        batchlen: int, default 1024
+            Number of subarrays that are read in one go.
+        prefetch: int, default 1
+            Number of batches to read ahead.
+
+        """
+        if prefetch < 0:
+            raise ValueError(f"'prefetch' cannot be negative ({prefetch})")
+        start, end, _ = slice(startindex, endindex).indices(
+            len(self._raggedarray))
+        argslist = ((slice(i, min(i + batchlen, end)),)
+                    for i in range(start, end, batchlen))
+        async for batch in self._prefetched(self._raggedarray.__getitem__,
+                                            argslist, prefetch):
+            for subarray in batch:
+                yield subarray
+
+
+async def open_array(path, accessmode='r', executor=None):
+    """Open a Darr array in an executor, and return it as an `AsyncArray`,
+    which closes it when used as an async context manager. See
+    `AsyncArray` for the parameters."""
+    a = await _runinexecutor(executor, Array, path, accessmode=accessmode,
+                             keepopen=True)
+    aa = AsyncArray(a, executor=executor)
+    aa._ownsarray = True
+    return aa
+
+
+async def open_raggedarray(path, accessmode='r', executor=None):
+    """Open a Darr ragged array in an executor, and return it as an
+    `AsyncRaggedArray`. See `AsyncRaggedArray` for the parameters."""
+    ra = await _runinexecutor(executor, RaggedArray, path,
+                              accessmode=accessmode)
+    return AsyncRaggedArray(ra, executor=executor)
+
+
+async def asarray(path, array, executor=None, **kwargs):
+    """Save an array or array generator as a Darr array, in an executor, and
+    return it as an `AsyncArray`. Takes the same keyword arguments as
+    `darr.asarray`."""
+    a = await _runinexecutor(executor, _asarray, path, array, **kwargs)
+    aa = AsyncArray(a, executor=executor)
+    aa._ownsarray = True
+    return aa
+
+
+async def asraggedarray(path, arrayiterable, executor=None, **kwargs):
+    """Save a sequence of arrays as a Darr ragged array, in an executor, and
+    return it as an `AsyncRaggedArray`. Takes the same keyword arguments as
+    `darr.asraggedarray`."""
+    ra = await _runinexecutor(executor, _asraggedarray, path, arrayiterable,
+                              **kwargs)
+    return AsyncRaggedArray(ra, executor=executor)
@@ -0,0 +1,342 @@
+"""This module implements parallel creation and extraction of archives of
+data directories.
+
+Compressing a tar archive in one stream is limited to a single processor
+core. Instead, the uncompressed tar stream is split into blocks of fixed
+size that are compressed independently by a pool of threads, and written
+one after the other. The codecs of the Python standard library release the
+GIL while (de)compressing, so that this uses multiple cores.
+
+The result is a standard compressed tar archive that can be read by common
+tools and by the `tarfile` library, because these formats allow for
+concatenated members (gzip) or streams (xz, bz2). To find the boundaries of
+the members for parallel extraction, each gzip member contains its size in
+an extra header field, in the way BGZF files do. The xz format itself
+contains the information needed to find its streams. Other archives are
+extracted sequentially.
+
+"""
+import bz2
+import lzma
+import os
+import struct
+import tarfile
+import zlib
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+__all__ = ['extract_archive']
+
+# default size of the uncompressed blocks of parallel archives
+defaultblocksize = 4 * 1024 ** 2
+
+# subfield identifier of gzip extra field that holds the member size
+_gzipsubfieldid = b'DA'
+
+
+def _gzipmember(data, level=9):
+    """Returns `data` compressed as a gzip member of which the header holds
+    the size of the member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    # header (10 bytes), XLEN (2), subfield (8), data, CRC32 and ISIZE (8)
+    membersize = 20 + len(deflated) + 8
+    header = struct.pack('<BBBBIBB', 0x1f, 0x8b, 8, 4, 0, 0, 255) + \
+        struct.pack('<H', 8) + _gzipsubfieldid + \
+        struct.pack('<HI', 4, membersize)
+    trailer = struct.pack('<II', zlib.crc32(data), len(data) & 0xffffffff)
+    return header + deflated + trailer
+
+
+# compressiontype: (compress block, decompress block)
+_codecs = {'gz': (_gzipmember,
+                  lambda data: zlib.decompress(data, wbits=31)),
+           'xz': (lzma.compress, lzma.decompress),
+           'bz2': (bz2.compress, bz2.decompress)}
+
+
+class _BlockCompressingWriter:
+    """File-like object that compresses what is written to it in blocks,
+    concurrently, and writes the compressed blocks to `fd` in order."""
+
+    def __init__(self, fd, compress, blocksize, workers):
+        self._fd = fd
+        self._compress = compress
+        self._blocksize = blocksize
+        self._maxinflight = 2 * workers
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+
+    def _submit(self, block):
+        if len(self._pending) == self._maxinflight:
+            self._fd.write(self._pending.popleft().result())
+        self._pending.append(self._pool.submit(self._compress, block))
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._blocksize:
+            self._submit(bytes(self._buffer[:self._blocksize]))
+            del self._buffer[:self._blocksize]
+        return len(data)
+
+    def close(self):
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._fd.write(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _BlocksReader:
+    """File-like object to read a sequence of blocks of bytes as a stream."""
+
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._buffer = b''
+        self._pos = 0
+
+    def read(self, size=-1):
+        chunks = []
+        while size != 0:
+            if self._pos == len(self._buffer):
+                self._buffer = next(self._blocks, None)
+                self._pos = 0
+                if self._buffer is None:
+                    self._buffer = b''
+                    break
+            end = len(self._buffer) if size < 0 else \
+                min(len(self._buffer), self._pos + size)
+            chunks.append(self._buffer[self._pos:end])
+            if size > 0:
+                size -= end - self._pos
+            self._pos = end
+        return b''.join(chunks)
+
+
+def archive_parallel(dirpath, filepath, compressiontype, overwrite=False,
+                     workers=2, blocksize=None):
+    """Archive the directory `dirpath` into a compressed tar file of which
+    blocks are compressed in parallel. See `DataDir.archive`."""
+    if compressiontype not in _codecs:
+        raise ValueError(f'"{compressiontype}" is not a valid '
+                         f'compressiontype, use one of '
+                         f'{tuple(_codecs.keys())}.')
+    if blocksize is None:
+        blocksize = defaultblocksize
+    if not 0 < blocksize < 2 ** 31:  # gzip member size should fit 32 bits
+        raise ValueError(f"invalid blocksize ({blocksize})")
+    dirpath = Path(dirpath)
+    filepath = Path(filepath)
+    compress = _codecs[compressiontype][0]
+    if not overwrite and filepath.exists():
+        raise FileExistsError(f"'{filepath}' exists, use 'overwrite' "
+                              f"argument")
+    # the archive is written to a temporary file that replaces `filepath`
+    # when complete, so that no partial archive is left when writing fails
+    temppath = filepath.with_name(f'.{filepath.name}.{os.getpid()}.tmp')
+    try:
+        with open(temppath, 'wb') as fd:
+            writer = _BlockCompressingWriter(fd, compress=compress,
+                                             blocksize=blocksize,
+                                             workers=workers)
+            try:
+                with tarfile.open(fileobj=writer, mode='w|') as tf:
+                    tf.add(dirpath, arcname=dirpath.name)
+            finally:
+                writer.close()
+        os.replace(temppath, filepath)
+    except BaseException:
+        if temppath.exists():
+            temppath.unlink()
+        raise
+    return filepath
+
+
+def _gzipmemberranges(fd, filesize):
+    """Returns the byte ranges of the gzip members in `fd`, if they hold
+    their size in their header, otherwise None."""
+    ranges = []
+    start = 0
+    while start < filesize:
+        fd.seek(start)
+        header = fd.read(12)
+        if len(header) < 12 or header[:3] != b'\x1f\x8b\x08' or \
+                not header[3] & 4:  # FEXTRA flag
+            return None
+        xlen = struct.unpack('<H', header[10:12])[0]
+        extra = fd.read(xlen)
+        pos, membersize = 0, None
+        while pos + 4 <= len(extra):
+            subfieldid = extra[pos:pos + 2]
+            sublen = struct.unpack('<H', extra[pos + 2:pos + 4])[0]
+            if subfieldid == _gzipsubfieldid and sublen == 4:
+                membersize = struct.unpack(
+                    '<I', extra[pos + 4:pos + 8])[0]
+            pos += 4 + sublen
+        if membersize is None or start + membersize > filesize:
+            return None
+        ranges.append((start, start + membersize))
+        start += membersize
+    return ranges
+
+
+def _readvarint(data, pos):
+    """Decodes an xz multibyte integer at `pos` in `data`."""
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _xzstreamranges(fd, filesize):
+    """Returns the byte ranges of the xz streams in `fd`, based on their
+    footers and indices, or None if these are not valid."""
+    ranges = []
+    end = filesize
+    try:
+        while end > 0:
+            fd.seek(end - 4)
+            if fd.read(4) == b'\x00' * 4:  # stream padding
+                end -= 4
+                continue
+            fd.seek(end - 12)
+            footer = fd.read(12)
+            if footer[10:12] != b'YZ':
+                return None
+            indexsize = (struct.unpack('<I', footer[4:8])[0] + 1) * 4
+            indexstart = end - 12 - indexsize
+            fd.seek(indexstart)
+            index = fd.read(indexsize)
+            if index[0] != 0:
+                return None
+            nrecords, pos = _readvarint(index, 1)
+            blockssize = 0
+            for _ in range(nrecords):
+                unpaddedsize, pos = _readvarint(index, pos)
+                _, pos = _readvarint(index, pos)
+                blockssize += -(-unpaddedsize // 4) * 4
+            start = indexstart - blockssize - 12
+            if start < 0:
+                return None
+            ranges.append((start, end))
+            end = start
+    except (OSError, IndexError, struct.error):
+        return None
+    return ranges[::-1]
+
+
+def _memberranges(filepath):
+    with open(filepath, 'rb') as fd:
+        magic = fd.read(6)
+        filesize = fd.seek(0, 2)
+        if magic[:2] == b'\x1f\x8b':
+            return 'gz', _gzipmemberranges(fd, filesize)
+        elif magic == b'\xfd7zXZ\x00':
+            return 'xz', _xzstreamranges(fd, filesize)
+        return None, None
+
+
+def _decompressedblocks(filepath, decompress, ranges, workers):
+    """Yields the decompressed members of the archive, in order, while
+    decompressing them concurrently."""
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def readdecompress(start, end):
+        with open(filepath, 'rb') as fd:
+            fd.seek(start)
+            return decompress(fd.read(end - start))
+
+    try:
+        for start, end in ranges:
+            if len(pending) == 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(readdecompress, start, end))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _extractmember(tf, member, path):
+    if hasattr(tarfile, 'data_filter'):  # refuse unsafe paths
+        tf.extract(member, path, filter='data')
+    else:
+        tf.extract(member, path)
+
+
+def extract_archive(filepath, path=None, workers=None, overwrite=False):
+    """Extract an archive of a Darr array or ragged array, or any other
+    compressed tar archive.
+
+    Archives that were created in parallel (see the `workers` parameter of
+    the `archive` method of arrays) are decompressed in parallel. Other
+    archives are decompressed sequentially. Data integrity is verified on
+    the basis of the checksums that are part of the compression formats;
+    any corruption leads to an error.
+
+    Parameters
+    ----------
+    filepath: str or pathlib.Path
+        Path to the archive.
+    path: <str, pathlib.Path, None>
+        Directory in which to extract the archive. Default is None, which
+        means the directory of the archive.
+    workers: <int, None>
+        Number of threads that decompress in parallel. Default is None,
+        which means sequential decompression.
+    overwrite: (True, False), optional
+        Overwrites existing data if it exists. Default is False.
+
+    Returns
+    -------
+    pathlib.Path
+        The path of the extracted data directory.
+
+    Examples
+    --------
+    >>> import darr
+    >>> a = darr.asarray('a.darr', [1, 2, 3])
+    >>> archivepath = a.archive(workers=4)
+    >>> darr.extract_archive(archivepath, path='extracted', workers=4)
+    PosixPath('extracted/a.darr')
+
+    """
+    filepath = Path(filepath)
+    path = filepath.parent if path is None else Path(path)
+    comptype, ranges = None, None
+    if (workers is not None) and (workers > 1):
+        comptype, ranges = _memberranges(filepath)
+    if ranges is None:  # sequential
+        tf = tarfile.open(filepath, mode='r:*')
+    else:
+        blocks = _decompressedblocks(filepath, _codecs[comptype][1],
+                                     ranges=ranges, workers=workers)
+        reader = _BlocksReader(blocks)
+        tf = tarfile.open(fileobj=reader, mode='r|')
+    with tf:
+        dirpath = None
+        for member in tf:
+            if dirpath is None:
+                dirpath = path / Path(member.name).parts[0]
+                if dirpath.exists() and not overwrite:
+                    raise OSError(f"'{dirpath}' exists, use 'overwrite' "
+                                  f"argument")
+            _extractmember(tf, member, path)
+    if ranges is not None:
+        # decompress any remaining members, which verifies them too
+        while reader.read(2 ** 20):
+            pass
+    if dirpath is None:
+        raise ValueError(f"archive '{filepath}' is empty")
+    return dirpath
@@ -10,22 +10,34 @@ array from disk, use **delete_array**.
 
 """
 # TODO replace distutils (is deprecated) with packaging
+import functools
 import json
+import mmap
 import os
+import re
+import shutil
 import sys
+import time
 import warnings
 import numpy as np
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from packaging import version
 from pathlib import Path
 
+from . import stats
+from .checksums import ChecksumManifest
+from .compression import BlockCache, BlockReader, BlockWriter, \
+    blockoffsetsdtype, check_codec, defaultblocklen
 from .datadir import DataDir, create_datadir
+from .filelock import FileLock
 from .metadata import MetaData
 from .numtype import arrayinfotodtype, arraynumtypeinfo, numtypesdescr
 from .readcodearray import readcode, readcodefunc, shapeexplanationtextarray
-from .utils import fit_frames, wrap, check_accessmode, product, tempdirfile
-from ._version import get_versions
+from .utils import fit_frames, wrap, check_accessmode, darrversion, \
+    product, tempdirfile, prefetching, readahead, check_access, madvise, \
+    fadvise, filestat
 
 
 # Design considerations
@@ -59,40 +71,133 @@ class Array:
        read-write. `w` does not exist. To create new darr arrays, potentially
        overwriting an other one, use the `asarray` or `create_array`
        functions.
+    keepopen : bool, default False
+       Keep the data file and its memory map open between indexing
+       operations, instead of opening and closing them for every access.
+       This makes random access to small parts of the array much faster. The
+       memory map is automatically renewed when the array changes size.
+       Release the file with the `close` method when done.
+    access : <str, None>
+       Hint to the operating system about how the data file will be
+       accessed, so that it can adapt read-ahead and caching: 'normal',
+       'sequential', 'random', 'willneed' or 'dontneed'. 'sequential' reads
+       ahead more, and `iterchunks` releases the memory of chunks behind
+       it, so that scanning large arrays does not increase memory use.
+       'random' disables read-ahead, which avoids filling the page cache
+       with data that is not needed. 'willneed' starts reading the whole
+       file into the page cache. 'dontneed' removes the data from the page
+       cache when the file is closed, and behind the reads of `iterchunks`.
+       Default is None, which means no hint. Hints are ignored on platforms
+       that do not support them.
+    swmr : bool, default False
+       Single-writer/multiple-reader mode, for reading an array while
+       another process appends to it. The array can then be opened while
+       the data file holds rows that are not yet recorded in the array
+       description, and `refresh` and `tail` pick up new rows. Rows are
+       visible once the writer has updated the array description, or,
+       when the writer defers updates (see `deferred_updates`), as soon as
+       they are written. The writer should only append, not truncate.
+
+    Operations that change an array hold an exclusive lock on the lock file
+    ('darr.lock') in its directory, so that processes that change the same
+    array at the same time do not corrupt it. See `locked`.
+
+    Arrays may be stored in compressed form (see the `compression` parameter
+    of `asarray`). These are read transparently, but cannot be changed.
 
     """
     _datafilename = 'arrayvalues.bin'
     _arraydescrfilename = 'arraydescription.json'
     _metadatafilename = 'metadata.json'
     _readmefilename = 'README.txt'
+    _blockoffsetsfilename = 'blockoffsets.bin'
+    _checksumsfilename = 'checksums.json'
+    _lockfilename = 'darr.lock'
     _protectedfiles = {_arraydescrfilename, _datafilename,
                        _readmefilename,
-                       _metadatafilename}
-    _formatversion = get_versions()['version']
-
-    def __init__(self, path, accessmode='r'):
+                       _metadatafilename, _blockoffsetsfilename,
+                       _checksumsfilename, _lockfilename}
+    # key in array description that marks that updates to it are deferred
+    _updatependingkey = 'updatepending'
+    # approximate number of bytes of chunks held in memory by reductions
+    _reductionmemory = 64 * 1024 ** 2
+    # number of decompressed blocks of compressed arrays kept in memory
+    _blockcachesize = 32
+
+    def __init__(self, path, accessmode='r', keepopen=False, access=None,
+                 swmr=False):
         self._datadir = DataDir(path=path,
                                 protectedpaths=self._protectedfiles)
         self._path = self._datadir._path
         self._datapath = self._path / self._datafilename
         self._accessmode = check_accessmode(accessmode)
         self._arraydescrpath = self._path / self._arraydescrfilename
-        #self._arrayinfo = self._read_arraydescr()
+        self._arrayinfocache = None
+        self._dtypedescr = None  # numpy dtype derived from the description
+        # whether there is a checksum manifest, so that writes need not look
+        # for it on disk when there is none
+        self._hasmanifest = (self._path / self._checksumsfilename).exists()
+        self._manifest = None  # kept in memory once loaded
+        self._checksumrows = None  # modified rows not yet in the manifest
+        self._arraydescrstat = None  # to detect changes by other processes
+        self._swmr = swmr
+        self._lock = FileLock(self._path / self._lockfilename)
+        self._generation = None  # of the lock file, when last synced
         self._memmap = None
         self._valuesfd = None
-        self._check_arrayinfoconsistency()
+        self._access = check_access(access)
+        self._handleaccess = None  # access hint applied to open data file
+        self._handlemode = None  # access mode of open data file
+        self._keepopen = False
+        self._deferupdates = False
+        self._updatespending = False
+        self._recovered = False
+        self._blockoffsets = None
+        self._readmetxt = None  # last written README text
+        self._blockcache = BlockCache(maxblocks=self._blockcachesize)
+        if self._accessmode == 'r+':
+            # recovering from interrupted deferred updates changes files
+            with self._lock.acquired():
+                self._check_arrayinfoconsistency()
+        else:
+            self._check_arrayinfoconsistency()
         with self._open_array() as (ar, _):
             self._dtype = ar.dtype
             self._shape = ar.shape
             self._size = ar.size
         self._metadata = MetaData(self._path / self._metadatafilename,
                                   accessmode=accessmode,
-                                  callatfilecreationordeletion=self._update_readmetxt)
+                                  callatfilecreationordeletion=self._update_readmetxt,
+                                  lock=self._lock)
+        self.flush()  # in case we recovered from interrupted deferred updates
+        if keepopen:
+            self._openhandle()
+            self._keepopen = True
+
+    def __del__(self):
+        # the object may not have been fully initialized
+        if getattr(self, '_keepopen', False):
+            self.close()
 
     @property
     def _arrayinfo(self):
-        """dict with info on numeric data type and layout"""
-        return self._read_arraydescr()
+        """dict with info on numeric data type and layout.
+
+        The array description file is only read and parsed the first time
+        this is needed. After that a cached copy is returned, which is kept
+        up to date by the writes that Darr itself does to the file. Use
+        `_invalidate_arrayinfo` when the file may have been changed by other
+        means.
+
+        """
+        if self._arrayinfocache is None:
+            self._arrayinfocache = self._read_arraydescr()
+        return dict(self._arrayinfocache)
+
+    def _invalidate_arrayinfo(self):
+        """Forces the array description file to be read again the next time
+        array info is needed."""
+        self._arrayinfocache = None
 
     @property
     def accessmode(self):
@@ -104,6 +209,14 @@ class Array:
         self._accessmode = check_accessmode(value, validmodes=('r', 'r+'),
                                             makebinary=False)
         self._metadata.accessmode = value
+        self._remap()
+
+    @property
+    def compression(self):
+        """Name of the codec with which the array is compressed, or None if
+        the array is not compressed."""
+        compression = self._arrayinfo.get('compression')
+        return None if compression is None else compression['codec']
 
     @property
     def datadir(self):
@@ -117,6 +230,24 @@ class Array:
         """Numpy data type of the array values."""
         return self._dtype
 
+    @property
+    def keepopen(self):
+        """Whether the data file is kept open between access operations. See
+        the `keepopen` parameter of `Array`."""
+        return self._keepopen
+
+    @property
+    def swmr(self):
+        """Whether the array is read in single-writer/multiple-reader mode.
+        See the `swmr` parameter of `Array`."""
+        return self._swmr
+
+    @property
+    def access(self):
+        """Access pattern hint for the data file. See the `access` parameter
+        of `Array`."""
+        return self._access
+
     @property
     def metadata(self):
         """Dictionary-like interface to metadata."""
@@ -169,14 +300,30 @@ class Array:
         return tuple(sorted(languages))
 
     def __getitem__(self, index):
+        starttime = stats.starttimer()
         with self._open_array() as (ar, _):
             values = np.array(ar[index], copy=True)
+        stats.record('array.read', starttime, nbytes=values.nbytes)
         return values
 
     def __setitem__(self, index, value):
-        with self._open_array() as (ar, _):
-            self.check_arraywriteable()
-            ar[index] = value
+        # like `locked`, but without the overhead of context managers, as
+        # this is often used for writing small amounts of data
+        acquired = self._lock.acquire()
+        try:
+            if acquired:
+                self._sync()
+            with self._open_array() as (ar, _):
+                if not ar.flags.writeable:
+                    raise OSError("darr array not writeable; change "
+                                  "'accessmode' attribute to 'r+'")
+                ar[index] = value
+            if self._hasmanifest:
+                startrow, endrow = _indexrowspan(index, self._shape[0])
+                if endrow > startrow:
+                    self._update_checksums(startrow=startrow, endrow=endrow)
+        finally:
+            self._lock.release()
 
     def __len__(self):
         return self._shape[0]
@@ -192,9 +339,12 @@ class Array:
             s = str(ar)
         return s
 
-    @contextmanager
-    def _open_array(self, accessmode=None):
+    def _openhandle(self, accessmode=None, access=None):
+        """Private method to open the data file and create a memory map of
+        it. Both are stored as attributes until `_closehandle` is called.
+        `access` overrides the access pattern hint of the array.
 
+        """
         if accessmode is None:
             accessmode = self._accessmode
         # need different mode strings for file and memmap; memmap does not
@@ -203,35 +353,261 @@ class Array:
                                       makebinary=False)
         filemode = check_accessmode(accessmode, validmodes=('r', 'r+'),
                                     makebinary=True)
-        if self._memmap is not None:
-            yield self._memmap, self._valuesfd
+        # we must do it like this instead of providing a filename
+        # to np.mmemap, otherwise accessing temporary dirs on
+        # windows will fail
+        starttime = stats.starttimer()
+        self._valuesfd = open(file=self._datapath, mode=filemode)
+        try:
+            self._memmap = self._creatememmap(self._valuesfd, memmapmode)
+        except Exception:
+            self._closehandle()
+            raise
+        if access is None:
+            access = self._access
+        self._advise(self._memmap, self._valuesfd, access)
+        self._handleaccess = access
+        self._handlemode = memmapmode
+        stats.record('array.open', starttime)
+
+    def _creatememmap(self, fd, memmapmode):
+        d = self._arrayinfo
+        dtypedescr = self._dtypedescr
+        if product(d['shape']) == 0:  # empty file/array
+            return np.zeros(d['shape'], dtype=dtypedescr,
+                            order=d['arrayorder'])
+        elif 'compression' in d:
+            if self._blockoffsets is None:  # compressed arrays do not change
+                self._blockoffsets = np.fromfile(
+                    self._path / self._blockoffsetsfilename,
+                    dtype=blockoffsetsdtype)
+            return BlockReader(fd=fd, offsets=self._blockoffsets,
+                               shape=d['shape'], dtype=dtypedescr,
+                               codec=d['compression']['codec'],
+                               blocklen=d['compression']['blocklen'],
+                               cache=self._blockcache,
+                               writeable=(memmapmode == 'r+'))
         else:
+            return np.memmap(filename=fd, mode=memmapmode, shape=d['shape'],
+                             dtype=dtypedescr, order=d['arrayorder'])
+
+    def _closehandle(self):
+        if hasattr(self._memmap, '_mmap'):
+            self._memmap._mmap.close() # *may need this for Windows*
+        if self._valuesfd is not None:
+            if self._handleaccess == 'dontneed':
+                fadvise(self._valuesfd, 0, 0, 'DONTNEED')
+            self._valuesfd.close()
+        self._memmap = None
+        self._valuesfd = None
+        self._handleaccess = None
+        self._handlemode = None
+
+    @staticmethod
+    def _advise(memmap, fd, access):
+        """Private method to give the operating system an access pattern
+        hint for the whole data file and its memory map. 'dontneed' is
+        applied when the file is closed, or behind sequential reads."""
+        if access in (None, 'dontneed'):
+            return
+        madvise(getattr(memmap, '_mmap', None), access.upper())
+        fadvise(fd, 0, 0, access.upper())
+
+    def _contiguousrowbytes(self):
+        """Private method that returns the number of bytes per row (element
+        along the first axis) if rows are stored contiguously and
+        uncompressed in the data file, or None otherwise."""
+        arrayinfo = self._arrayinfo
+        if ('compression' in arrayinfo) or \
+                ((arrayinfo['arrayorder'] == 'F') and (self.ndim > 1)):
+            return None
+        return product(self._shape[1:]) * self._dtype.itemsize
+
+    def _dropbehind(self, memmap, fd, startbyte, endbyte, dropcache):
+        """Private method to release the memory of the pages of a byte range
+        of the data file that have been read. If `dropcache`, they are also
+        removed from the page cache. The last, partially read, page is
+        kept."""
+        endbyte -= endbyte % mmap.PAGESIZE
+        startbyte -= startbyte % mmap.PAGESIZE
+        if endbyte <= startbyte:
+            return
+        madvise(getattr(memmap, '_mmap', None), 'DONTNEED', startbyte,
+                endbyte - startbyte)
+        if dropcache:
+            fadvise(fd, startbyte, endbyte - startbyte, 'DONTNEED')
+
+    def _remap(self):
+        """Renews a memory map that is kept open, so that it reflects the
+        current size and access mode of the array."""
+        if self._keepopen:
+            self._closehandle()
+            self._openhandle()
+
+    @contextmanager
+    def _open_array(self, accessmode=None, access=None):
+        check_access(access)
+        if accessmode is not None:
+            accessmode = check_accessmode(accessmode, validmodes=('r', 'r+'),
+                                          makebinary=False)
+        if self._memmap is None:
+            self._openhandle(accessmode=accessmode, access=access)
             try:
-                # we must do it like this instead of providing a filename
-                # to np.mmemap, otherwise accessing temporary dirs on 
-                # windows will fail
-                with open(file=self._datapath, mode=filemode) as fd:
-                    self._valuesfd = fd
-                    d = self._arrayinfo
-                    dtypedescr = arrayinfotodtype(d)
-                    if product(d['shape']) == 0:  # empty file/array
-                        self._memmap = np.zeros(d['shape'], dtype=dtypedescr,
-                                                order=d['arrayorder'])
-                    else:
-                        self._memmap = np.memmap(filename=fd,
-                                                 mode=memmapmode,
-                                                 shape=d['shape'],
-                                                 dtype=dtypedescr,
-                                                 order=d['arrayorder'])
-                    yield self._memmap, self._valuesfd
-            except Exception:
-                raise
+                yield self._memmap, self._valuesfd
+            finally:
+                self._closehandle()
+        elif (accessmode == 'r') and (self._handlemode == 'r+'):
+            # kept open for writing; a read-only view prevents writes
+            memmap = self._memmap
+            if isinstance(memmap, np.ndarray):
+                memmap = memmap.view()
+                memmap.flags.writeable = False
+            with self._open_array(access=access) as (_, fd):
+                yield memmap, fd
+        elif (accessmode == 'r+') and (self._handlemode == 'r'):
+            # kept open read-only; temporarily open it for writing instead
+            previousmode = self._handlemode
+            previousaccess = self._handleaccess
+            self._closehandle()
+            self._openhandle(accessmode=accessmode, access=access)
+            try:
+                yield self._memmap, self._valuesfd
+            finally:
+                self._closehandle()
+                if self._keepopen:
+                    self._openhandle(accessmode=previousmode,
+                                     access=previousaccess)
+        elif (access is None) or (access == self._handleaccess):
+            yield self._memmap, self._valuesfd
+        else:  # kept open, temporarily use another access hint
+            previousaccess = self._handleaccess
+            self._advise(self._memmap, self._valuesfd, access)
+            self._handleaccess = access
+            try:
+                yield self._memmap, self._valuesfd
             finally:
-                if hasattr(self._memmap, '_mmap'):
-                    self._memmap._mmap.close() # *may need this for Windows*
-                self._valuesfd.close()
-                self._memmap = None
-                self._valuesfd = None
+                if self._memmap is not None:
+                    if access == 'dontneed':
+                        fadvise(self._valuesfd, 0, 0, 'DONTNEED')
+                    if previousaccess in (None, 'dontneed'):
+                        self._advise(self._memmap, self._valuesfd, 'normal')
+                    else:
+                        self._advise(self._memmap, self._valuesfd,
+                                     previousaccess)
+                    self._handleaccess = previousaccess
+
+    def close(self):
+        """Close the data file if it is kept open (see the `keepopen`
+        parameter of `Array`). The array remains usable afterwards, but
+        files will again be opened and closed for every access operation.
+
+        """
+        self.flush()
+        self._keepopen = False
+        self._closehandle()
+
+    def flush(self):
+        """Write array description and README.txt file to disk if updates to
+        them are pending, which is only the case within the context of
+        `deferred_updates`.
+
+        """
+        if not self._updatespending:
+            return
+        with self.locked():
+            arrayinfo = self._arrayinfo
+            arrayinfo.pop(self._updatependingkey, None)
+            arrayinfo['shape'] = self._shape
+            self._write_arraydescr(arrayinfo)
+            self._arrayinfocache = arrayinfo
+            self._updatespending = False
+            self._update_readmetxt()
+            self._flush_checksums()
+
+    @contextmanager
+    def deferred_updates(self):
+        """Context manager that defers updating the array description file and
+        the README.txt file when the length of the array changes.
+
+        Normally, these files are rewritten after every `append` or
+        `iterappend` call. When appending many small pieces of data, this
+        takes much more time than writing the data itself. Within this
+        context, length changes are only kept in memory and the files are
+        written once when the context exits, or when `flush` is called.
+
+        The array description is marked as having pending updates for the
+        duration of the context. Should the process crash before the
+        updates are written, the true length of the array is recovered from
+        the size of the data file the next time the array is opened. When
+        opened in 'r+' mode, the description and README are then repaired
+        on disk.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.create_array('test.darr', shape=(0,), dtype='int64')
+        >>> with a.deferred_updates():
+        ...     for i in range(1000):
+        ...         a.append([i])
+        >>> a.shape
+        (1000,)
+
+        """
+        if self._deferupdates:  # nested, outer context takes care
+            yield
+            return
+        if self._accessmode == 'r+':
+            with self.locked():
+                self._update_arrayinfo({self._updatependingkey: True})
+            self._updatespending = True
+        self._deferupdates = True
+        try:
+            yield
+        finally:
+            self._deferupdates = False
+            self.flush()
+
+    @contextmanager
+    def locked(self, shared=False):
+        """Context manager that holds the lock of the array, so that other
+        processes cannot change it in the meantime.
+
+        All operations that change an array (appending, truncating, writing
+        values, changing metadata) hold an exclusive lock on the lock file
+        ('darr.lock') in the array directory while they are performed. Use
+        this context manager to combine several operations without other
+        processes changing the array in between, or to read with a shared
+        lock, which keeps writers out but not other readers. When the lock
+        is acquired, the array is brought up to date with changes made by
+        other processes (see `refresh`).
+
+        Locks are advisory, based on `fcntl.flock`, and only exclude
+        processes that use Darr. They are not available on Windows, and may
+        not work on network file systems. Different Array objects for the
+        same array exclude each other, also within one process, so do not
+        change an array through another object while holding the lock.
+
+        Parameters
+        ----------
+        shared: bool, default False
+            Acquire a shared lock instead of an exclusive lock. Several
+            processes can hold a shared lock at the same time.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.Array('data.darr', accessmode='r+')
+        >>> with a.locked():
+        ...     if a[-1] < 10:
+        ...         a.append([10])
+        >>> with a.locked(shared=True):
+        ...     total = a.sum()
+
+        """
+        with self._lock.acquired(shared=shared) as acquired:
+            if acquired:
+                self._sync(shared=shared)
+            yield self
 
     @contextmanager
     def open(self, accessmode=None):
@@ -242,7 +618,7 @@ class Array:
 
 
     @contextmanager
-    def open_array(self, accessmode=None):
+    def open_array(self, accessmode=None, access=None):
         """Open the array for efficient multiple read or write operations.
 
         Although read and write operations can be performed conveniently using
@@ -256,7 +632,12 @@ class Array:
         ----------
         accessmode: {'r', 'r+'}, default 'r'
             File access mode of the disk array data. `r` means read-only, `r+`
-            means read-write.
+            means read-write. If the array is kept open (see `keepopen`) in
+            read-only mode, it is opened read-write within this context.
+        access: <str, None>
+            Access pattern hint for the data file while it is open,
+            overriding the `access` parameter of the array. See `Array`.
+            Default is None, which means the hint of the array.
 
         Yields
         -------
@@ -273,7 +654,8 @@ class Array:
 
         """
 
-        with self._open_array(accessmode=accessmode) as (memmap, _):
+        with self._open_array(accessmode=accessmode, access=access) as \
+                (memmap, _):
             yield None
 
     def _read_arraydescr(self):
@@ -299,14 +681,12 @@ class Array:
             m = f". Could not read array description from "\
                 f"'{self._arraydescrpath}. '"
             raise type(e)(str(e) + m).with_traceback(sys.exc_info()[2])
-        vfile = version.Version(d['darrversion'])
-        vlib = version.Version(self._formatversion)
         # for now, in alpha stage, we do not recommend the use of newer files
         # with older libraries
-        if not vlib >= vfile:
+        if _isnewerversion(d['darrversion'], darrversion()):
             warnings.warn(f"Format version of file ({d['darrversion']}) "
                           f"is newer than your version of Darr "
-                          f"{self._formatversion}. At this stage this is not "
+                          f"{darrversion()}. At this stage this is not "
                           f"guaranteed to work", UserWarning)
         try:
             d['shape'] = tuple(d['shape'])  # json does not have tuples
@@ -314,7 +694,7 @@ class Array:
                 raise TypeError(f"'{d['shape']}' is not a valid array shape")
         except TypeError:
             raise
-        d['dtypedescr'] = arrayinfotodtype(d)
+        self._dtypedescr = arrayinfotodtype(d)
         try:
             if d['arrayorder'] not in {'C', 'F'}:
                 raise ValueError(
@@ -324,14 +704,212 @@ class Array:
         return d
 
     def _check_arrayinfoconsistency(self):
+        # we check what is on disk, not what is cached
+        self._arraydescrstat = filestat(self._arraydescrpath)
+        self._invalidate_arrayinfo()
         ai = self._arrayinfo
         dtype = np.dtype(arrayinfotodtype(ai))
         expectedfilesize = product(ai['shape']) * dtype.itemsize
         actualfilesize = self._datapath.stat().st_size
-        if actualfilesize != expectedfilesize:
-            raise ValueError(
-                f"binary file size ({actualfilesize}) is different from file "
-                f"size as expected from array info file ({expectedfilesize})")
+        if 'compression' in ai:
+            self._check_blockoffsets(ai, actualfilesize)
+        elif self._swmr and (actualfilesize >= expectedfilesize):
+            # a writer may be appending
+            ai['shape'] = self._visibleshape(ai, actualfilesize)
+            self._arrayinfocache = ai
+        elif actualfilesize != expectedfilesize:
+            rowsize = product(ai['shape'][1:]) * dtype.itemsize
+            if ai.get(self._updatependingkey, False) and rowsize > 0:
+                self._recoverlen(ai, actualfilesize // rowsize, rowsize)
+            else:
+                raise ValueError(
+                    f"binary file size ({actualfilesize}) is different from "
+                    f"file size as expected from array info file "
+                    f"({expectedfilesize})")
+        if (self._accessmode == 'r+') and \
+                ai.get(self._updatependingkey, False):
+            # left by a process that was interrupted within deferred_updates,
+            # possibly before it changed the length; the marker is removed
+            # by the flush in __init__
+            self._updatespending = True
+
+    def _visibleshape(self, arrayinfo, filesize):
+        """Private method that returns the shape of the array as seen by a
+        reader while another process may be appending to it. That is the
+        shape in the array description, unless updates to it are deferred
+        by the writer. Then the number of complete rows in the data file is
+        used, as the description lags behind."""
+        shape = tuple(arrayinfo['shape'])
+        rowsize = product(shape[1:]) * \
+            np.dtype(arrayinfotodtype(arrayinfo)).itemsize
+        if arrayinfo.get(self._updatependingkey, False) and (rowsize > 0) \
+                and ('compression' not in arrayinfo):
+            shape = (filesize // rowsize,) + shape[1:]
+        return shape
+
+    def _sync(self, shared=False):
+        """Private method to bring the array up to date with changes made by
+        other processes, after acquiring its lock. Only reads the array
+        description again if another process changed the array since this
+        object last held the lock."""
+        generation = self._lock.read_generation()
+        if (generation is None) or (generation != self._generation):
+            self.refresh()
+            self._check_hasmanifest()
+            self._generation = generation
+        if (not shared) and self._deferupdates and \
+                (self._accessmode == 'r+') and \
+                not self._arrayinfo.get(self._updatependingkey, False):
+            # another process flushed its deferred updates; the description
+            # should still mark ours as pending
+            self._update_arrayinfo({self._updatependingkey: True})
+
+    def refresh(self):
+        """Update the array to reflect changes in length made by another
+        process, such as a writer that appends to it.
+
+        This is cheap when nothing changed: the array description is only
+        read again when its modification time, size or inode changed. Use
+        `swmr` mode for reading arrays that are being written to.
+
+        Returns
+        -------
+        int
+            The change in length, i.e. the number of rows (elements along
+            the first axis) that were added.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.Array('data.darr', swmr=True)
+        >>> nnew = a.refresh()
+        >>> newrows = a[-nnew:] if nnew > 0 else a[:0]
+
+        """
+        stat = filestat(self._arraydescrpath)
+        if stat != self._arraydescrstat:
+            self._arraydescrstat = stat
+            self._invalidate_arrayinfo()
+            self._check_hasmanifest()
+        arrayinfo = self._arrayinfo
+        if arrayinfo.get(self._updatependingkey, False):
+            shape = self._visibleshape(arrayinfo,
+                                       self._datapath.stat().st_size)
+        else:
+            shape = tuple(arrayinfo['shape'])
+        lenincrease = shape[0] - self._shape[0]
+        if shape != self._shape:
+            arrayinfo['shape'] = shape
+            self._arrayinfocache = arrayinfo
+            self._shape = shape
+            self._size = product(shape)
+            self._remap()
+        return lenincrease
+
+    def tail(self, chunklen, startindex=None, poll=0.1, timeout=None):
+        """Generator that yields rows as they are appended to the array by
+        another process.
+
+        New rows are detected with `refresh`, which is called every `poll`
+        seconds while there are no new rows. Chunks are yielded as soon as
+        rows are available, so they may be shorter than `chunklen`. The
+        array should normally be opened in `swmr` mode.
+
+        Parameters
+        ----------
+        chunklen: int
+            Maximum number of rows (elements along the first axis) per
+            chunk.
+        startindex: <int, None>
+            Index from which to yield rows, which may be negative to start
+            before the current end. Default is None, which means the current
+            end of the array, so that only new rows are yielded.
+        poll: float, default 0.1
+            Number of seconds to wait before checking for new rows again.
+        timeout: <float, None>
+            Stop when no new rows were appended for this number of seconds.
+            Default is None, which means never stop.
+
+        Yields
+        ------
+        numpy array
+            Chunks of new rows.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.Array('data.darr', swmr=True)
+        >>> for chunk in a.tail(chunklen=1024, timeout=60):
+        ...     process(chunk)
+
+        """
+        if chunklen < 1:
+            raise ValueError(f"'chunklen' should be at least 1 ({chunklen})")
+        self.refresh()
+        if startindex is None:
+            position = self._shape[0]
+        else:
+            position, _, _ = slice(startindex, None).indices(self._shape[0])
+        lastnewrows = time.monotonic()
+        while True:
+            length = self._shape[0]
+            if length > position:
+                end = min(position + chunklen, length)
+                yield self[position:end]
+                position = end
+                lastnewrows = time.monotonic()
+                continue
+            position = min(position, length)  # in case of truncation
+            if (timeout is not None) and \
+                    (time.monotonic() - lastnewrows >= timeout):
+                return
+            time.sleep(poll)
+            self.refresh()
+
+    def _check_blockoffsets(self, arrayinfo, filesize):
+        """Private method to check that the block offsets file of a compressed
+        array is consistent with the data file and the array shape."""
+        compression = arrayinfo['compression']
+        check_codec(compression['codec'])
+        blocklen = compression['blocklen']
+        nblocks = -(-arrayinfo['shape'][0] // blocklen)  # ceiling division
+        offsetspath = self._path / self._blockoffsetsfilename
+        offsetssize = offsetspath.stat().st_size
+        if offsetssize != (nblocks + 1) * blockoffsetsdtype.itemsize:
+            raise ValueError(f"block offsets file size ({offsetssize}) does "
+                             f"not correspond to the number of blocks "
+                             f"({nblocks}) expected from array info file")
+        with open(offsetspath, 'rb') as f:
+            f.seek(-blockoffsetsdtype.itemsize, 2)
+            end = int(np.frombuffer(f.read(), dtype=blockoffsetsdtype)[0])
+        if end != filesize:
+            raise ValueError(f"binary file size ({filesize}) is different "
+                             f"from the end of the last compressed block "
+                             f"({end})")
+
+    def _check_notcompressed(self):
+        if 'compression' in self._arrayinfo:
+            raise OSError("compressed darr arrays are read-only and cannot "
+                          "change in size")
+
+    def _recoverlen(self, arrayinfo, newlen, rowsize):
+        """Private method to recover from interrupted deferred updates. Data
+        is always written before the array description is updated, so the
+        data file holds the true length. An incompletely written last row is
+        ignored, and removed in 'r+' mode.
+
+        """
+        shape = (newlen,) + tuple(arrayinfo['shape'][1:])
+        warnings.warn(f"Array description of '{self._path}' was not updated "
+                      f"after a change in length of the array; its shape is "
+                      f"recovered from the size of the data file as {shape} "
+                      f"instead of {arrayinfo['shape']}.", UserWarning)
+        arrayinfo['shape'] = shape
+        self._arrayinfocache = arrayinfo
+        self._recovered = True
+        if self._accessmode == 'r+':
+            os.truncate(self._datapath, newlen * rowsize)
+            self._updatespending = True  # will be flushed by __init__
 
     def check_arraywriteable(self):
         with self._open_array() as (ar, fd):
@@ -339,23 +917,208 @@ class Array:
                 raise OSError("darr array not writeable; change 'accessmode' "
                               "attribute to 'r+'")
 
+    def _write_arraydescr(self, arrayinfo):
+        """Private method to write the array description file, which is
+        replaced atomically, so that other processes that read the array
+        never see a partially written description. All writes of the
+        description go through here."""
+        self._datadir._write_jsondict(filename=self._arraydescrfilename,
+                                      d=arrayinfo, overwrite=True,
+                                      atomic=True)
+        self._changed()
+
+    def _changed(self):
+        """Private method to let other processes know that the array, its
+        description or its checksum manifest changed, after a change made
+        while holding the lock (see `_sync`)."""
+        self._generation = self._lock.increment_generation()
+
     def _update_arrayinfo(self, *args, **kwargs):
+        update = dict(*args, **kwargs)
         arrayinfo = self._arrayinfo
-        arrayinfo.update( *args, **kwargs)
-        self._datadir._write_jsondict(filename=self._arraydescrfilename,
-                                      d=arrayinfo, overwrite=True)
+        arrayinfo.update(update)
+        if not (self._deferupdates or self._updatependingkey in update):
+            # updates are not pending (anymore), but a marker may have been
+            # left by an interrupted process
+            arrayinfo.pop(self._updatependingkey, None)
+        self._write_arraydescr(arrayinfo)
+        arrayinfo['shape'] = tuple(arrayinfo['shape'])
+        self._arrayinfocache = arrayinfo
 
     def _update_len(self, lenincrease):
+        starttime = stats.starttimer()
         newshape = list(self.shape)
         newshape[0] += lenincrease
         self._shape = tuple(newshape)
         self._size = product(self._shape)
-        self._update_arrayinfo(shape=self._shape)
-        self._update_readmetxt()
+        if self._deferupdates:
+            arrayinfo = self._arrayinfo
+            arrayinfo['shape'] = self._shape
+            self._arrayinfocache = arrayinfo
+            self._updatespending = True
+            self._changed()
+        else:
+            self._update_arrayinfo(shape=self._shape)
+            self._update_readmetxt()
+            self._update_checksums()
+        self._remap()
+        stats.record('array.update_len', starttime)
+
+    def _check_hasmanifest(self):
+        """Private method to look up whether the array has a checksum
+        manifest, which may have been created or changed by another
+        process. The manifest in memory, if any, is discarded."""
+        self._hasmanifest = (self._path / self._checksumsfilename).exists()
+        self._manifest = None
+        return self._hasmanifest
+
+    def _checksummanifest(self, recheck=False):
+        """Returns the checksum manifest of the array, or None if there is
+        none. The manifest is only read from disk the first time, or after
+        another process changed the array (see `_sync`), or if `recheck` is
+        True."""
+        if recheck:
+            self._check_hasmanifest()
+        if not self._hasmanifest:
+            return None
+        if self._manifest is None:
+            path = self._path / self._checksumsfilename
+            rowbytes = product(self._shape[1:]) * self._dtype.itemsize
+            self._manifest = ChecksumManifest(path, datapath=self._datapath,
+                                              rowbytes=rowbytes)
+        return self._manifest
+
+    def _update_checksums(self, startrow=None, endrow=None):
+        """Private method to bring the checksum manifest, if any, up to date
+        after the array changed in length, or after rows `startrow` to
+        `endrow` were modified. Within `deferred_updates`, modified rows are
+        only recorded, and the manifest is updated by `flush`."""
+        if not self._hasmanifest:
+            return
+        if startrow is not None:
+            if self._checksumrows is not None:
+                startrow = min(startrow, self._checksumrows[0])
+                endrow = max(endrow, self._checksumrows[1])
+            self._checksumrows = (startrow, endrow)
+        if self._deferupdates:
+            self._updatespending = True
+        else:
+            self._flush_checksums()
+
+    def _flush_checksums(self):
+        """Private method to update the checksum manifest, if any, with the
+        length of the array and the rows modified since the last update."""
+        startrow, endrow = self._checksumrows or (None, None)
+        self._checksumrows = None
+        manifest = self._checksummanifest()
+        if manifest is not None:
+            manifest.update(nrows=self._shape[0], startrow=startrow,
+                            endrow=endrow)
+            self._changed()
+
+    def update_checksums(self, blocklen=None, workers=None):
+        """Compute SHA-256 checksums of the array data in blocks of rows
+        and store them in a manifest file ('checksums.json') in the array
+        directory.
+
+        If the manifest does not exist yet, it is created. Otherwise only
+        the checksums of blocks that are not up to date are computed. Once
+        the manifest exists, it is kept up to date automatically when data
+        is appended, when the array is truncated, and when values are
+        changed by indexing the array (not when they are changed through
+        `open_array`, use this method to update the manifest in that case).
+        Appending only requires the last block and new blocks to be hashed.
+
+        Parameters
+        ----------
+        blocklen: <int, None>
+            Number of rows (elements along the first axis) per block, when
+            the manifest is created. Default is None, which means blocks of
+            approximately 16 Mb. Ignored if the manifest already exists.
+        workers: <int, None>
+            Number of threads that compute checksums in parallel. Default is
+            None, which means 1.
+
+        See Also
+        --------
+        verify_checksums
+
+        """
+        if self._accessmode != 'r+':
+            raise OSError(f"Accesmode should be 'r+' "
+                          f"(now is '{self._accessmode}')")
+        self._check_notcompressed()
+        with self.locked():
+            manifest = self._checksummanifest(recheck=True)
+            if manifest is None:
+                rowbytes = product(self._shape[1:]) * self._dtype.itemsize
+                manifest = ChecksumManifest.create(
+                    self._path / self._checksumsfilename,
+                    datapath=self._datapath, rowbytes=rowbytes,
+                    blocklen=blocklen)
+                self._hasmanifest = True
+                self._manifest = manifest
+                self._changed()
+            if manifest.nrows != self._shape[0]:
+                manifest.update(nrows=self._shape[0], workers=workers)
+                self._changed()
+
+    def verify_checksums(self, startindex=None, endindex=None,
+                         workers=None):
+        """Verify the array data against the checksums that were stored by
+        `update_checksums`.
+
+        Verification is performed per block of rows. A range of rows can be
+        verified separately, so that checking large arrays can be spread out
+        over time, or resumed.
+
+        Parameters
+        ----------
+        startindex: <int, None>
+            Index along the first axis from where to verify. Default is
+            None, which means the start of the array.
+        endindex: <int, None>
+            Index along the first axis up to where to verify. Default is
+            None, which means the end of the array.
+        workers: <int, None>
+            Number of threads that compute checksums in parallel. Default is
+            None, which means 1.
+
+        Returns
+        -------
+        list
+            Tuples with the start and end index of each block of rows of
+            which the checksum does not match. The list is empty if the data
+            is intact.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.asarray('test.darr', range(1000), accessmode='r+')
+        >>> a.update_checksums(blocklen=100)
+        >>> a.verify_checksums(workers=4)
+        []
+
+        """
+        manifest = self._checksummanifest(recheck=True)
+        if manifest is None:
+            raise OSError(f"'{self._path}' has no checksums, create them "
+                          f"with 'update_checksums'")
+        if manifest.nrows != self._shape[0]:
+            raise ValueError(f"checksums are of {manifest.nrows} rows, but "
+                             f"the array has {self._shape[0]}; use "
+                             f"'update_checksums'")
+        start, end, _ = slice(startindex, endindex).indices(self._shape[0])
+        if end <= start:
+            return []
+        return manifest.verify(startrow=start, endrow=end, workers=workers)
 
     def _update_readmetxt(self):
         txt = readcodetxt(self)
-        self._datadir._write_txt(self._readmefilename, txt, overwrite=True)
+        if txt != self._readmetxt:  # only write when it changes
+            self._datadir._write_txt(self._readmefilename, txt,
+                                     overwrite=True)
+            self._readmetxt = txt
 
     def append(self, array):
         """ Add array-like objects to darr to the end of the dataset.
@@ -413,9 +1176,11 @@ class Array:
 
         """
         array = self._checkarrayforappend(array)
+        starttime = stats.starttimer()
         fd.seek(0, 2)  # move to end
         array.tofile(fd)
         fd.flush()
+        stats.record('array.append', starttime, nbytes=array.nbytes)
         return array.shape[0]
 
     def iterappend(self, arrayiterable):
@@ -456,13 +1221,22 @@ class Array:
                           f"(now is '{self._accessmode}')")
         if not hasattr(arrayiterable, '__iter__'):
             raise TypeError("'arrayiterable' is not iterable")
+        with self.locked():
+            self._iterappend(arrayiterable)
+
+    def _iterappend(self, arrayiterable):
+        """Private method that does the work of `iterappend`, while the array
+        is locked."""
         self.check_arraywriteable()
+        self._check_notcompressed()
         arrayiterable = iter(arrayiterable)
         if np.product(self._shape) == 0:
             # numpy cannot write to a fd of an empty file.
             # Hence we overwrite the file. It is not beautiful but it works.
             array = self._checkarrayforappend(next(arrayiterable))
+            starttime = stats.starttimer()
             array.tofile(str(self._datapath))
+            stats.record('array.append', starttime, nbytes=array.nbytes)
             self._update_len(lenincrease=array.shape[0])
         with self._open_array() as (v, fd):
             oldshape = v.shape
@@ -474,9 +1248,11 @@ class Array:
                 if fd.closed:
                     fd = open(file=self._datapath, mode=self._accessmode)
                 fd.flush()
-                self._update_len(lenincrease=lenincrease)
-                fd.truncate(self._size * self._dtype.itemsize)
+                newlen = oldshape[0] + lenincrease
+                fd.truncate(newlen * product(oldshape[1:]) *
+                            self._dtype.itemsize)
                 fd.close()
+                self._update_len(lenincrease=lenincrease)
                 s = f"{exception}\nAppending of data did not (completely) " \
                     f"succeed. Shape of array was {oldshape} and is now " \
                     f"{self._shape} after an increase in length " \
@@ -484,6 +1260,41 @@ class Array:
                 raise AppendDataError(s)
         self._update_len(lenincrease=lenincrease)
 
+    def appender(self, buffersize=None):
+        """Create a buffered writer to efficiently append many small pieces
+        of data.
+
+        Every call to `append` or `iterappend` writes directly to the data
+        file. The returned `Appender` object instead collects appended rows
+        in a memory buffer and writes them to disk in large blocks when the
+        buffer is full, when its `flush` method is called, or when it is
+        closed. Data is only visible in the array after it has been written.
+        Close the appender, or use it as a context manager, so that no
+        buffered data is left unwritten.
+
+        Parameters
+        ----------
+        buffersize: <int, None>
+            Size of the buffer, in rows (i.e. elements along the first axis).
+            Default is None, which corresponds to a buffer of 8 Mb.
+
+        Returns
+        -------
+        Appender
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.create_array('test.darr', shape=(0,2), dtype='int64')
+        >>> with a.appender() as ap:
+        ...     for i in range(1000):
+        ...         ap.write([[i, i]])
+        >>> a.shape
+        (1000, 2)
+
+        """
+        return Appender(self, buffersize=buffersize)
+
     def iterindices(self, chunklen, stepsize=None, startindex=None,
                      endindex=None, include_remainder=True):
         """Generate indices of chunks of a given length and with a given
@@ -558,12 +1369,15 @@ class Array:
             yield (framestart, endindex)
 
     def iterchunks(self, chunklen, stepsize=None, startindex=None,
-                   endindex=None, include_remainder=True, accessmode=None):
+                   endindex=None, include_remainder=True, accessmode=None,
+                   copy=True, out=None, prefetch=None, access=None):
         """Iterate over array array yielding chunks of a given length and with
         a given stepsize.
 
         This method keeps the underlying data file open during iteration,
-        and is therefore relatively fast.
+        and is therefore relatively fast. By default each chunk is a new
+        array. Use `copy=False` or `out` to avoid copying or allocating
+        memory for every chunk when each chunk is only read once.
 
         Parameters
         ----------
@@ -589,6 +1403,31 @@ class Array:
         accessmode:  {'r', 'r+'}, default 'r'
             File access mode of the darr data. `r` means read-only, `r+`
             means read-write.
+        copy: <True, False>
+            If False, chunks are read-only views of the memory-mapped data
+            file, instead of copies. The memory map is released when no
+            views of it exist anymore. Default is True.
+        out: <numpy array, None>
+            Buffer into which each chunk is read directly from the data
+            file. It should be a writeable, C-contiguous array of the same
+            dtype as the darr array, with at least `chunklen` rows and the
+            same shape otherwise. The generator yields views of the first
+            rows of `out`, which are overwritten by the next chunk. If
+            provided, `copy` is ignored. Default is None.
+        prefetch: <int, None>
+            Number of chunks to read ahead in a background thread, so that
+            reading the next chunks from disk overlaps with processing the
+            current one. If `copy` is False, the data of the next chunks is
+            read into the page cache, so that the views that are yielded can
+            be accessed without waiting for the disk. Cannot be combined with
+            `out`. Default is None, which means that chunks are only read
+            when they are requested.
+        access: <str, None>
+            Access pattern hint for the data file during iteration,
+            overriding the `access` parameter of the array (see `Array`).
+            With 'sequential', the memory of chunks that have been read is
+            released; with 'dontneed' they are also removed from the page
+            cache. Default is None, which means the hint of the array.
 
         Returns
         -------
@@ -607,19 +1446,580 @@ class Array:
         [  0.   1.   3.   4.   6.   7.   9.  10.]
 
         """
-        with self._open_array(accessmode=accessmode) as (ar, _):
-            for framestart, frameend in \
-                    self.iterindices(chunklen, stepsize=stepsize,
-                                     startindex=startindex, endindex=endindex,
-                                     include_remainder=include_remainder):
-                yield np.array(ar[framestart:frameend], copy=True)
+        if (prefetch is not None) and (prefetch < 0):
+            raise ValueError(f"'prefetch' cannot be negative ({prefetch})")
+        if out is not None:
+            self._checkoutbuffer(out, chunklen)
+            if prefetch:
+                raise ValueError("'out' cannot be combined with 'prefetch'")
+        with self._open_array(accessmode=accessmode, access=access) as \
+                (ar, fd):
+            access = self._handleaccess
+            if not copy:
+                # a separate read-only memory map that is not closed
+                # explicitly, so that it stays alive as long as views of it
+                # exist
+                ar = self._creatememmap(fd, memmapmode='r')
+                self._advise(ar, fd, access)
+            indices = self.iterindices(chunklen, stepsize=stepsize,
+                                       startindex=startindex,
+                                       endindex=endindex,
+                                       include_remainder=include_remainder)
+            prefetcher = None
+            if prefetch and copy and (out is None):
+                # the thread only reads from the memory map, which stays
+                # open until it is stopped
+                chunks = prefetcher = prefetching(
+                    ((framestart, frameend,
+                      np.array(ar[framestart:frameend], copy=True))
+                     for framestart, frameend in indices), prefetch)
+            else:
+                if prefetch:
+                    # views are not read until they are used, but their data
+                    # is brought into the page cache by a thread that runs
+                    # ahead
+                    indices = prefetcher = prefetching(
+                        self._readahead(fd, indices), prefetch)
+                chunks = ((framestart, frameend,
+                           self._readchunk(ar, fd, framestart, frameend,
+                                           copy=copy, out=out))
+                          for framestart, frameend in indices)
+            rowbytes = self._contiguousrowbytes()
+            dropbehind = (access in ('sequential', 'dontneed')) and \
+                         (rowbytes is not None)
+            droppedupto = None  # row up to which pages have been released
+            try:
+                for framestart, frameend, chunk in chunks:
+                    if dropbehind:
+                        if droppedupto is None:
+                            droppedupto = framestart
+                        elif framestart > droppedupto:
+                            self._dropbehind(ar, fd, droppedupto * rowbytes,
+                                             framestart * rowbytes,
+                                             dropcache=(access == 'dontneed'))
+                            droppedupto = framestart
+                    yield chunk
+            finally:
+                # stop the thread before the memory map is closed
+                if prefetcher is not None:
+                    prefetcher.close()
+            if dropbehind and (droppedupto is not None):
+                self._dropbehind(ar, fd, droppedupto * rowbytes,
+                                 frameend * rowbytes,
+                                 dropcache=(access == 'dontneed'))
+
+    def _readchunk(self, ar, fd, framestart, frameend, copy, out):
+        """Private method that reads rows `framestart` to `frameend`, as a
+        copy, into `out`, or as a read-only view."""
+        if out is not None:
+            return self._readinto(ar, fd, framestart, frameend, out)
+        elif copy:
+            return np.array(ar[framestart:frameend], copy=True)
+        view = ar[framestart:frameend].view(np.ndarray)
+        view.flags.writeable = False
+        return view
+
+    def _readahead(self, fd, indices):
+        """Private generator that passes on chunk indices, after reading the
+        data of each chunk into the page cache."""
+        rowbytes = self._contiguousrowbytes()
+        if rowbytes is None:  # rows are not stored contiguously in the file
+            yield from indices
+            return
+        buffer = bytearray(2 ** 20)
+        for framestart, frameend in indices:
+            readahead(fd, framestart * rowbytes,
+                      (frameend - framestart) * rowbytes, buffer)
+            yield framestart, frameend
+
+    def _checkoutbuffer(self, out, chunklen):
+        if not isinstance(out, np.ndarray):
+            raise TypeError("'out' should be a numpy array")
+        if out.dtype != self._dtype:
+            raise TypeError(f"dtype of 'out' ({out.dtype}) should be the "
+                            f"same as that of the array ({self._dtype})")
+        if (out.ndim != self.ndim) or (out.shape[1:] != self._shape[1:]) \
+                or (len(out) < chunklen):
+            raise ValueError(f"shape of 'out' ({out.shape}) should be at "
+                             f"least ({chunklen},) + {self._shape[1:]}")
+        if not (out.flags.c_contiguous and out.flags.writeable):
+            raise ValueError("'out' should be C-contiguous and writeable")
+
+    def _readinto(self, ar, fd, framestart, frameend, out):
+        """Private method that reads rows `framestart` to `frameend` into
+        the first rows of `out` and returns a view of these."""
+        chunk = out[:frameend - framestart]
+        arrayinfo = self._arrayinfo
+        if ('compression' in arrayinfo) or \
+                ((arrayinfo['arrayorder'] == 'F') and (self.ndim > 1)):
+            # rows are not stored contiguously in the file
+            np.copyto(chunk, ar[framestart:frameend])
+            return chunk
+        rowbytes = product(self._shape[1:]) * self._dtype.itemsize
+        fd.seek(framestart * rowbytes)
+        nbytes = fd.readinto(chunk.reshape(-1).view(np.uint8))
+        if nbytes != chunk.nbytes:
+            raise OSError(f"could not read rows {framestart}-{frameend} "
+                          f"from '{self._datapath}'")
+        return chunk
+
+    def _defaultchunklen(self, chunkbytes=10 * 1024 ** 2):
+        """Private method that returns the length of chunks (along the first
+        axis) of approximately `chunkbytes` bytes in size, but at least 1.
+
+        """
+        rowbytes = product(self._shape[1:]) * self._dtype.itemsize
+        return max(chunkbytes // max(rowbytes, 1), 1)
+
+    def _iterchunkresults(self, func, chunklen, workers, executor):
+        """Private method that returns a generator that applies `func` to
+        chunks of the array in a pool of workers and yields the results in
+        order of the chunks. The number of chunks in flight is bounded to
+        limit memory use.
+
+        The arguments are validated before the generator is returned, so
+        that errors are raised when it is created rather than when it is
+        first iterated over.
+
+        """
+        if not callable(func):
+            raise TypeError(f"'{func}' is not callable")
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"executor should be 'thread' or 'process', "
+                             f"not '{executor}'")
+        if chunklen is None:
+            chunklen = self._defaultchunklen()
+        elif ((chunklen % 1) != 0) or (chunklen <= 0):
+            raise ValueError(f"invalid chunklen ({chunklen})")
+        if workers is None:
+            workers = os.cpu_count() or 1
+        elif ((workers % 1) != 0) or (workers <= 0):
+            raise ValueError(f"invalid number of workers ({workers})")
+        return self._genchunkresults(func, chunklen=int(chunklen),
+                                     workers=int(workers), executor=executor)
+
+    def _genchunkresults(self, func, chunklen, workers, executor):
+        """Private generator that does the work of `_iterchunkresults`, with
+        validated arguments."""
+        if len(self) == 0:
+            return
+        indices = self.iterindices(chunklen=chunklen)
+        maxinflight = 2 * workers
+        if executor == 'thread':
+            # numpy releases the GIL when copying and in most computations,
+            # so threads sharing one memory map run concurrently
+            with self._open_array(accessmode='r') as (ar, _):
+                pool = ThreadPoolExecutor(max_workers=workers)
+                submit = lambda start, end: pool.submit(
+                    _mapchunk, ar, start, end, func)
+                yield from _orderedresults(pool, submit, indices,
+                                           maxinflight)
+        else:
+            # each worker process opens its own memory map of the array;
+            # multiprocessing is slow to import, so only when needed
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_initmapworker,
+                                       initargs=(str(self.path),))
+            submit = lambda start, end: pool.submit(
+                _mapchunkinworker, start, end, func)
+            yield from _orderedresults(pool, submit, indices, maxinflight)
+
+    def map_chunks(self, func, chunklen=None, workers=None, out=None,
+                   dtype=None, executor='thread', accessmode='r',
+                   metadata=None, overwrite=False):
+        """Apply a function to consecutive chunks of the array in parallel.
+
+        The array is partitioned along the first axis into chunks, which are
+        processed concurrently by a pool of workers. Results are returned in
+        the order of the chunks. If `out` is provided, they are streamed
+        into a new darr array on disk, so that arrays larger than RAM can be
+        transformed using all processor cores.
+
+        Parameters
+        ----------
+        func: callable
+            Function that takes a numpy array chunk and returns a numpy
+            array, or any other result if `out` is None. When `executor` is
+            'process', the function should be picklable, i.e. defined at
+            the top level of a module.
+        chunklen: <int, None>
+            Length of chunks along the first axis. If None, it is chosen so
+            that chunks are about 10 Mb in size.
+        workers: <int, None>
+            Number of workers. Default is None, which means the number of
+            processors on the machine.
+        out: <str, pathlib.Path, None>
+            Path of a new darr array to which the results are written. The
+            results are concatenated along their first axis. If None,
+            an iterator over the results of each chunk is returned.
+        dtype: <dtype, None>
+            Numpy data type of the output array. If None, it is inferred
+            from the results. Only used if `out` is provided.
+        executor: {'thread', 'process'}, default 'thread'
+            Run workers as threads, which is efficient when `func` consists
+            of numpy operations that release the GIL, or as separate
+            processes, which reopen the array independently.
+        accessmode: {'r', 'r+'}, default 'r'
+            File access mode of the returned output array.
+        metadata: {None, dict}
+            Dictionary with metadata to be saved with the output array.
+        overwrite: (True, False), optional
+            Overwrites existing darr data at `out` if it exists.
+
+        Returns
+        -------
+        Array or iterator
+            The output array if `out` is provided, otherwise an iterator
+            over the results per chunk.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.asarray('a.da', np.arange(10.))
+        >>> b = a.map_chunks(np.sqrt, chunklen=4, workers=2, out='b.da')
+        >>> list(a.map_chunks(np.sum, chunklen=4))
+        [6.0, 22.0, 17.0]
+
+        """
+        results = self._iterchunkresults(func, chunklen=chunklen,
+                                         workers=workers, executor=executor)
+        if out is None:
+            return results
+        if Path(out) == self.path:
+            raise ValueError(f"'{out}' is the same as the path of the "
+                             f"source darr.")
+        return asarray(path=out, array=results, dtype=dtype,
+                       accessmode=accessmode, metadata=metadata,
+                       overwrite=overwrite)
+
+    def reduce(self, func, combine, chunklen=None, workers=None,
+               executor='thread', initial=None):
+        """Reduce the array to a single result by applying a function to
+        chunks of the array in parallel, and combining the results.
+
+        Parameters
+        ----------
+        func: callable
+            Function that takes a numpy array chunk and returns a partial
+            result. When `executor` is 'process', it should be picklable.
+        combine: callable
+            Function that takes two partial results and returns their
+            combination. It is applied in the order of the chunks.
+        chunklen: <int, None>
+            Length of chunks along the first axis. If None, it is chosen so
+            that chunks are about 10 Mb in size.
+        workers: <int, None>
+            Number of workers. Default is None, which means the number of
+            processors on the machine.
+        executor: {'thread', 'process'}, default 'thread'
+            Run workers as threads or as separate processes. See
+            `map_chunks`.
+        initial: optional
+            Value that is placed before the partial results when combining
+            them, and returned if the array is empty.
+
+        Returns
+        -------
+        The combined result.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.asarray('a.da', np.arange(10))
+        >>> a.reduce(np.sum, lambda x, y: x + y, chunklen=4)
+        45
+
+        """
+        results = self._iterchunkresults(func, chunklen=chunklen,
+                                         workers=workers, executor=executor)
+        if initial is None:
+            try:
+                initial = next(results)
+            except StopIteration:
+                raise ValueError("cannot reduce empty array without "
+                                 "'initial' value") from None
+        return functools.reduce(combine, results, initial)
+
+    def _normalizeaxis(self, axis):
+        """Private method that returns `axis` as a sorted tuple of
+        non-negative axis numbers."""
+        if axis is None:
+            return tuple(range(self.ndim))
+        if isinstance(axis, (int, np.integer)):
+            axis = (axis,)
+        axes = []
+        for a in axis:
+            if not -self.ndim <= a < self.ndim:
+                raise ValueError(f"axis {a} is out of bounds for array of "
+                                 f"dimension {self.ndim}")
+            axes.append(int(a) % self.ndim)
+        if len(set(axes)) != len(axes):
+            raise ValueError("repeated axis")
+        return tuple(sorted(axes))
+
+    def _reducechunks(self, partial, merge, axis, chunklen, workers,
+                      chunkfunc):
+        """Private method that computes a reduction of the array along
+        `axis`, chunk by chunk.
+
+        If the first axis is reduced, `partial` computes a partial result
+        for each chunk and `merge` combines two partial results. Otherwise
+        chunks can be reduced independently by `chunkfunc` and the results
+        are concatenated.
+
+        """
+        axes = self._normalizeaxis(axis)
+        if 0 in axes:
+            results = self._iterchunkresults(
+                lambda chunk: partial(chunk, axes), chunklen=chunklen,
+                workers=workers, executor='thread')
+            return functools.reduce(merge, results)
+        else:
+            results = self._iterchunkresults(
+                lambda chunk: chunkfunc(chunk, axis=axes),
+                chunklen=chunklen, workers=workers, executor='thread')
+            return np.concatenate(list(results))
+
+    def _reductionchunklen(self, chunklen, workers):
+        if chunklen is None:
+            # keep memory use (about 2 chunks in flight per worker) within
+            # the budget
+            chunklen = self._defaultchunklen(
+                chunkbytes=self._reductionmemory // (2 * workers))
+        return chunklen
+
+    def sum(self, axis=None, dtype=None, chunklen=None, workers=1):
+        """Sum of array elements over a given axis, computed chunk by chunk
+        without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the sum is computed. The default is to
+            compute the sum of all elements.
+        dtype: <dtype, None>
+            The type used for summation and of the result. By default, the
+            same as what numpy's `sum` would use.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        if len(self) == 0:
+            return np.sum(self[:], axis=axis, dtype=dtype)
+        chunklen = self._reductionchunklen(chunklen, workers)
+        return self._reducechunks(
+            partial=lambda chunk, axes: chunk.sum(axis=axes, dtype=dtype),
+            merge=np.add, axis=axis, chunklen=chunklen, workers=workers,
+            chunkfunc=functools.partial(np.sum, dtype=dtype))
+
+    def min(self, axis=None, chunklen=None, workers=1):
+        """Minimum of array elements over a given axis, computed chunk by
+        chunk without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the minimum is computed. The default is
+            to compute the minimum of all elements.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        if len(self) == 0:
+            return np.min(self[:], axis=axis)
+        chunklen = self._reductionchunklen(chunklen, workers)
+        return self._reducechunks(
+            partial=lambda chunk, axes: chunk.min(axis=axes),
+            merge=np.minimum, axis=axis, chunklen=chunklen, workers=workers,
+            chunkfunc=np.min)
+
+    def max(self, axis=None, chunklen=None, workers=1):
+        """Maximum of array elements over a given axis, computed chunk by
+        chunk without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the maximum is computed. The default is
+            to compute the maximum of all elements.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        if len(self) == 0:
+            return np.max(self[:], axis=axis)
+        chunklen = self._reductionchunklen(chunklen, workers)
+        return self._reducechunks(
+            partial=lambda chunk, axes: chunk.max(axis=axes),
+            merge=np.maximum, axis=axis, chunklen=chunklen, workers=workers,
+            chunkfunc=np.max)
+
+    def _meanvar(self, axis, dtype, ddof, chunklen, workers, statistic):
+        """Private method that computes the mean or the variance of the
+        array, chunk by chunk. Partial results of chunks are combined with
+        the numerically stable pairwise algorithm of Chan et al., so that the
+        precision does not depend on how the array is chunked.
+
+        """
+        if dtype is not None:
+            resdtype = np.dtype(dtype)
+        elif self._dtype.kind in 'biu':
+            resdtype = np.dtype('float64')
+        else:
+            resdtype = self._dtype
+        # accumulate in at least double precision
+        accdtype = np.result_type(resdtype, np.float64)
+        chunklen = self._reductionchunklen(chunklen, workers)
+        if statistic == 'mean':
+            chunkfunc = functools.partial(np.mean, dtype=resdtype)
+        else:
+            resdtype = np.empty(0, dtype=resdtype).real.dtype
+            chunkfunc = functools.partial(np.var, dtype=accdtype, ddof=ddof)
+        result = self._reducechunks(
+            partial=functools.partial(_meanvarpartial, dtype=accdtype),
+            merge=_mergemeanvar, axis=axis, chunklen=chunklen,
+            workers=workers, chunkfunc=chunkfunc)
+        if isinstance(result, tuple):  # partial results along first axis
+            n, mean, m2 = result
+            if statistic == 'mean':
+                result = mean
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    result = m2 / max(n - ddof, 0)
+        if statistic == 'var':
+            result = np.real(result)
+        return np.asarray(result, dtype=resdtype)[()]
+
+    def mean(self, axis=None, dtype=None, chunklen=None, workers=1):
+        """Arithmetic mean of array elements over a given axis, computed
+        chunk by chunk without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the mean is computed. The default is to
+            compute the mean of all elements.
+        dtype: <dtype, None>
+            Type of the result. By default, float64 for integer arrays and
+            the array type for floating point arrays. Partial results are
+            always accumulated in at least double precision.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        if len(self) == 0:
+            return np.mean(self[:], axis=axis, dtype=dtype)
+        return self._meanvar(axis=axis, dtype=dtype, ddof=0,
+                             chunklen=chunklen, workers=workers,
+                             statistic='mean')
+
+    def var(self, axis=None, dtype=None, ddof=0, chunklen=None, workers=1):
+        """Variance of array elements over a given axis, computed chunk by
+        chunk without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the variance is computed. The default is
+            to compute the variance of all elements.
+        dtype: <dtype, None>
+            Type of the result. By default, float64 for integer arrays and
+            the array type for floating point arrays. Partial results are
+            always accumulated in at least double precision.
+        ddof: int, default 0
+            Delta degrees of freedom. The divisor used is N - ddof, where N
+            is the number of elements.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        if len(self) == 0:
+            return np.var(self[:], axis=axis, dtype=dtype, ddof=ddof)
+        return self._meanvar(axis=axis, dtype=dtype, ddof=ddof,
+                             chunklen=chunklen, workers=workers,
+                             statistic='var')
+
+    def std(self, axis=None, dtype=None, ddof=0, chunklen=None, workers=1):
+        """Standard deviation of array elements over a given axis, computed
+        chunk by chunk without loading the whole array in RAM.
+
+        Parameters
+        ----------
+        axis: <None, int, tuple of ints>
+            Axis or axes along which the standard deviation is computed. The
+            default is to compute the standard deviation of all elements.
+        dtype: <dtype, None>
+            Type of the result. By default, float64 for integer arrays and
+            the array type for floating point arrays. Partial results are
+            always accumulated in at least double precision.
+        ddof: int, default 0
+            Delta degrees of freedom. The divisor used is N - ddof, where N
+            is the number of elements.
+        chunklen: <int, None>
+            Length of chunks along the first axis that are read at once. If
+            None, it is chosen so that the chunks that are being processed
+            together take about 64 Mb.
+        workers: int, default 1
+            Number of threads that process chunks in parallel.
+
+        Returns
+        -------
+        numpy array or scalar
+
+        """
+        return np.sqrt(self.var(axis=axis, dtype=dtype, ddof=ddof,
+                                chunklen=chunklen, workers=workers))
 
     def copy(self, path, dtype=None, chunklen=None, accessmode='r',
              overwrite=False):
         """Copy darr to a different path, potentially changing its dtype.
 
-        The copying is performed in chunks to avoid RAM memory overflow for
-        very large darr arrays.
+        If the dtype does not change, the data file is copied as a whole,
+        using fast operating system functions where available. Otherwise,
+        the copying is performed in chunks to avoid RAM memory overflow for
+        very large darr arrays. Compressed arrays remain compressed in the
+        same way. Use `asarray` to store a copy with different compression.
 
         Parameters
         ----------
@@ -647,9 +2047,28 @@ class Array:
 
         """
         metadata = dict(self.metadata)
-        return asarray(path=path, array=self, dtype=dtype,
-                       accessmode=accessmode, metadata=metadata,
-                       chunklen=chunklen, overwrite=overwrite)
+        if dtype is not None and np.dtype(dtype) != self._dtype:
+            compression = self._arrayinfo.get('compression', {})
+            return asarray(path=path, array=self, dtype=dtype,
+                           accessmode=accessmode, metadata=metadata,
+                           chunklen=chunklen, overwrite=overwrite,
+                           compression=compression.get('codec'),
+                           blocklen=compression.get('blocklen'))
+        path = Path(path)
+        if path == self.path:
+            raise ValueError(f"'{path}' is the same as the path of the "
+                             f"source darr.")
+        bd = create_datadir(path=path, overwrite=overwrite)
+        # uses fast in-kernel copying on systems that support it
+        shutil.copyfile(self._datapath, path.joinpath(self._datafilename))
+        if self.compression is not None:
+            shutil.copyfile(self._path / self._blockoffsetsfilename,
+                            path.joinpath(self._blockoffsetsfilename))
+        datainfo = self._arrayinfo
+        datainfo.pop(self._updatependingkey, None)
+        datainfo['shape'] = self._shape
+        return _finalize_newarray(bd, datainfo=datainfo, metadata=metadata,
+                                  accessmode=accessmode, overwrite=overwrite)
 
     def readcode(self, language, abspath=False, basepath=None):
         """Generate code to read the array in a different language.
@@ -686,7 +2105,8 @@ class Array:
         return readcode(self, language=language, basepath=basepath,
                         abspath=abspath)
 
-    def archive(self, filepath=None, compressiontype='xz', overwrite=False):
+    def archive(self, filepath=None, compressiontype='xz', overwrite=False,
+                workers=None, blocksize=None):
         """Archive array data into a single compressed file.
 
         Parameters
@@ -700,6 +2120,16 @@ class Array:
             library.
         overwrite: (True, False), optional
             Overwrites existing archive if it exists. Default is False.
+        workers: <int, None>
+            Number of threads that compress in parallel. Default is None,
+            which means that the archive is compressed as one stream. If
+            larger than 1, blocks of the archive are compressed
+            independently and concatenated. The result is still a standard
+            compressed tar file, that can be decompressed in parallel by
+            `darr.extract_archive`.
+        blocksize: <int, None>
+            Size in bytes of the uncompressed blocks when compressing in
+            parallel. Default is None, which means 4 MiB.
 
         Returns
         -------
@@ -716,7 +2146,207 @@ class Array:
         """
         return self._datadir.archive(filepath=filepath,
                                      compressiontype=compressiontype,
-                                     overwrite=overwrite)
+                                     overwrite=overwrite,
+                                     workers=workers,
+                                     blocksize=blocksize)
+
+
+class Appender:
+    """Buffered writer for appending data to a Darr array.
+
+    Rows are collected in a preallocated memory buffer and written to the
+    data file of the array in large blocks. Use the `appender` method of an
+    Array to create one. An appender must be closed with `close`, or be used
+    as a context manager, which closes it on exit, to write the data that is
+    still in the buffer. An appender that is garbage collected without
+    being closed is closed then, with a ResourceWarning, but when that
+    happens is not guaranteed.
+
+    Parameters
+    ----------
+    array: Array
+        The array to append to. Its accessmode should be 'r+'.
+    buffersize: <int, None>
+        Size of the buffer, in rows (i.e. elements along the first axis).
+        Default is None, which corresponds to a buffer of 8 Mb.
+
+    """
+
+    def __init__(self, array, buffersize=None):
+        if array.accessmode != 'r+':
+            raise OSError(f"Accesmode should be 'r+' "
+                          f"(now is '{array.accessmode}')")
+        array._check_notcompressed()
+        rowshape = tuple(array.shape[1:])
+        if buffersize is None:
+            rowsize = product(rowshape) * array.itemsize
+            buffersize = (8 * 1024 ** 2) // max(rowsize, 1)
+        buffersize = max(int(buffersize), 1)
+        self._array = array
+        self._buffer = np.empty((buffersize,) + rowshape, dtype=array.dtype)
+        self._nbuffered = 0
+        self._fd = open(array._datapath, 'ab')
+
+    def __del__(self):
+        # the object may not have been fully initialized
+        fd = getattr(self, '_fd', None)
+        if (fd is not None) and not fd.closed:
+            warnings.warn(f"unclosed Appender of '{self._array.path}'; "
+                          f"buffered data is written now", ResourceWarning,
+                          source=self)
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def buffersize(self):
+        """Size of the buffer, in rows."""
+        return len(self._buffer)
+
+    @property
+    def closed(self):
+        """True if the appender has been closed."""
+        return self._fd.closed
+
+    def _writeblock(self, array):
+        with self._array.locked():
+            starttime = stats.starttimer()
+            # other processes may have appended since the last write
+            oldsize = self._fd.seek(0, 2)
+            try:
+                self._fd.write(np.ascontiguousarray(array).data)
+                self._fd.flush()
+            except Exception:
+                # do not leave incompletely written data behind
+                self._fd.truncate(oldsize)
+                raise
+            stats.record('array.append', starttime, nbytes=array.nbytes)
+            self._array._update_len(lenincrease=len(array))
+
+    def write(self, array):
+        """Append array-like object to buffer. The shape of the data and the
+        array must be compliant.
+
+        Parameters
+        ----------
+        array: array-like object
+            This can be a numpy array, a sequence that can be converted into a
+            numpy array.
+
+        """
+        if self.closed:
+            raise ValueError('write to closed Appender')
+        array = self._array._checkarrayforappend(array)
+        n = len(array)
+        if self._nbuffered + n > self.buffersize:
+            self.flush()
+        if n >= self.buffersize:  # no use buffering this
+            self._writeblock(array)
+        else:
+            self._buffer[self._nbuffered:self._nbuffered + n] = array
+            self._nbuffered += n
+            if self._nbuffered == self.buffersize:
+                self.flush()
+
+    def flush(self):
+        """Write buffered data to the array."""
+        if self._nbuffered > 0:
+            self._writeblock(self._buffer[:self._nbuffered])
+            self._nbuffered = 0
+
+    def close(self):
+        """Write buffered data to the array and close the appender."""
+        if not self.closed:
+            try:
+                self.flush()
+            finally:
+                self._fd.close()
+
+
+@functools.lru_cache(maxsize=64)
+def _isnewerversion(fileversion, libversion):
+    """Is the version with which a file was written newer than the version
+    of the library?"""
+    if fileversion == libversion:  # no need to import packaging
+        return False
+    from packaging import version
+    return version.Version(fileversion) > version.Version(libversion)
+
+
+def _indexrowspan(index, nrows):
+    """Returns the start and end of the range of rows that contains all rows
+    selected by `index`, or of all rows if this is not simply known."""
+    if isinstance(index, tuple):
+        index = index[0] if len(index) > 0 else slice(None)
+    if isinstance(index, (int, np.integer)):
+        row = int(index) + nrows if index < 0 else int(index)
+        return row, row + 1
+    if isinstance(index, slice):
+        rows = range(*index.indices(nrows))
+        if len(rows) == 0:
+            return 0, 0
+        return min(rows[0], rows[-1]), max(rows[0], rows[-1]) + 1
+    return 0, nrows
+
+
+def _mapchunk(ar, start, end, func):
+    return func(np.array(ar[start:end], copy=True))
+
+
+# array opened by each worker process of Array.map_chunks and Array.reduce
+_workerarray = None
+
+
+def _initmapworker(path):
+    global _workerarray
+    _workerarray = Array(path, keepopen=True)
+
+
+def _mapchunkinworker(start, end, func):
+    with _workerarray._open_array() as (ar, _):
+        return _mapchunk(ar, start, end, func)
+
+
+def _meanvarpartial(chunk, axes, dtype):
+    """Returns the number of elements, mean and sum of squared deviations
+    from the mean of a chunk, along `axes`."""
+    n = product(chunk.shape[a] for a in axes)
+    mean = chunk.mean(axis=axes, dtype=dtype)
+    m2 = np.real(chunk.var(axis=axes, dtype=dtype)) * n
+    return n, mean, m2
+
+
+def _mergemeanvar(a, b):
+    """Combines two partial results of `_meanvarpartial` (Chan et al.,
+    1979)."""
+    na, meana, m2a = a
+    nb, meanb, m2b = b
+    n = na + nb
+    if n == 0:
+        return a
+    delta = meanb - meana
+    mean = meana + delta * (nb / n)
+    m2 = m2a + m2b + np.abs(delta) ** 2 * (na * nb / n)
+    return n, mean, m2
+
+
+def _orderedresults(pool, submit, indices, maxinflight):
+    """Submits chunks defined by `indices` to `pool` while keeping at most
+    `maxinflight` of them pending, and yields their results in order."""
+    pending = deque()
+    try:
+        for start, end in indices:
+            if len(pending) == maxinflight:
+                yield pending.popleft().result()
+            pending.append(submit(start, end))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
 
 def _fillgenerator(shape, dtype='float64', fill=0., fillfunc=None,
@@ -791,8 +2421,9 @@ def _archunkgenerator(array, dtype=None, chunklen=None):
         for chunk in array:
             yield np.asarray(chunk, dtype=dtype)
     elif isinstance(array, Array):
-        for chunk in array.iterchunks(chunklen=chunklen):
-            yield chunk
+        # chunks are written to file right away, no need to copy them first
+        for chunk in array.iterchunks(chunklen=chunklen, copy=False):
+            yield np.asarray(chunk, dtype=dtype)
     elif hasattr(array, '__len__') and not hasattr(array, 'keys'):
         # may be numpy array or sequence
         totallen = len(array)
@@ -815,12 +2446,18 @@ def _archunkgenerator(array, dtype=None, chunklen=None):
 
 # FIXME what it iter produces a different first dimension?
 def asarray(path, array, dtype=None, accessmode='r',
-            metadata=None, chunklen=None, overwrite=False):
+            metadata=None, chunklen=None, overwrite=False, compression=None,
+            blocklen=None, compressionlevel=None):
     """Save an array or array generator as a Darr array to file system path.
 
     Data is always written in ‘C’ order to disk, independent of the order of
     `array`.
 
+    Optionally, the array is stored in compressed form. It is then split
+    along its first axis into blocks that are compressed separately, so that
+    reading part of the array only requires decompressing the blocks that
+    contain it. Compressed arrays cannot be changed after creation.
+
     Parameters
     ----------
     path : str or pathlib.Path
@@ -850,6 +2487,16 @@ def asarray(path, array, dtype=None, accessmode='r',
         Overwrites existing darr data if it exists. Note that a darr
         path is a directory. If that directory contains additional files,
         these will not be removed and an OSError is raised. Default is `False`.
+    compression: {None, 'zlib', 'lzma', 'bz2'}, optional
+        Codec with which to compress the array data, from the Python
+        standard library. Default is None, which means no compression.
+    blocklen: <int, None>, optional
+        Number of rows (elements along the first axis) per compressed
+        block. Default is None, which means blocks of about 1 Mb before
+        compression. Only used if `compression` is provided.
+    compressionlevel: <int, None>, optional
+        Compression level passed to the codec. Default is None, which means
+        the default of the codec. Only used if `compression` is provided.
 
     Returns
     -------
@@ -888,6 +2535,8 @@ def asarray(path, array, dtype=None, accessmode='r',
     if isinstance(array, Array) and (path == array.path):
         raise ValueError(f"'{path}' is the same as the path of the "
                          f"source darr.")
+    if compression is not None:
+        check_codec(compression)
     chunkiter = _archunkgenerator(array, dtype=dtype, chunklen=chunklen)
     firstchunk = next(chunkiter)
     if firstchunk.ndim == 0:  # we received a number instead of an array
@@ -900,12 +2549,23 @@ def asarray(path, array, dtype=None, accessmode='r',
     datapath = path.joinpath(Array._datafilename)
     arraylen = firstchunk.shape[0]
     with open(datapath, 'wb') as df:
-        firstchunk.tofile(df)
+        if compression is None:
+            writechunk = lambda chunk: chunk.tofile(df)  # is always C order
+        else:
+            if blocklen is None:
+                blocklen = defaultblocklen(firstchunk.shape[1:], dtype)
+            blockwriter = BlockWriter(df, codec=compression,
+                                      blocklen=blocklen,
+                                      level=compressionlevel)
+            writechunk = blockwriter.write
+        writechunk(firstchunk)
         for chunk in chunkiter:
             if chunk.ndim == 0:
                 chunk = np.array(chunk, ndmin=1, dtype=dtype)
-            chunk.astype(dtype).tofile(df)  # is always C order
+            writechunk(chunk.astype(dtype))
             arraylen += chunk.shape[0]
+        if compression is not None:
+            blockwriter.close()
     shape = list(firstchunk.shape)
     shape[0] = arraylen
     datainfo = arraynumtypeinfo(firstchunk)
@@ -915,17 +2575,48 @@ def asarray(path, array, dtype=None, accessmode='r',
                       "be C_CONTIGUOUS")
         datainfo['arrayorder'] = 'C'
     datainfo['shape'] = shape
-    datainfo['darrversion'] = Array._formatversion
+    if compression is not None:
+        np.asarray(blockwriter.offsets, dtype=blockoffsetsdtype).tofile(
+            path.joinpath(Array._blockoffsetsfilename))
+        datainfo['compression'] = {'codec': compression,
+                                   'blocklen': int(blocklen)}
+    return _finalize_newarray(bd, datainfo=datainfo, metadata=metadata,
+                              accessmode=accessmode, overwrite=overwrite)
+
+
+def _finalize_newarray(bd, datainfo, metadata, accessmode, overwrite):
+    """Private function to write the array description, metadata and README
+    files of a new array, the data file of which has already been written.
+
+    Parameters
+    ----------
+    bd: DataDir
+        The data directory of the new array.
+    datainfo: dict
+        Numeric type and layout info, as produced by `arraynumtypeinfo`.
+
+    Returns
+    -------
+    Array
+
+    """
+    datainfo['darrversion'] = darrversion()
     datainfo['darrobject'] = 'Array'
     bd._write_jsondict(filename=Array._arraydescrfilename,
                        d=datainfo, overwrite=overwrite)
-    metadatapath = path.joinpath(Array._metadatafilename)
+    metadatapath = bd.path.joinpath(Array._metadatafilename)
     if (metadata is not None) and (metadata != {}):
         bd._write_jsondict(filename=Array._metadatafilename,
                            d=metadata, overwrite=overwrite)
     elif metadatapath.exists():  # no metadata but file exists, remove it
         metadatapath.unlink()
-    d = Array(path, accessmode=accessmode)
+    blockoffsetspath = bd.path.joinpath(Array._blockoffsetsfilename)
+    if ('compression' not in datainfo) and blockoffsetspath.exists():
+        blockoffsetspath.unlink()  # left by a previous compressed array
+    checksumspath = bd.path.joinpath(Array._checksumsfilename)
+    if checksumspath.exists():
+        checksumspath.unlink()  # left by a previous array
+    d = Array(bd.path, accessmode=accessmode)
     d._update_readmetxt()
     return d
 
@@ -933,10 +2624,15 @@ def asarray(path, array, dtype=None, accessmode='r',
 # FIXME non-first axis len 0
 def create_array(path, shape, dtype='float64', fill=None, fillfunc=None,
                  accessmode='r+', chunklen=None, metadata=None,
-                 overwrite=False):
+                 overwrite=False, preallocate=False, workers=None):
     """Create a new `darr array` of given shape and type, filled with
     predetermined values. Data is always written in ‘C’ order to disk.
 
+    Arrays that are filled with zeros (the default) are created without
+    writing any values: the data file is just set to the required size, so
+    that creation is fast independent of array size. Other values can be
+    computed and written in parallel by multiple workers.
+
     Parameters
     ----------
     path : str or pathlib.Path
@@ -970,6 +2666,21 @@ def create_array(path, shape, dtype='float64', fill=None, fillfunc=None,
         paths is a directory. If that directory contains additional files, 
         these will not be removed and an OSError is raised.
         Default is `False`.
+    preallocate: <True, False>, optional
+        Only relevant for arrays filled with zeros. If False, the data file
+        is created as a sparse file where the file system supports this,
+        i.e. disk space is only allocated when values are written. If True,
+        disk space for the whole array is reserved at creation (using
+        `posix_fallocate` where available), so that running out of disk
+        space later is not possible and the file is less fragmented.
+        Default is `False`.
+    workers: <int, None>, optional
+        Number of threads that compute and write chunks of the array in
+        parallel. This is useful for fill functions that take a lot of
+        time and release the GIL, as numpy functions do. The resulting
+        array is identical to that created by a single worker. Default is
+        None, which means that chunks are computed and written one after
+        the other.
 
     Returns
     -------
@@ -1014,15 +2725,134 @@ def create_array(path, shape, dtype='float64', fill=None, fillfunc=None,
        [ 4.,  8.]]) (r+)
 
     """
+    if _iszerofill(fill=fill, fillfunc=fillfunc, dtype=dtype):
+        return _createzeroarray(path=path, shape=shape, dtype=dtype,
+                                accessmode=accessmode, metadata=metadata,
+                                overwrite=overwrite, preallocate=preallocate)
+    if (workers is not None) and (workers > 1) and hasattr(os, 'pwrite'):
+        return _createarrayparallel(path=path, shape=shape, dtype=dtype,
+                                    fill=fill, fillfunc=fillfunc,
+                                    accessmode=accessmode, chunklen=chunklen,
+                                    metadata=metadata, overwrite=overwrite,
+                                    workers=workers)
     gen = _fillgenerator(shape=shape, dtype=dtype, fill=fill,
                          fillfunc=fillfunc, chunklen=chunklen)
     return asarray(path=path, array=gen, accessmode=accessmode,
                    metadata=metadata, overwrite=overwrite)
 
+
+def _iszerofill(fill, fillfunc, dtype):
+    """Private function that determines if the array would consist of zero
+    bytes only. Note that e.g. -0.0 is not, as its sign bit is set."""
+    if fillfunc is not None:
+        return False
+    if fill is None:
+        return True
+    try:
+        fillbytes = np.asarray(fill, dtype=dtype).tobytes()
+    except (TypeError, ValueError):
+        return False  # leave error reporting to the normal path
+    return not any(fillbytes)
+
+
+def _checkshapedtype(shape, dtype):
+    """Private function that validates the shape and dtype of a new array,
+    and returns them as a tuple and a numpy dtype."""
+    if not hasattr(shape, '__len__'):  # probably integer
+        shape = (shape,)
+    shape = tuple(int(dim) for dim in shape)
+    if len(shape) == 0:
+        raise ValueError("shape should have at least one dimension")
+    if any(dim < 0 for dim in shape):
+        raise ValueError("negative dimensions are not allowed")
+    dtype = np.dtype(dtype)
+    if dtype.name not in numtypesdescr.keys():
+        raise TypeError(f"darr cannot have type '{dtype.name}'")
+    return shape, dtype
+
+
+def _createzeroarray(path, shape, dtype, accessmode, metadata, overwrite,
+                     preallocate):
+    """Private function to create an array filled with zeros by setting the
+    size of the data file, instead of writing the zeros."""
+    shape, dtype = _checkshapedtype(shape, dtype)
+    bd = create_datadir(path=path, overwrite=overwrite)
+    nbytes = product(shape) * dtype.itemsize
+    with open(bd.path.joinpath(Array._datafilename), 'wb') as df:
+        if preallocate and (nbytes > 0) and hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(df.fileno(), 0, nbytes)
+        else:
+            df.truncate(nbytes)
+    datainfo = arraynumtypeinfo(np.empty((0,) + shape[1:], dtype=dtype))
+    datainfo['shape'] = list(shape)
+    return _finalize_newarray(bd, datainfo=datainfo, metadata=metadata,
+                              accessmode=accessmode, overwrite=overwrite)
+
+
+def _createarrayparallel(path, shape, dtype, fill, fillfunc, accessmode,
+                         chunklen, metadata, overwrite, workers):
+    """Private function to create an array of which the chunks are computed
+    by a pool of threads, each writing its chunks at the right offset in the
+    data file. The chunks and the index arrays provided to `fillfunc` are
+    the same as those produced by `_fillgenerator`, so that the result is
+    identical.
+
+    """
+    if fill is not None and fillfunc is not None:
+        raise ValueError("either 'fill' or 'fillfunc' should be provided, "
+                         "not both")
+    shape, dtype = _checkshapedtype(shape, dtype)
+    rowbytes = product(shape[1:]) * dtype.itemsize
+    if chunklen is None:
+        # each worker holds a chunk and an index array in memory
+        chunklen = max((80 * 1024 ** 2) // (workers * max(rowbytes, 1)), 1)
+    bd = create_datadir(path=path, overwrite=overwrite)
+    with open(bd.path.joinpath(Array._datafilename), 'wb') as df:
+        df.truncate(product(shape) * dtype.itemsize)
+        fd = df.fileno()
+        starts = ((start, None) for start in range(0, shape[0], chunklen))
+        pool = ThreadPoolExecutor(max_workers=workers)
+        submit = lambda start, _: pool.submit(
+            _fillchunk, fd=fd, shape=shape, dtype=dtype, fill=fill,
+            fillfunc=fillfunc, chunklen=chunklen, start=start,
+            rowbytes=rowbytes)
+        for _ in _orderedresults(pool, submit, starts, 2 * workers):
+            pass
+    datainfo = arraynumtypeinfo(np.empty((0,) + shape[1:], dtype=dtype))
+    datainfo['shape'] = list(shape)
+    return _finalize_newarray(bd, datainfo=datainfo, metadata=metadata,
+                              accessmode=accessmode, overwrite=overwrite)
+
+
+def _fillchunk(fd, shape, dtype, fill, fillfunc, chunklen, start, rowbytes):
+    chunkshape = (chunklen,) + shape[1:]
+    chunk = np.empty(chunkshape, dtype=dtype)
+    if fill is None:
+        if fillfunc is None:
+            fill = 0
+        else:
+            i = np.empty(chunkshape, dtype='int64')
+            i.T[:] = np.arange(start, start + chunklen, dtype='int64')
+            chunk[:] = fillfunc(i)
+    if fill is not None:
+        chunk[:] = fill
+    chunk = chunk[:min(chunklen, shape[0] - start)]
+    _pwriteall(fd, chunk.reshape(-1).view(np.uint8), start * rowbytes)
+
+
+def _pwriteall(fd, buffer, offset):
+    """Writes all of `buffer` at `offset` in file descriptor `fd`, which
+    pwrite may not do in one call."""
+    while len(buffer) > 0:
+        nbytes = os.pwrite(fd, buffer, offset)
+        buffer = buffer[nbytes:]
+        offset += nbytes
+
 @contextmanager
 def create_temparray(shape, dtype='float64', fill=None, fillfunc=None,
                      accessmode='r+', chunklen=None, metadata=None,
-                     report=True, overwrite=False):
+                     report=True, overwrite=False, preallocate=False,
+                     workers=None):
     """Creates a temporary darr array that is deleted automatically after
     use.
 
@@ -1060,6 +2890,12 @@ def create_temparray(shape, dtype='float64', fill=None, fillfunc=None,
         paths is a directory. If that directory contains additional files,
         these will not be removed and an OSError is raised.
         Default is `False`.
+    preallocate: <True, False>, optional
+        Reserve disk space for arrays filled with zeros at creation, instead
+        of creating a sparse file. See `create_array`. Default is `False`.
+    workers: <int, None>, optional
+        Number of threads that compute and write chunks of the array in
+        parallel. See `create_array`. Default is None.
 
     Returns
     -------
@@ -1088,7 +2924,8 @@ def create_temparray(shape, dtype='float64', fill=None, fillfunc=None,
         yield create_array(path=path, shape=shape, dtype=dtype, fill=fill,
                            fillfunc=fillfunc, accessmode=accessmode,
                            chunklen=chunklen, metadata=metadata,
-                           overwrite=overwrite)
+                           overwrite=overwrite, preallocate=preallocate,
+                           workers=workers)
 
 
 def delete_array(da):
@@ -1107,6 +2944,7 @@ def delete_array(da):
     except Exception:
         raise TypeError(f"'{da}' not recognized as a Darr array")
     da.check_arraywriteable()
+    da.close()
     for fn in da._protectedfiles:
         path = da.path.joinpath(fn)
         if path.exists():
@@ -1163,32 +3001,131 @@ def truncate_array(a, index):
     except Exception:
         raise TypeError(f"'{a}' not recognized as a darr Array")
     a.check_arraywriteable()
+    a._check_notcompressed()
     if not isinstance(index, int):
         raise TypeError(f"'index' should be an int (is {type(index)})")
-    with a._open_array() as (mmap, _):
-        newlen = len(mmap[:index])
-    del mmap # need this for Windows
-    lenincrease = newlen - len(a)
-    if 0 <= newlen < len(a):
-        i = newlen * product(a.shape[1:]) * a.dtype.itemsize
-        os.truncate(a._datapath, i)
-        a._update_len(lenincrease)
-    else:
-        raise IndexError(f"'index' {index} would yield an array of length "
-                         f"{newlen}, which is invalid (current length is "
-                         f"{len(a)})")
+    with a.locked():
+        with a._open_array() as (mmap, _):
+            newlen = len(mmap[:index])
+        del mmap # need this for Windows
+        lenincrease = newlen - len(a)
+        if 0 <= newlen < len(a):
+            # a memory map that is kept open cannot be truncated on all
+            # platforms; it is renewed by _update_len
+            a._closehandle()
+            i = newlen * product(a.shape[1:]) * a.dtype.itemsize
+            os.truncate(a._datapath, i)
+            a._check_hasmanifest()
+            a._update_len(lenincrease)
+        else:
+            raise IndexError(f"'index' {index} would yield an array of "
+                             f"length {newlen}, which is invalid (current "
+                             f"length is {len(a)})")
+
+
+# README texts of arrays, by the array properties that they depend on
+_readcodetxtcache = OrderedDict()
+_readcodetxtcachesize = 256
+
+
+class _ReadcodeTxtArray:
+    """Stand-in for an array in the generation of its README text, with a
+    different length."""
+
+    def __init__(self, da, length):
+        self._arrayinfo = dict(da._arrayinfo,
+                               shape=(length,) + tuple(da.shape[1:]))
+        self.shape = self._arrayinfo['shape']
+        self.ndim = len(self.shape)
+        self.size = product(self.shape)
+        self.dtype = da.dtype
+        self.path = da.path
+        self.metadata = da.metadata
+        self._datapath = da._datapath
+        self._blockoffsetsfilename = da._blockoffsetsfilename
+
+
+def _lengthnumbers(length, rowsize):
+    """Private function that returns the numbers in the README text of an
+    array that depend on its length, i.e. its length and number of values
+    (and of real and imaginary parts, for complex numbers)."""
+    return [str(length * m) for m in (1, rowsize, 2 * rowsize)]
+
+
+def _lengthtemplate(txt, numbers):
+    """Private function that splits a README text at the numbers that depend
+    on the length of the array (see `_lengthnumbers`). Returns the parts
+    in between, and for each number its position in `numbers`."""
+    pattern = '|'.join(re.escape(n) for n in set(numbers))
+    parts = re.split(rf'(?<!\d)({pattern})(?!\d)', txt)
+    return parts, [numbers.index(n) for n in parts[1::2]]
+
+
+def _filltemplate(template, numbers):
+    """Private function that returns the text of a template made by
+    `_lengthtemplate`, with `numbers` substituted."""
+    parts, positions = template
+    parts = parts.copy()
+    parts[1::2] = [numbers[i] for i in positions]
+    return ''.join(parts)
 
 
 def readcodetxt(da):
     """Returns text on how to read a Darr array numeric binary data in various
     programming languages.
 
+    Texts are cached, so that they are generated only once for arrays with
+    the same numeric type, shape of the non-first axes, layout and
+    compression. The length of the array is substituted when a cached text
+    is used, so that appending to an array does not require generating its
+    text again. As the text is wrapped, this is only done for lengths with
+    the same numbers of digits.
+
     Parameters
     ----------
     da: Darr array
 
     """
-
+    d = da._arrayinfo
+    shape = tuple(d['shape'])
+    compression = d.get('compression')
+    rowsize = product(shape[1:])
+    numbers = _lengthnumbers(shape[0], rowsize)
+    if compression is None:
+        keyshape = (shape[1:], tuple(len(n) for n in numbers))
+    else:  # compressed arrays do not change in length
+        keyshape = shape
+    key = (d['numtype'], keyshape, d['byteorder'], d['arrayorder'],
+           json.dumps(compression, sort_keys=True), len(da.metadata) > 0)
+    if key in _readcodetxtcache:
+        _readcodetxtcache.move_to_end(key)
+        cached = _readcodetxtcache[key]
+        if cached is None:  # length cannot be substituted
+            return _generatereadcodetxt(da)
+        return _filltemplate(cached, numbers)
+    txt = _generatereadcodetxt(da)
+    cached = _lengthtemplate(txt, numbers)
+    if compression is None:
+        # the length can only be substituted if no other numbers in the
+        # text coincide with the ones that depend on it, which is checked
+        # against the text for a different length with the same key. If
+        # there is none, the key determines the length.
+        for otherlen in (shape[0] + 1, shape[0] - 1):
+            othernumbers = _lengthnumbers(otherlen, rowsize)
+            if (otherlen >= 0) and ([len(n) for n in othernumbers] ==
+                                    [len(n) for n in numbers]):
+                othertxt = _generatereadcodetxt(
+                    _ReadcodeTxtArray(da, otherlen))
+                if _filltemplate(cached, othernumbers) != othertxt:
+                    cached = None
+                break
+    _readcodetxtcache[key] = cached
+    while len(_readcodetxtcache) > _readcodetxtcachesize:
+        _readcodetxtcache.popitem(last=False)
+    return txt
+
+
+def _generatereadcodetxt(da):
     s = numtypedescriptiontxt(da)
     s += "Code for reading the numeric data\n" \
          "=================================\n\n"
@@ -1264,9 +3201,28 @@ def numtypedescriptiontxt(da):
              "needed to read the data.") + "\n\n"
     s+= f"Data format description" \
         f"\n=======================\n\n"
-    s += wrap("The file 'arrayvalues.bin' contains the raw binary values of "
-              "the numeric array, without header information, in the "
-              "following format:") + "\n\n"
+    compression = d.get('compression')
+    if compression is None:
+        s += wrap("The file 'arrayvalues.bin' contains the raw binary values "
+                  "of the numeric array, without header information, in the "
+                  "following format:") + "\n\n"
+    else:
+        codecdescr = {'zlib': "zlib format (RFC 1950)",
+                      'lzma': "xz format",
+                      'bz2': "bzip2 format"}[compression['codec']]
+        s += wrap(f"The numeric array is stored in compressed form. It is "
+                  f"split along its first dimension into blocks of "
+                  f"{compression['blocklen']} elements (the last block may be "
+                  f"smaller). Each block is compressed separately in "
+                  f"{codecdescr}, and the compressed blocks are stored one "
+                  f"after the other in the file 'arrayvalues.bin'. The file "
+                  f"'blockoffsets.bin' contains the byte positions in "
+                  f"'arrayvalues.bin' at which the blocks start, followed by "
+                  f"the position at which the last block ends, as unsigned "
+                  f"64-bit integers with least-significant byte first. "
+                  f"Decompressed and concatenated, the blocks contain the raw "
+                  f"binary values of the numeric array, without header "
+                  f"information, in the following format:") + "\n\n"
     s +=f"  Numeric type: {typedescr}\n" \
         f"  Byte order: {endianness} ({endiannessdescr})\n"
     if da.ndim == 1:
@@ -0,0 +1,174 @@
+"""This module implements per-block SHA-256 checksums of the data files of
+arrays.
+
+The data file is divided into blocks of a fixed number of rows (elements
+along the first axis); the last block may have fewer. The checksum of each
+block is stored in a manifest file in JSON format, next to the data file.
+When rows are appended, only the checksum of the last block, and of new
+blocks, needs to be computed; the hash of an incomplete last block is
+continued with the new rows, rather than computed again, while the manifest
+is kept in memory. Any range of rows can be verified
+independently, by multiple threads in parallel.
+
+"""
+import hashlib
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import write_jsonfile
+
+# default number of bytes in a block
+defaultblockbytes = 16 * 1024 ** 2
+
+algorithm = 'sha256'
+
+
+def _rangehash(filepath, start, end, m=None, bufsize=2 ** 20):
+    """Update hash object `m`, or a new SHA-256 one if None, with bytes
+    `start` to `end` of a file, and return it."""
+    if m is None:
+        m = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            buf = f.read(min(bufsize, remaining))
+            if not buf:
+                raise ValueError(f"'{filepath}' is shorter than expected "
+                                 f"({end} bytes)")
+            m.update(buf)
+            remaining -= len(buf)
+    return m
+
+
+def rangesha256(filepath, start, end, bufsize=2 ** 20):
+    """Compute the SHA-256 checksum of bytes `start` to `end` of a file."""
+    return _rangehash(filepath, start, end, bufsize=bufsize).hexdigest()
+
+
+def _mapthreads(func, args, workers):
+    """Apply `func` to each element of `args`, in order, in `workers`
+    threads. Hashlib releases the GIL for large data."""
+    if (workers is None) or (workers < 2) or (len(args) < 2):
+        return [func(*a) for a in args]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda a: func(*a), args))
+
+
+class ChecksumManifest:
+    """Checksums of blocks of rows of an array data file.
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        Path to the manifest file.
+    datapath: pathlib.Path
+        Path to the data file.
+    rowbytes: int
+        Number of bytes per row.
+
+    """
+
+    def __init__(self, path, datapath, rowbytes):
+        self.path = path
+        self.datapath = datapath
+        self.rowbytes = rowbytes
+        with open(path, 'r') as f:
+            d = json.load(f)
+        if d['algorithm'] != algorithm:
+            raise ValueError(f"checksum algorithm '{d['algorithm']}' not "
+                             f"supported")
+        self.blocklen = d['blocklen']
+        self.nrows = d['nrows']
+        self.blocks = d['blocks']
+        # hash object of the last block if it is incomplete, so that it can
+        # be continued when rows are appended
+        self._lasthash = None
+
+    @classmethod
+    def create(cls, path, datapath, rowbytes, blocklen=None):
+        """Create an empty manifest, which covers no rows."""
+        if blocklen is None:
+            blocklen = max(defaultblockbytes // max(rowbytes, 1), 1)
+        blocklen = int(blocklen)
+        if blocklen < 1:
+            raise ValueError(f"'blocklen' should be at least 1, not "
+                             f"{blocklen}")
+        write_jsonfile(path, data={'algorithm': algorithm,
+                                   'blocklen': blocklen, 'nrows': 0,
+                                   'blocks': []}, overwrite=True,
+                       atomic=True)
+        return cls(path, datapath, rowbytes)
+
+    def write(self):
+        write_jsonfile(self.path, data={'algorithm': algorithm,
+                                        'blocklen': self.blocklen,
+                                        'nrows': self.nrows,
+                                        'blocks': self.blocks},
+                       overwrite=True, atomic=True)
+
+    def _blockhashes(self, blocknrs, nrows, workers=None):
+        args = []
+        for b in blocknrs:
+            start = b * self.blocklen
+            end = min(start + self.blocklen, nrows)
+            args.append((self.datapath, start * self.rowbytes,
+                         end * self.rowbytes))
+        return _mapthreads(_rangehash, args, workers=workers)
+
+    def update(self, nrows, startrow=None, endrow=None, workers=None):
+        """Bring the manifest up to date with a data file of `nrows` rows.
+
+        Checksums are computed for blocks that changed in length, and for
+        blocks that overlap rows `startrow` to `endrow`, if provided, which
+        is the range of rows that was modified. If the last block was
+        incomplete and only grew, its hash is continued with the new rows
+        instead of being computed again.
+
+        """
+        blocklen = self.blocklen
+        nblocks = -(-nrows // blocklen)  # ceiling division
+        # blocks that are no longer complete or did not exist
+        firstchanged = min(self.nrows, nrows) // blocklen
+        blocknrs = set(range(firstchanged, nblocks))
+        modified = set()
+        if startrow is not None:
+            modified = set(range(startrow // blocklen,
+                                 min(-(-endrow // blocklen), nblocks)))
+            blocknrs.update(modified)
+        hashes = {}
+        if (self._lasthash is not None) and (nrows > self.nrows) and \
+                (firstchanged not in modified):
+            # taken, as it is no longer valid if hashing fails halfway
+            m, self._lasthash = self._lasthash, None
+            end = min((firstchanged + 1) * blocklen, nrows)
+            hashes[firstchanged] = _rangehash(
+                self.datapath, self.nrows * self.rowbytes,
+                end * self.rowbytes, m=m)
+            blocknrs.discard(firstchanged)
+        blocknrs = sorted(blocknrs)
+        hashes.update(zip(blocknrs, self._blockhashes(blocknrs, nrows=nrows,
+                                                      workers=workers)))
+        blocks = self.blocks[:nblocks]
+        blocks += [None] * (nblocks - len(blocks))
+        for b, m in hashes.items():
+            blocks[b] = m.hexdigest()
+        self.blocks = blocks
+        self.nrows = nrows
+        if nrows % blocklen:
+            self._lasthash = hashes.get(nblocks - 1, self._lasthash)
+        else:
+            self._lasthash = None
+        self.write()
+
+    def verify(self, startrow, endrow, workers=None):
+        """Returns the row ranges of the blocks that overlap rows `startrow`
+        to `endrow` and of which the checksum does not match."""
+        blocknrs = list(range(startrow // self.blocklen,
+                              -(-endrow // self.blocklen)))
+        hashes = self._blockhashes(blocknrs, nrows=self.nrows,
+                                   workers=workers)
+        return [(b * self.blocklen, min((b + 1) * self.blocklen, self.nrows))
+                for b, m in zip(blocknrs, hashes)
+                if m.hexdigest() != self.blocks[b]]
@@ -0,0 +1,332 @@
+"""This module implements the block-compressed storage layout of Darr arrays.
+
+In this layout, the array is split along its first axis into blocks with a
+fixed number of rows (the last block may have fewer). Each block holds the
+raw binary values of its rows, in the same format as an uncompressed array,
+and is compressed independently with one of the codecs of the Python
+standard library. The compressed blocks are stored one after the other in
+the array values file. A separate index file holds the byte offsets of the
+blocks, so that any part of the array can be read by decompressing only the
+blocks that contain it.
+
+"""
+import bz2
+import lzma
+import os
+import threading
+import zlib
+import numpy as np
+
+from collections import OrderedDict
+
+from .utils import product
+
+# name: (compress, decompress), all in the format of the standard library
+# functions, i.e. zlib (RFC 1950), xz and bzip2
+codecs = {'zlib': (zlib.compress, zlib.decompress),
+          'lzma': (lzma.compress, lzma.decompress),
+          'bz2': (bz2.compress, bz2.decompress)}
+
+# the block offsets file holds nblocks + 1 offsets in this numeric type
+blockoffsetsdtype = np.dtype('<u8')
+
+
+def check_codec(codec):
+    if codec not in codecs:
+        raise ValueError(f"compression should be one of "
+                         f"{tuple(codecs.keys())}, not '{codec}'")
+    return codec
+
+
+def defaultblocklen(rowshape, dtype, blockbytes=2 ** 20):
+    """Number of rows in a block of approximately `blockbytes` bytes, but at
+    least 1."""
+    rowbytes = product(rowshape) * np.dtype(dtype).itemsize
+    return max(blockbytes // max(rowbytes, 1), 1)
+
+
+class BlockWriter:
+    """Writes chunks of rows of arbitrary length to a file as compressed
+    blocks of `blocklen` rows.
+
+    Parameters
+    ----------
+    fd: file object
+        Binary file opened for writing.
+    codec: {'zlib', 'lzma', 'bz2'}
+    blocklen: int
+        Number of rows per block.
+    level: <int, None>
+        Compression level, passed to the codec. Default is None, which means
+        the default level of the codec.
+
+    """
+
+    def __init__(self, fd, codec, blocklen, level=None):
+        compress, _ = codecs[check_codec(codec)]
+        if level is None:
+            self._compress = compress
+        elif codec == 'lzma':
+            self._compress = lambda data: compress(data, preset=level)
+        else:
+            self._compress = lambda data: compress(data, level)
+        self._fd = fd
+        self._blocklen = blocklen
+        self._pending = []
+        self._npending = 0
+        self.offsets = [0]
+
+    def _writeblock(self, rows):
+        data = self._compress(np.ascontiguousarray(rows).tobytes())
+        self._fd.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def write(self, array):
+        """Buffer rows and write all blocks that are complete."""
+        # copy, as generators may reuse the array for their next chunk
+        self._pending.append(np.array(array, copy=True))
+        self._npending += len(array)
+        if self._npending < self._blocklen:
+            return
+        # concatenate would convert to native byte order by default
+        rows = np.concatenate(self._pending, dtype=self._pending[0].dtype)
+        nfull = (len(rows) // self._blocklen) * self._blocklen
+        for start in range(0, nfull, self._blocklen):
+            self._writeblock(rows[start:start + self._blocklen])
+        self._pending = [rows[nfull:]]
+        self._npending = len(rows) - nfull
+
+    def close(self):
+        """Write the remaining rows as a last, smaller, block."""
+        if self._npending > 0:
+            self._writeblock(np.concatenate(self._pending,
+                                            dtype=self._pending[0].dtype))
+        self._pending = []
+        self._npending = 0
+
+
+class BlockCache:
+    """Thread-safe least-recently-used cache of decompressed blocks.
+
+    Parameters
+    ----------
+    maxblocks: int
+        Maximum number of blocks held.
+
+    """
+
+    def __init__(self, maxblocks):
+        self._maxblocks = maxblocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        with self._lock:
+            if key in self._blocks:
+                self._blocks.move_to_end(key)
+                return self._blocks[key]
+        block = load(key)  # outside lock, so that threads load in parallel
+        with self._lock:
+            self._blocks[key] = block
+            while len(self._blocks) > self._maxblocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+class BlockReader:
+    """Read-only array-like object that provides random access to a
+    block-compressed array file by decompressing only the blocks that are
+    needed.
+
+    Indexing works as for numpy arrays and returns numpy arrays. These may
+    be read-only views of cached blocks.
+
+    Parameters
+    ----------
+    fd: file object
+        Binary file with the compressed blocks, opened for reading.
+    offsets: numpy array
+        Byte offsets of the blocks in `fd`, with the end of the last block as
+        last element.
+    shape: tuple
+    dtype: numpy dtype
+    codec: {'zlib', 'lzma', 'bz2'}
+    blocklen: int
+        Number of rows per block.
+    cache: BlockCache
+    writeable: bool
+        Reported by the `flags` attribute, as for numpy arrays. Writing is
+        never possible; this reflects the access mode in which the array was
+        opened.
+
+    """
+
+    class _Flags:
+        def __init__(self, writeable):
+            self.writeable = writeable
+
+    def __init__(self, fd, offsets, shape, dtype, codec, blocklen, cache,
+                 writeable=False):
+        self._fd = fd
+        self._offsets = offsets
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = product(self.shape)
+        self.ndim = len(self.shape)
+        self.flags = self._Flags(writeable)
+        self._decompress = codecs[check_codec(codec)][1]
+        self._blocklen = blocklen
+        self._cache = cache
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _readbytes(self, offset, nbytes):
+        if hasattr(os, 'pread'):  # thread-safe, no shared file position
+            return os.pread(self._fd.fileno(), nbytes, offset)
+        with self._lock:
+            self._fd.seek(offset)
+            return self._fd.read(nbytes)
+
+    def _loadblock(self, blocknr):
+        start, end = int(self._offsets[blocknr]), \
+                     int(self._offsets[blocknr + 1])
+        data = self._decompress(self._readbytes(start, end - start))
+        nrows = min(self._blocklen, self.shape[0] - blocknr * self._blocklen)
+        rowbytes = product(self.shape[1:]) * self.dtype.itemsize
+        if len(data) != nrows * rowbytes:
+            raise ValueError(f"block {blocknr} has size {len(data)} after "
+                             f"decompression, expected {nrows * rowbytes}")
+        # frombuffer on bytes yields a read-only array, so that views of
+        # cached blocks cannot be modified
+        return np.frombuffer(data, dtype=self.dtype).reshape(
+            (nrows,) + self.shape[1:])
+
+    def _block(self, blocknr):
+        return self._cache.get(blocknr, self._loadblock)
+
+    def _gather(self, rows):
+        """Returns the blocks containing `rows` as one array, and the
+        positions of `rows` in it."""
+        blocknrs, inverse = np.unique(rows // self._blocklen,
+                                      return_inverse=True)
+        if len(blocknrs) == 0:
+            data = np.empty((0,) + self.shape[1:], dtype=self.dtype)
+        elif len(blocknrs) == 1:
+            data = self._block(blocknrs[0])
+        else:
+            data = np.concatenate([self._block(b) for b in blocknrs],
+                                  dtype=self.dtype)
+        # only the last block of the array can be shorter than blocklen
+        positions = inverse * self._blocklen + rows % self._blocklen
+        return data, positions
+
+    def _checkrows(self, rows):
+        n = self.shape[0]
+        if len(rows) > 0 and ((rows.min() < -n) or (rows.max() >= n)):
+            bad = rows[(rows < -n) | (rows >= n)][0]
+            raise IndexError(f"index {bad} is out of bounds for axis 0 "
+                             f"with size {n}")
+        return np.where(rows < 0, rows + n, rows)
+
+    def _normalizeindex(self, index):
+        """Private method to rewrite an index that starts with newaxis or
+        Ellipsis as the number of leading new axes, and an index that
+        starts with the selection along the first axis. Returns None if
+        that would change the result, which is the case when advanced
+        indices are separated from each other and new axes are added."""
+        nnew = 0
+        while (nnew < len(index)) and (index[nnew] is None):
+            nnew += 1
+        index = index[nnew:]
+        if index and (index[0] is Ellipsis):
+            rest = index[1:]
+            if any(i is Ellipsis for i in rest):
+                return None  # invalid, numpy raises the error
+            naxes = sum(i.ndim if (isinstance(i, np.ndarray) and
+                                   i.dtype == bool) else 1
+                        for i in rest if i is not None)
+            if naxes < self.ndim:  # the Ellipsis covers the first axis
+                index = (slice(None), Ellipsis) + rest
+            else:  # kept, as it makes numpy return arrays, not scalars
+                index = rest + (Ellipsis,)
+        if not index:
+            index = (slice(None),)
+        if (index[0] is None) or (index[0] is Ellipsis):
+            return None
+        if nnew > 0:
+            basic = (slice, int, np.integer, type(None), type(Ellipsis))
+            if not all(isinstance(i, basic) for i in index) and \
+                    sum(not isinstance(i, (slice, type(None),
+                                           type(Ellipsis))) for i in index) > 1:
+                return None
+        return nnew, index
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            index = (index,)
+        if len(index) == 0:
+            index = (slice(None),)
+        first, rest = index[0], index[1:]
+        if isinstance(first, (int, np.integer)):
+            row = int(self._checkrows(np.array([first]))[0])
+            block = self._block(row // self._blocklen)
+            return block[(row % self._blocklen,) + rest]
+        if isinstance(first, slice):
+            rows = np.arange(*first.indices(self.shape[0]))
+            data, positions = self._gather(rows)
+            if (len(positions) > 0) and (first.step in (None, 1)):
+                # contiguous rows, a view suffices
+                data = data[positions[0]:positions[-1] + 1]
+            else:
+                data = data[positions]
+            return data[(slice(None),) + rest]
+        if (first is None) or (first is Ellipsis):
+            normalized = self._normalizeindex(index)
+            if normalized is None:
+                return self[:][index]
+            nnew, index = normalized
+            values = self[index]
+            return values[(None,) * nnew] if nnew else values
+        first = np.asarray(first)
+        if first.size == 0 and first.dtype != bool:  # e.g. empty list
+            first = first.astype('int64')
+        if (first.dtype == bool) and (first.ndim != 1):
+            return self[:][index]
+        if first.dtype == bool:
+            if len(first) != self.shape[0]:
+                raise IndexError(f"boolean index did not match indexed "
+                                 f"array along dimension 0; dimension is "
+                                 f"{self.shape[0]} but corresponding "
+                                 f"boolean dimension is {len(first)}")
+            rows = np.flatnonzero(first)
+        elif first.dtype.kind in 'iu':
+            rows = self._checkrows(first.ravel().astype('int64'))
+        else:
+            raise IndexError("only integers, slices, ellipsis, numpy.newaxis "
+                             "and integer or boolean arrays are valid indices")
+        data, positions = self._gather(rows)
+        if first.dtype != bool:
+            positions = positions.reshape(first.shape)
+        return data[(positions,) + rest]
+
+    def __setitem__(self, index, value):
+        raise OSError("compressed darr arrays are read-only")
+
+    def _summarytxt(self):
+        return f"shape={self.shape}, dtype={self.dtype}"
+
+    def __repr__(self):
+        if self.size <= np.get_printoptions()['threshold']:
+            return repr(self[:])[len('array'):]
+        return f"({self._summarytxt()})"
+
+    def __str__(self):
+        if self.size <= np.get_printoptions()['threshold']:
+            return str(self[:])
+        return f"<compressed array, {self._summarytxt()}>"
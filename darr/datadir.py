@@ -1,10 +1,11 @@
 import json
-import tarfile
 import shutil
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
+from . import stats
 from .utils import filesha256, write_jsonfile
 
 class DataDir(object):
@@ -51,15 +52,21 @@ class DataDir(object):
 
     def read_jsonfile(self, filename):
         path = self._path.joinpath(filename)
+        starttime = stats.starttimer()
         with open(path, 'r') as fp:
-            return json.load(fp)
+            data = json.load(fp)
+            nbytes = fp.tell()
+        stats.record('datadir.read_json', starttime, nbytes=nbytes)
+        return data
 
     def _write_jsonfile(self, filename, data, sort_keys=True,
-                        skipkeys=False, indent=4, cls=None, overwrite=False):
+                        skipkeys=False, indent=4, cls=None, overwrite=False,
+                        atomic=False):
         path = self._path.joinpath(filename)
         write_jsonfile(path, data=data, sort_keys=sort_keys,
                        skipkeys=skipkeys, indent=indent,
-                       ensure_ascii=True, cls=cls, overwrite=overwrite)
+                       ensure_ascii=True, cls=cls, overwrite=overwrite,
+                       atomic=atomic)
 
     def write_jsonfile(self, filename, data, sort_keys=True,
                        skipkeys=False, indent=4, overwrite=False):
@@ -82,12 +89,12 @@ class DataDir(object):
         return d
 
     def _write_jsondict(self, filename, d, skipkeys=False,
-                        cls=None, overwrite=False):
+                        cls=None, overwrite=False, atomic=False):
         if not isinstance(d, dict):
             raise TypeError('json data must be a dictionary')
         return self._write_jsonfile(filename=filename, data=d,
                                     skipkeys=skipkeys, cls=cls,
-                                    overwrite=overwrite)
+                                    overwrite=overwrite, atomic=atomic)
 
     def write_jsondict(self, filename, d, skipkeys=False,
                        cls=None, overwrite=False):
@@ -108,10 +115,12 @@ class DataDir(object):
     def _write_txt(self, filename, text, overwrite=False):
         path = self._path.joinpath(filename)
         if not path.exists() or overwrite:
+            starttime = stats.starttimer()
             # utf-8 is ascii-compatible
             with open(path, 'w', encoding='utf-8') as f:
-                f.write(text)
+                nbytes = f.write(text)
                 f.flush()
+            stats.record('datadir.write_txt', starttime, nbytes=nbytes)
         else:
             raise OSError(f'File "{path}" exists, use `overwrite` parameter"')
 
@@ -124,11 +133,17 @@ class DataDir(object):
         with open(path, 'r') as fp:
             return fp.read()
 
-    def sha256checksums(self):
-        checksums = {}
-        for filepath in self.path.iterdir():
-            checksums[str(filepath)] = filesha256(filepath)
-        return checksums
+    def sha256checksums(self, workers=None):
+        """Checksums (sha256) of files, computed in parallel by `workers`
+        threads if provided."""
+        filepaths = list(self.path.iterdir())
+        if (workers is None) or (workers < 2):
+            checksums = map(filesha256, filepaths)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                checksums = list(pool.map(filesha256, filepaths))
+        return {str(fp): checksum for fp, checksum in zip(filepaths,
+                                                           checksums)}
 
     def _delete_files(self, filenames):
         for filename in filenames:
@@ -169,7 +184,8 @@ class DataDir(object):
                   closefd=closefd) as f:
             yield f
 
-    def archive(self, filepath=None, compressiontype='xz', overwrite=False):
+    def archive(self, filepath=None, compressiontype='xz', overwrite=False,
+                workers=None, blocksize=None):
         """Archive disk-based data into a single compressed file.
 
         Parameters
@@ -183,6 +199,16 @@ class DataDir(object):
             library.
         overwrite: (True, False), optional
             Overwrites existing archive if it exists. Default is False.
+        workers: <int, None>
+            Number of threads that compress in parallel. Default is None,
+            which means that the archive is compressed as one stream. If
+            larger than 1, blocks of the archive are compressed
+            independently and concatenated. The result is still a standard
+            compressed tar file, that can be decompressed in parallel by
+            `darr.extract_archive`.
+        blocksize: <int, None>
+            Size in bytes of the uncompressed blocks when compressing in
+            parallel. Default is None, which means 4 MiB.
 
         Returns
         -------
@@ -208,6 +234,15 @@ class DataDir(object):
             raise ValueError(f'"{compressiontype}" is not a valid '
                              f'compressiontype, use one of '
                              f'{supported_compressiontypes}.')
+        # archiving modules are only imported when needed, to keep importing
+        # darr fast
+        if (workers is not None) and (workers > 1):
+            from .archive import archive_parallel
+            return archive_parallel(self.path, filepath=filepath,
+                                    compressiontype=compressiontype,
+                                    overwrite=overwrite, workers=workers,
+                                    blocksize=blocksize)
+        import tarfile
         with tarfile.open(filepath, f"{filemode}:{compressiontype}") as tf:
             tf.add(self.path, arcname=self.path.name)
         return Path(filepath)
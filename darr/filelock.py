@@ -0,0 +1,207 @@
+"""Advisory locking of Darr arrays between processes.
+
+Arrays and ragged arrays have a lock file in their directory. Operations
+that change them hold an exclusive lock on it, so that processes that
+write to the same array at the same time do not interleave their writes.
+Readers may hold a shared lock to keep writers out while they read. Locks
+are advisory: they only exclude processes that use them, i.e. that use
+Darr.
+
+"""
+import errno
+import os
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+__all__ = ['FileLock']
+
+# errors of flock on file systems that do not support it
+_unsupportederrnos = {errno.ENOLCK, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+if fcntl is not None:
+    _LOCK_SH, _LOCK_EX, _LOCK_UN = fcntl.LOCK_SH, fcntl.LOCK_EX, fcntl.LOCK_UN
+else:
+    _LOCK_SH = _LOCK_EX = _LOCK_UN = None
+
+
+class FileLock:
+    """Advisory inter-process lock, based on `fcntl.flock` on a lock file.
+
+    Locks are reentrant. An exclusive lock may be requested while a shared
+    lock is held; the lock is then upgraded, and downgraded again when the
+    exclusive lock is released. Note that upgrading is not atomic: another
+    process may acquire the exclusive lock in between.
+
+    Locking also excludes other threads that use the same FileLock object,
+    also for shared locks. Different FileLock objects for the same file
+    exclude each other as if they were in different processes, so a thread
+    should not acquire one while holding another.
+
+    Where `fcntl.flock` is not available (Windows) or not supported by the
+    file system, locks only exclude threads. The same is true when the lock
+    file does not exist and cannot be created, e.g. in a read-only
+    directory.
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        Path to the lock file. It is created when the lock is first
+        acquired.
+
+    """
+
+    def __init__(self, path):
+        self._path = Path(path)
+        self._threadlock = threading.RLock()
+        self._fd = None
+        self._pid = None  # process that opened the lock file
+        self._modes = []  # stack of lock modes held; True is shared
+
+    def __del__(self):
+        fd = getattr(self, '_fd', None)
+        if (fd is not None) and (self._pid == os.getpid()):
+            os.close(fd)
+
+    def __repr__(self):
+        return f'FileLock at "{self._path}"'
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def mode(self):
+        """The mode in which the lock is held by this object, 'shared' or
+        'exclusive', or None if it is not held."""
+        if not self._modes:
+            return None
+        return 'shared' if all(self._modes) else 'exclusive'
+
+    def _openfd(self):
+        if fcntl is None:  # no need for a lock file
+            return None
+        # a file descriptor inherited by a forked process refers to the same
+        # open file as in the parent, which would share its locks
+        if (self._fd is not None) and (self._pid == os.getpid()):
+            return self._fd
+        self._fd = None
+        try:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o666)
+        except PermissionError:
+            if self._path.exists():
+                self._fd = os.open(self._path, os.O_RDONLY)
+        except FileNotFoundError:  # directory was deleted
+            pass
+        self._pid = os.getpid()
+        return self._fd
+
+    def _flock(self, operation, blocking=True):
+        """Private method to apply a flock operation (_LOCK_SH, _LOCK_EX or
+        _LOCK_UN) to the lock file, if supported."""
+        fd = self._fd
+        if fd is None:
+            return
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, operation)
+        except OSError as error:
+            if error.errno not in _unsupportederrnos:
+                raise
+
+    def acquire(self, shared=False, blocking=True):
+        """Acquire the lock.
+
+        Parameters
+        ----------
+        shared: bool, default False
+            Acquire a shared lock, which can be held by several processes
+            at the same time, instead of an exclusive lock.
+        blocking: bool, default True
+            Wait until the lock can be acquired. If False, and another
+            process holds the lock, BlockingIOError is raised.
+
+        Returns
+        -------
+        bool
+            True if the lock was acquired or upgraded by this call, False if
+            it was already held in the requested mode or an exclusive one.
+
+        """
+        if not self._threadlock.acquire(blocking=blocking):
+            raise BlockingIOError(f'{self} is held by another thread')
+        try:
+            if not self._modes:
+                self._openfd()
+                self._flock(_LOCK_SH if shared else _LOCK_EX,
+                            blocking=blocking)
+                acquired = True
+            elif not shared and all(self._modes):  # upgrade
+                self._flock(_LOCK_EX, blocking=blocking)
+                acquired = True
+            else:
+                acquired = False
+        except BaseException:
+            self._threadlock.release()
+            raise
+        self._modes.append(shared)
+        return acquired
+
+    def release(self):
+        """Release the lock, as acquired by the last call to `acquire`."""
+        if not self._modes:
+            raise RuntimeError(f'{self} is not held')
+        shared = self._modes.pop()
+        try:
+            if not self._modes:
+                self._flock(_LOCK_UN)
+            elif not shared and all(self._modes):  # downgrade
+                self._flock(_LOCK_SH)
+        finally:
+            self._threadlock.release()
+
+    def read_generation(self):
+        """Returns the generation number that is stored in the lock file.
+
+        Holders of the exclusive lock increment it (see
+        `increment_generation`) when they change what the lock protects, so
+        that others can find out cheaply whether anything changed since
+        they last held the lock. Returns None if there is no lock file,
+        in which case changes cannot be detected this way.
+
+        """
+        fd = self._fd
+        if (fd is None) or (self._pid != os.getpid()):
+            return None
+        return int.from_bytes(os.pread(fd, 8, 0), 'little')
+
+    def increment_generation(self):
+        """Increments the generation number that is stored in the lock file,
+        and returns the new number, or None if there is no lock file. Should
+        only be called while holding the exclusive lock."""
+        generation = self.read_generation()
+        if generation is None:
+            return None
+        generation = (generation + 1) % 2 ** 64
+        try:
+            os.pwrite(self._fd, generation.to_bytes(8, 'little'), 0)
+        except OSError:  # lock file opened read-only
+            return None
+        return generation
+
+    @contextmanager
+    def acquired(self, shared=False, blocking=True):
+        """Context manager that holds the lock. Yields the return value of
+        `acquire`."""
+        acquired = self.acquire(shared=shared, blocking=blocking)
+        try:
+            yield acquired
+        finally:
+            self.release()
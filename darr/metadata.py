@@ -1,7 +1,11 @@
 from pathlib import Path
+import copy
 import json
 
-from .utils import write_jsonfile, check_accessmode
+from contextlib import contextmanager, nullcontext
+
+from . import stats
+from .utils import write_jsonfile, check_accessmode, filestat
 
 
 class MetaData:
@@ -10,9 +14,34 @@ class MetaData:
     If there is no metadata, the metadata file does not exist, rather than
     being empty. This saves a block of disk space (potentially 4kb).
 
+    By default, metadata is cached in memory after it is read. The cache is
+    validated against the modification time and size of the metadata file
+    on every access, so that changes made by other means are still seen,
+    without reading and parsing the file again when it did not change. Use
+    `batch` to combine multiple updates in one write.
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+        Path to the metadata file.
+    accessmode: {'r', 'r+'}, default 'r'
+        File access mode of the data. `r` means read-only, `r+` means
+        read-write.
+    callatfilecreationordeletion: <callable, None>
+        Called without arguments when the metadata file is created or
+        deleted.
+    cache: bool, default True
+        Cache metadata in memory. If False, the metadata file is read for
+        every access.
+    lock: <darr.filelock.FileLock, None>
+        Lock that is held while metadata is changed, so that changes by
+        different processes do not overwrite each other. Default is None,
+        which means no locking.
+
     """
 
-    def __init__(self, path, accessmode='r', callatfilecreationordeletion=None):
+    def __init__(self, path, accessmode='r', callatfilecreationordeletion=None,
+                 cache=True, lock=None):
 
         path = Path(path)
         if callatfilecreationordeletion is None:
@@ -20,6 +49,12 @@ class MetaData:
         self._path = path
         self._accessmode = check_accessmode(accessmode)
         self._callatfilecreationordeletion = callatfilecreationordeletion
+        self._cache = cache
+        self._lock = lock
+        self._cachedmetadata = None
+        self._cachedfilestat = None
+        self._batchmetadata = None  # metadata pending within batch context
+        self._batchchanged = False
 
     @property
     def path(self):
@@ -44,7 +79,8 @@ class MetaData:
         self._accessmode = check_accessmode(value)
 
     def __getitem__(self, item):
-        return self._read()[item]
+        # copy, so that changing mutable values does not change the cache
+        return copy.deepcopy(self._load()[item])
 
     def __setitem__(self, key, value):
         self.update({key: value})
@@ -53,27 +89,116 @@ class MetaData:
         self.pop(key)
 
     def __len__(self):
-        return len(self.keys())
+        return len(self._load())
 
     def __repr__(self):
-        return str(self._read())
+        return str(self._load())
 
     def __contains__(self, item):
-        return item in self.keys()
+        return item in self._load()
 
     __str__ = __repr__
 
-    def _read(self):
+    def _readfile(self):
         if not self._path.exists():
             return {}
+        starttime = stats.starttimer()
         with open(self._path, 'r') as fp:
-            return json.load(fp)
+            data = json.load(fp)
+            nbytes = fp.tell()
+        stats.record('metadata.read', starttime, nbytes=nbytes)
+        return data
+
+    def _load(self):
+        """Returns the metadata dictionary, which may be the cached object
+        itself and should not be modified."""
+        if self._batchmetadata is not None:
+            return self._batchmetadata
+        if not self._cache:
+            return self._readfile()
+        stat = filestat(self._path)
+        if stat is None:
+            self._cachedmetadata, self._cachedfilestat = None, None
+            return {}
+        if stat != self._cachedfilestat:
+            self._cachedmetadata = self._readfile()
+            self._cachedfilestat = stat
+        return self._cachedmetadata
+
+    def _read(self):
+        """Returns a copy of the metadata dictionary that can be modified."""
+        return copy.deepcopy(self._load())
+
+    def _check_writeable(self):
+        if self._accessmode == 'r':
+            raise OSError("metadata not writeable; change 'accessmode' to "
+                          "'r+'")
+
+    def _locked(self):
+        """Private method that returns a context manager that holds the lock,
+        if any, while metadata is read, changed and written."""
+        if self._lock is None:
+            return nullcontext()
+        return self._lock.acquired()
+
+    def _write(self, metadata):
+        """Writes metadata to disk, or deletes the file if there is none. It
+        is only kept in memory within the context of `batch`."""
+        if self._batchmetadata is not None:
+            self._batchmetadata = metadata
+            self._batchchanged = True
+            return
+        fileexisted = self._path.exists()
+        if metadata:
+            write_jsonfile(self.path, data=metadata, sort_keys=True,
+                           ensure_ascii=True, overwrite=True, atomic=True)
+        elif fileexisted:
+            self._path.unlink()
+        # values are read back as JSON types (e.g. numpy arrays as lists)
+        self._cachedmetadata, self._cachedfilestat = None, None
+        if fileexisted != bool(metadata):
+            self._callatfilecreationordeletion()
+
+    @contextmanager
+    def batch(self):
+        """Context manager that combines all updates to the metadata within
+        it into one write when the context exits.
+
+        The file is replaced atomically, so that other readers see either
+        the old or the new metadata. If an exception occurs within the
+        context, the updates are discarded.
+
+        Examples
+        --------
+        >>> import darr
+        >>> a = darr.create_array('test.darr', shape=(12,), accessmode='r+')
+        >>> with a.metadata.batch():
+        ...     a.metadata['samplingrate'] = 22050
+        ...     a.metadata['starttime'] = '2017-08-31T17:00:00'
+        ...     a.metadata.pop('obsolete', None)
+
+        """
+        self._check_writeable()
+        if self._batchmetadata is not None:  # nested
+            yield self
+            return
+        with self._locked():
+            self._batchmetadata = self._read()
+            self._batchchanged = False
+            try:
+                yield self
+            except BaseException:
+                self._batchmetadata = None
+                raise
+            metadata, self._batchmetadata = self._batchmetadata, None
+            if self._batchchanged:
+                self._write(metadata)
 
     def get(self, *args):
         """metadata.get(k[,d]) -> D[k] if k in D, else d.  d defaults to None.
 
         """
-        return self._read().get(*args)
+        return copy.deepcopy(self._load().get(*args))
 
     def items(self):
         """a set-like object providing a view on D's items"""
@@ -81,7 +206,7 @@ class MetaData:
 
     def keys(self):
         """D.keys() -> a set-like object providing a view on D's keys"""
-        return self._read().keys()
+        return dict(self._load()).keys()
 
     # FIXME remove overlap with popitem
     def pop(self, *args):
@@ -89,34 +214,22 @@ class MetaData:
         value. If key is not found, d is returned if given, otherwise KeyError
         is raised
         """
-        if self._accessmode == 'r':
-            raise OSError("metadata not writeable; change 'accessmode' to "
-                          "'r+'")
-        metadata = self._read()
-        val = metadata.pop(*args)
-        if metadata:
-            write_jsonfile(self.path, data=metadata, sort_keys=True,
-                           ensure_ascii=True, overwrite=True)
-        else:
-            self._path.unlink()
-            self._callatfilecreationordeletion()
+        self._check_writeable()
+        with self._locked():
+            metadata = self._read()
+            val = metadata.pop(*args)
+            self._write(metadata)
         return val
 
     def popitem(self):
         """D.pop() -> k, v, returns and removes an arbitrary element (key,
         value) pair from the dictionary.
         """
-        if self._accessmode == 'r':
-            raise OSError("metadata not writeable; change 'accessmode' to "
-                          "'r+'")
-        metadata = self._read()
-        key, val = metadata.popitem()
-        if metadata:
-            write_jsonfile(self.path, data=metadata, sort_keys=True,
-                           ensure_ascii=True, overwrite=True)
-        else:
-            self._path.unlink()
-            self._callatfilecreationordeletion()
+        self._check_writeable()
+        with self._locked():
+            metadata = self._read()
+            key, val = metadata.popitem()
+            self._write(metadata)
         return key, val
 
     def values(self):
@@ -125,7 +238,7 @@ class MetaData:
     def update(self, *arg, **kwargs):
         """Updates metadata.
 
-        Metadata are written to disk.
+        Metadata are written to disk, unless within the context of `batch`.
 
         Parameters
         ----------
@@ -148,14 +261,8 @@ class MetaData:
         {'samplingrate': 22050, 'starttime': '2017-08-31T17:00:00'}
 
         """
-        if self._accessmode == 'r':
-            raise OSError("metadata not writeable; change 'accessmode' to "
-                          "'r+'")
-        metadata = self._read()
-        metadata.update(*arg, **kwargs)
-
-        write_jsonfile(self.path, data=metadata, sort_keys=True,
-                       ensure_ascii=True, overwrite=True)
-        if metadata:
-            self._callatfilecreationordeletion()
-
+        self._check_writeable()
+        with self._locked():
+            metadata = self._read()
+            metadata.update(*arg, **kwargs)
+            self._write(metadata)
@@ -1,16 +1,18 @@
 from pathlib import Path
 from contextlib import contextmanager
+from collections import OrderedDict
 import warnings
 import numpy as np
-from ._version import get_versions
 
-from .array import Array, asarray, check_accessmode, delete_array, \
-    create_array, truncate_array
+from .array import Array, AppendDataError, asarray, check_accessmode, \
+    delete_array, create_array, truncate_array, _ReadcodeTxtArray, \
+    _filltemplate, _lengthnumbers, _lengthtemplate
 from .datadir import DataDir, create_datadir
+from .filelock import FileLock
 from .metadata import MetaData
 from .readcoderaggedarray import readcode, readcodefunc, \
     shapeindexexplanationtextraggedarray
-from .utils import wrap
+from .utils import darrversion, wrap, prefetching, product
 
 __all__ = ['RaggedArray', 'asraggedarray', 'create_raggedarray',
            'delete_raggedarray', 'truncate_raggedarray']
@@ -56,8 +58,9 @@ class RaggedArray:
     documenting the data format, including code to read the array data in other
     programming languages.
 
-    A RaggedArray can be indexed with an integer to get the subarrays as NumPy
-    arrays.
+    A RaggedArray can be indexed with an integer to get a subarray as a NumPy
+    array. Indexing with a slice, a sequence of integers or a boolean mask
+    returns a list of subarrays.
 
     Parameters
     ----------
@@ -68,6 +71,15 @@ class RaggedArray:
        read-write. `w` does not exist. To create new darr arrays, potentially
        overwriting an other one, use the `asarray` or `create_array`
        functions.
+    swmr : bool, default False
+       Single-writer/multiple-reader mode, for reading a ragged array while
+       another process appends to it. Use `refresh` to pick up new
+       subarrays. See `Array` for details.
+
+    Operations that change a ragged array hold exclusive locks on the lock
+    files ('darr.lock') in its directory and in those of its values and
+    indices arrays, so that processes that change the same ragged array at
+    the same time do not corrupt it. See `locked`.
 
     Examples
     --------
@@ -79,6 +91,8 @@ class RaggedArray:
     >>> ra = darr.RaggedArray('test.darr')
     >>> ra[1] # will return a NumPy array
     array([1, 2, 3, 4], dtype=int32)
+    >>> ra[1:] # will return a list of NumPy arrays
+    [array([1, 2, 3, 4], dtype=int32), array([5, 6, 7], dtype=int32)]
 
 
     """
@@ -87,12 +101,12 @@ class RaggedArray:
     _arraydescrfilename = 'arraydescription.json'
     _metadatafilename = 'metadata.json'
     _readmefilename = 'README.txt'
+    _lockfilename = 'darr.lock'
     _protectedfiles = {_valuesdirname, _indicesdirname,
                        _readmefilename, _metadatafilename,
-                       _arraydescrfilename}
-    _formatversion = get_versions()['version']
+                       _arraydescrfilename, _lockfilename}
 
-    def __init__(self, path, accessmode='r'):
+    def __init__(self, path, accessmode='r', swmr=False):
 
         self._datadir = DataDir(path=path,
                                 protectedpaths=self._protectedfiles)
@@ -101,18 +115,46 @@ class RaggedArray:
         self._valuespath = self._path / self._valuesdirname
         self._indicespath = self._path / self._indicesdirname
         self._arraydescrpath = self._path / self._arraydescrfilename
-        self._values = Array(self._valuespath, accessmode=self._accessmode)
-        self._indices = Array(self._indicespath, accessmode=self._accessmode)
+        self._lock = FileLock(self._path / self._lockfilename)
+        # indices are opened before values, as a writer appends values
+        # first, so that all indexed values are present
+        self._indices = Array(self._indicespath, accessmode=self._accessmode,
+                              swmr=swmr)
+        self._values = Array(self._valuespath, accessmode=self._accessmode,
+                             swmr=swmr)
         self._metadata = MetaData(self._path / self._metadatafilename,
-                                  accessmode=accessmode)
+                                  accessmode=accessmode, lock=self._lock)
         arrayinfo = {}
         arrayinfo['len'] = len(self._indices)
         arrayinfo['size'] = self._values.size
         arrayinfo['atom'] = self._values.shape[1:]
         arrayinfo['numtype'] = self._values._arrayinfo['numtype']
-        arrayinfo['darrversion'] = RaggedArray._formatversion
+        arrayinfo['darrversion'] = darrversion()
         arrayinfo['darrobject'] = 'RaggedArray'
         self._arrayinfo = arrayinfo
+        self._deferupdates = False
+        self._updatespending = False
+        self._readmetxt = None  # last written README text
+        if self._values._recovered or self._indices._recovered:
+            with self.locked():
+                self._recover()
+
+    def _recover(self):
+        """Private method to restore consistency after deferred updates were
+        interrupted. Values are always written before indices, so values that
+        are not indexed yet are not part of the ragged array.
+
+        """
+        if len(self._indices) > 0:
+            valueslen = int(self._indices[-1][1])
+        else:
+            valueslen = 0
+        if self._accessmode == 'r+':
+            if len(self._values) > valueslen:
+                truncate_array(self._values, valueslen)
+            self._update_arraydescr(len=len(self._indices),
+                                    size=self._values.size)
+            self._update_readmetxt()
 
     @property
     def accessmode(self):
@@ -191,11 +233,44 @@ class RaggedArray:
         return tuple(sorted(languages))
 
     def __getitem__(self, item):
-        if not np.issubdtype(type(item), np.integer):
-            raise TypeError("Only integers can be used for indexing " \
-                            "RaggedArrays, which '{}' is not".format(item))
-        index = slice(*self._indices[item])
-        return self._values[index]
+        if np.issubdtype(type(item), np.integer):
+            with self.open_arrays() as ((iv, vv), _):
+                start, end = iv[item]
+                return np.array(vv[start:end], copy=True)
+        if isinstance(item, tuple):
+            raise TypeError("RaggedArrays can only be indexed along their "
+                            "first axis; index the subarrays instead")
+        if not isinstance(item, slice):
+            item = np.asarray(item)
+            if item.size == 0:
+                item = item.astype(np.int64)
+            if (item.ndim != 1) or not (np.issubdtype(item.dtype, np.integer)
+                                        or item.dtype == bool):
+                raise TypeError(f"Only integers, slices, one-dimensional "
+                                f"integer arrays and boolean masks can be "
+                                f"used for indexing RaggedArrays, which "
+                                f"'{item}' is not")
+        with self.open_arrays() as ((iv, vv), _):
+            return self._readsubarrays(vv, np.asarray(iv[item]))
+
+    @staticmethod
+    def _readsubarrays(vv, indices):
+        """Private method to read subarrays from the values array, given
+        their start and end indices. Subarrays that are stored contiguously
+        are read together in one block, which is then split.
+
+        """
+        starts = indices[:, 0].astype(np.int64)
+        ends = indices[:, 1].astype(np.int64)
+        subarrays = []
+        if len(indices) == 0:
+            return subarrays
+        runstarts = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        for run in np.split(np.arange(len(indices)), runstarts):
+            blockstart = starts[run[0]]
+            block = np.array(vv[blockstart:ends[run[-1]]], copy=True)
+            subarrays.extend(np.split(block, ends[run[:-1]] - blockstart))
+        return subarrays
 
     def __len__(self):
         return self._indices.shape[0]
@@ -208,24 +283,154 @@ class RaggedArray:
 
     def _update_readmetxt(self):
         txt = readcodetxt(self)
-        self._datadir._write_txt(self._readmefilename, txt, overwrite=True)
+        if txt != self._readmetxt:  # only write when it changes
+            self._datadir._write_txt(self._readmefilename, txt,
+                                     overwrite=True)
+            self._readmetxt = txt
 
     def _update_arraydescr(self, **kwargs):
         self._arrayinfo.update(kwargs)
         self._datadir._write_jsondict(filename=self._arraydescrfilename,
-                                      d=self._arrayinfo, overwrite=True)
+                                      d=self._arrayinfo, overwrite=True,
+                                      atomic=True)
+
+    def refresh(self):
+        """Update the ragged array to reflect subarrays appended by another
+        process. This is cheap when nothing changed. See `Array.refresh`.
 
-    # TODO this can be made more efficient by using _append on self._values
-    #  and self._indices and returning length increases
+        Returns
+        -------
+        int
+            The number of subarrays that were added.
+
+        """
+        # indices first, so that all indexed values are present
+        lenincrease = self._indices.refresh()
+        self._values.refresh()
+        self._arrayinfo.update(len=len(self._indices),
+                               size=self._values.size)
+        return lenincrease
+
+    @contextmanager
+    def locked(self, shared=False):
+        """Context manager that holds the locks of the ragged array and its
+        values and indices arrays, so that other processes cannot change it
+        in the meantime. The ragged array is brought up to date with changes
+        made by other processes when the lock is acquired. See
+        `Array.locked`.
+
+        Parameters
+        ----------
+        shared: bool, default False
+            Acquire shared locks instead of exclusive locks. Several
+            processes can hold a shared lock at the same time.
 
-    def _append(self, array, fdv, fdi, vlen):
-        size = len(array)
-        #endindex = self._values._memmap.shape[0]
-        vlenincr = self._values._append(np.asarray(array, dtype=self.dtype),
-                                        fdv)
-        ilenincr = self._indices._append([[vlen, vlen + size]], fdi)
+        """
+        # always in the same order, to avoid deadlocks
+        with self._lock.acquired(shared=shared), \
+                self._values.locked(shared=shared), \
+                self._indices.locked(shared=shared):
+            self._arrayinfo.update(len=len(self._indices),
+                                   size=self._values.size)
+            yield self
+
+    def _update_len(self):
+        """Private method to update array description and README.txt after a
+        change in length, or to mark them as pending when updates are
+        deferred."""
+        lenandsize = {'len': len(self._indices), 'size': self._values.size}
+        if self._deferupdates:
+            self._arrayinfo.update(lenandsize)
+            self._updatespending = True
+        else:
+            self._update_arraydescr(**lenandsize)
+            self._update_readmetxt()
+
+    def flush(self):
+        """Write the array descriptions and README.txt files of the ragged
+        array and its underlying values and indices arrays to disk if
+        updates to them are pending, which is only the case within the
+        context of `deferred_updates`.
+
+        """
+        if not (self._updatespending or self._values._updatespending or
+                self._indices._updatespending):
+            return
+        with self.locked():
+            self._values.flush()
+            self._indices.flush()
+            if self._updatespending:
+                self._update_arraydescr(len=len(self._indices),
+                                        size=self._values.size)
+                self._update_readmetxt()
+                self._updatespending = False
+
+    @contextmanager
+    def deferred_updates(self):
+        """Context manager that defers updating the array description files
+        and README.txt files when subarrays are appended.
+
+        Normally, these files are rewritten after every `append` or
+        `iterappend` call, for the ragged array as well as for its
+        underlying values and indices arrays. Within this context, changes
+        are only kept in memory and the files are written once when the
+        context exits, or when `flush` is called. See
+        `Array.deferred_updates` for how the length of the ragged array is
+        recovered if the process crashes within the context.
+
+        Examples
+        --------
+        >>> import darr
+        >>> ra = darr.create_raggedarray('test.darr', atom=(), dtype='int64')
+        >>> with ra.deferred_updates():
+        ...     for i in range(1000):
+        ...         ra.append([i, i+1])
+        >>> len(ra)
+        1000
+
+        """
+        if self._deferupdates:  # nested, outer context takes care
+            yield
+            return
+        self._deferupdates = True
+        try:
+            with self._values.deferred_updates(), \
+                    self._indices.deferred_updates():
+                yield
+        finally:
+            self._deferupdates = False
+            self.flush()
+
+    def _appendbatch(self, arrays, fdv, fdi, vlen):
+        """Private method to append a batch of subarrays. Their values and
+        their indices are each written to disk as one contiguous block.
+        Subarrays should already be checked for compliance. Does *not*
+        update attributes, json array info files, or readme files.
+
+        """
+        lengths = np.fromiter((len(a) for a in arrays), dtype=np.int64,
+                              count=len(arrays))
+        ends = vlen + np.cumsum(lengths)
+        if len(ends) > 0 and ends[-1] > np.iinfo(self._indices.dtype).max:
+            raise OverflowError(f"ragged array too large for its index type "
+                                f"'{self._indices.dtype.name}'")
+        indices = np.empty((len(arrays), 2), dtype=self._indices.dtype)
+        indices[:, 0] = ends - lengths
+        indices[:, 1] = ends
+        vlenincr = self._values._append(np.concatenate(arrays), fdv)
+        ilenincr = self._indices._append(indices, fdi)
         return (vlenincr, ilenincr)
 
+    def _checkarrayforappend(self, array):
+        """Private method to format a subarray correctly for appending.
+        Unlike for Array, scalars are not accepted, as subarrays have at
+        least one dimension."""
+        array = np.asarray(array, dtype=self._values.dtype)
+        if array.ndim == 0:
+            raise TypeError(f"subarray should have at least one dimension; "
+                            f"'{array}' is a scalar")
+        return self._values._checkarrayforappend(array)
+
     def append(self, array):
         """Append array-like objects to the ragged array.
 
@@ -247,20 +452,16 @@ class RaggedArray:
             None
 
         """
-        with self.open_arrays() as ((iv, vv), (fdv, fdi)):
-            vlen = self._values.shape[0]
-            vlenincr, ilenincr = self._append(array, fdv, fdi, vlen)
-            self._values._update_len(lenincrease=vlenincr)
-            self._indices._update_len(lenincrease=ilenincr)
-            self._update_readmetxt()
-            self._update_arraydescr(len=len(self._indices),
-                                    size=self._values.size)
+        self.iterappend([array])
 
-    def copy(self, path, dtype=None, accessmode='r', overwrite=False):
+    def copy(self, path, dtype=None, chunklen=None, accessmode='r',
+             overwrite=False):
         """Copy darr to a different path, potentially changing its dtype.
 
-        The copying is performed in chunks to avoid RAM memory overflow for
-        very large darr arrays.
+        The values and indices arrays are copied as a whole, using fast
+        operating system functions where available. If the dtype changes,
+        values are converted in chunks to avoid RAM memory overflow for very
+        large darr arrays.
 
         Parameters
         ----------
@@ -268,6 +469,10 @@ class RaggedArray:
         dtype: <dtype, None>
             Numpy data type of the copy. Default is None, which corresponds to
             the dtype of the darr to be copied.
+        chunklen: <int, None>
+            The length of chunks of values that are converted when the dtype
+            changes. If None, it is chosen so that chunks are 10 Mb in total
+            size.
         accessmode: {'r', 'r+'}, default 'r'
             File access mode of the darr data of the returned Darr
             object. `r` means read-only, `r+` means read-write.
@@ -279,17 +484,35 @@ class RaggedArray:
 
         Returns
         -------
-        Array
-           copy of the darr array
+        RaggedArray
+           copy of the darr ragged array
 
         """
-        arrayiterable = (self[i] for i in range(len(self)))
+        path = Path(path)
+        if path == self.path:
+            raise ValueError(f"'{path}' is the same as the path of the "
+                             f"source darr.")
+        bd = create_datadir(path=path, overwrite=overwrite)
+        valuesda = self._values.copy(path=bd.path / self._valuesdirname,
+                                     dtype=dtype, chunklen=chunklen,
+                                     overwrite=overwrite)
+        self._indices.copy(path=bd.path / self._indicesdirname,
+                           overwrite=overwrite)
+        datainfo = dict(self._arrayinfo)
+        datainfo['numtype'] = valuesda._arrayinfo['numtype']
+        datainfo['darrversion'] = darrversion()
+        bd._write_jsondict(filename=self._arraydescrfilename, d=datainfo,
+                           overwrite=overwrite)
         metadata = dict(self.metadata)
-        if dtype is None:
-            dtype = self.dtype
-        return asraggedarray(path=path, arrayiterable=arrayiterable,
-                             dtype=dtype, metadata=metadata,
-                             accessmode=accessmode, overwrite=overwrite)
+        metadatapath = path.joinpath(self._metadatafilename)
+        if metadata:
+            bd._write_jsondict(filename=self._metadatafilename, d=metadata,
+                               overwrite=overwrite)
+        elif metadatapath.exists():  # no metadata but file exists, remove it
+            metadatapath.unlink()
+        ra = RaggedArray(path=path, accessmode=accessmode)
+        ra._update_readmetxt()
+        return ra
 
     @contextmanager
     def _view(self, accessmode=None):
@@ -307,7 +530,7 @@ class RaggedArray:
             yield (iv, vv), (fdv, fdi)
 
     def iter_arrays(self, startindex=0, endindex=None, stepsize=1,
-                 accessmode=None):
+                 accessmode=None, prefetch=None):
         """Iterate over ragged array yielding subarrays.
 
         startindex: <int, None>
@@ -319,45 +542,112 @@ class RaggedArray:
         stepsize: <int, None>
             Size of the shift per iteration across the first axis.
             Default is None, which means that `stepsize` equals `chunklen`.
+        prefetch: <int, None>
+            Number of subarrays to read ahead in a background thread, so
+            that reading from disk overlaps with processing the current
+            subarray. Default is None, which means that subarrays are only
+            read when they are requested.
 
         """
-
+        if (prefetch is not None) and (prefetch < 0):
+            raise ValueError(f"'prefetch' cannot be negative ({prefetch})")
         if endindex is None:
             endindex = self.narrays
         with self.open_arrays(accessmode=accessmode):
-            for i in range(startindex, endindex, stepsize):
-                yield np.array(self[i], copy=True)
+            # indexing already returns copies
+            arrays = (self[i] for i in range(startindex, endindex, stepsize))
+            if prefetch:
+                arrays = prefetching(arrays, prefetch)
+            yield from arrays
 
-    def iterappend(self, arrayiterable):
+    def iterappend(self, arrayiterable, batchlen=1024):
         """Iteratively append data from a data iterable.
 
         The iterable has to yield array-like objects compliant with darr.
         The length of first dimension of these objects may be different,
         but the length of other dimensions, if any, has to be the same.
 
+        Subarrays are collected in batches, the values and indices of which
+        are written to disk in one go. This is much faster than writing them
+        one by one when there are many short subarrays.
+
         Parameters
         ----------
         arrayiterable: an iterable that yield array-like objects
+        batchlen: int, optional
+            The maximum number of subarrays in a batch. A batch is also
+            written when its values exceed 8 Mb. Default is 1024.
 
         Returns
         -------
             None
 
-        """
+        Raises
+        ------
+        AppendDataError
+            If appending fails halfway. Subarrays that were completely
+            written before the failure remain appended.
 
+        """
+        if self._accessmode != 'r+':
+            raise OSError(f"Accesmode should be 'r+' "
+                          f"(now is '{self._accessmode}')")
+        if not hasattr(arrayiterable, '__iter__'):
+            raise TypeError("'arrayiterable' is not iterable")
+        with self.locked():
+            self._iterappend(arrayiterable, batchlen=batchlen)
+
+    def _iterappend(self, arrayiterable, batchlen):
+        """Private method that does the work of `iterappend`, while the
+        ragged array is locked."""
+        maxbatchbytes = 8 * 1024 ** 2
+        vlenincr = 0
+        ilenincr = 0
         with self.open_arrays() as ((iv, vv), (fdv, fdi)):
-            vlenincr = 0
-            ilenincr = 0
             vlen = self._values.shape[0]
-            for a in arrayiterable:
-                vli, ili = self._append(a, fdv, fdi, vlen+vlenincr)
-                vlenincr += vli
-                ilenincr += ili
+            ilen = self._indices.shape[0]
+            batch = []
+            batchbytes = 0
+            try:
+                try:
+                    for a in arrayiterable:
+                        a = self._checkarrayforappend(a)
+                        batch.append(a)
+                        batchbytes += a.nbytes
+                        if len(batch) >= batchlen or \
+                                batchbytes >= maxbatchbytes:
+                            arrays, batch, batchbytes = batch, [], 0
+                            vli, ili = self._appendbatch(arrays, fdv, fdi,
+                                                         vlen + vlenincr)
+                            vlenincr += vli
+                            ilenincr += ili
+                finally:
+                    # also write what we have if the iterable fails
+                    if batch:
+                        arrays, batch = batch, []
+                        vli, ili = self._appendbatch(arrays, fdv, fdi,
+                                                     vlen + vlenincr)
+                        vlenincr += vli
+                        ilenincr += ili
+            except Exception as exception:
+                # a batch may have been written partially, e.g. its values
+                # but not its indices; only complete batches are kept
+                for a, fd, nrows in ((self._values, fdv, vlen + vlenincr),
+                                     (self._indices, fdi, ilen + ilenincr)):
+                    fd.flush()
+                    fd.truncate(nrows * product(a.shape[1:]) *
+                                a.dtype.itemsize)
+                oldlen = len(self)
+                self._values._update_len(lenincrease=vlenincr)
+                self._indices._update_len(lenincrease=ilenincr)
+                self._update_len()
+                s = f"{exception}\nAppending of data did not (completely) " \
+                    f"succeed. Length of ragged array was {oldlen} and is " \
+                    f"now {len(self)} after appending {ilenincr} subarrays."
+                raise AppendDataError(s) from exception
         self._values._update_len(lenincrease=vlenincr)
         self._indices._update_len(lenincrease=ilenincr)
-        self._update_arraydescr(len=len(self._indices),
-                                size=self._values.size)
-        self._update_readmetxt()
+        self._update_len()
 
     def readcode(self, language, abspath=False, basepath=None):
         """Generate code to read the array in a different language.
@@ -399,7 +689,46 @@ class RaggedArray:
                              f'from {readcodefunc.keys()}')
         return readcode(self, language, basepath=basepath, abspath=abspath)
 
-    def archive(self, filepath=None, compressiontype='xz', overwrite=False):
+    def update_checksums(self, workers=None):
+        """Compute SHA-256 checksums of the values and indices data in blocks
+        and store them in manifest files. See `Array.update_checksums`; the
+        manifests are kept up to date automatically when subarrays are
+        appended.
+
+        Parameters
+        ----------
+        workers: <int, None>
+            Number of threads that compute checksums in parallel. Default is
+            None, which means 1.
+
+        """
+        self._values.update_checksums(workers=workers)
+        self._indices.update_checksums(workers=workers)
+
+    def verify_checksums(self, workers=None):
+        """Verify the values and indices data against the checksums that
+        were stored by `update_checksums`.
+
+        Parameters
+        ----------
+        workers: <int, None>
+            Number of threads that compute checksums in parallel. Default is
+            None, which means 1.
+
+        Returns
+        -------
+        dict
+            With keys 'values' and 'indices', holding lists of tuples with
+            the start and end index of each block of rows of the underlying
+            arrays of which the checksum does not match. The lists are
+            empty if the data is intact.
+
+        """
+        return {'values': self._values.verify_checksums(workers=workers),
+                'indices': self._indices.verify_checksums(workers=workers)}
+
+    def archive(self, filepath=None, compressiontype='xz', overwrite=False,
+                workers=None, blocksize=None):
         """Archive ragged array data into a single compressed file.
 
         Parameters
@@ -413,6 +742,16 @@ class RaggedArray:
             library.
         overwrite: (True, False), optional
             Overwrites existing archive if it exists. Default is False.
+        workers: <int, None>
+            Number of threads that compress in parallel. Default is None,
+            which means that the archive is compressed as one stream. If
+            larger than 1, blocks of the archive are compressed
+            independently and concatenated. The result is still a standard
+            compressed tar file, that can be decompressed in parallel by
+            `darr.extract_archive`.
+        blocksize: <int, None>
+            Size in bytes of the uncompressed blocks when compressing in
+            parallel. Default is None, which means 4 MiB.
 
         Returns
         -------
@@ -429,7 +768,9 @@ class RaggedArray:
         """
         return self._datadir.archive(filepath=filepath,
                                      compressiontype=compressiontype,
-                                     overwrite=overwrite)
+                                     overwrite=overwrite,
+                                     workers=workers,
+                                     blocksize=blocksize)
 
 
 # FIXME empty arrayiterable
@@ -492,26 +833,12 @@ def asraggedarray(path, arrayiterable, dtype=None, metadata=None,
     indicesda = asarray(path=indicespath, array=firstindices,
                         dtype=indextype, accessmode='r+',
                         overwrite=overwrite)
-    valueslen = firstindices[0][1]
-    indiceslen = 1
-    with valuesda._open_array(accessmode='r+') as (_, vfd), \
-         indicesda._open_array(accessmode='r+') as (_, ifd):
-        for array in arrayiterable:
-            lenincreasevalues = valuesda._append(array, fd=vfd)
-            starti, endi = valueslen, valueslen + lenincreasevalues
-            lenincreaseindices = indicesda._append([[starti, endi]], fd=ifd)
-            valueslen += lenincreasevalues
-            indiceslen += lenincreaseindices
-    valuesda._update_len(lenincrease=valueslen-firstindices[0][1])
-    valuesda._update_readmetxt()
-    indicesda._update_len(lenincrease=indiceslen-1)
-    indicesda._update_readmetxt()
     datainfo = {}
     datainfo['len'] = len(indicesda)
     datainfo['size'] = valuesda.size
     datainfo['atom'] = valuesda.shape[1:]
     datainfo['numtype'] = valuesda._arrayinfo['numtype']
-    datainfo['darrversion'] = Array._formatversion
+    datainfo['darrversion'] = darrversion()
     datainfo['darrobject'] = 'RaggedArray'
     bd._write_jsondict(filename=RaggedArray._arraydescrfilename,
                        d=datainfo, overwrite=overwrite)
@@ -521,8 +848,9 @@ def asraggedarray(path, arrayiterable, dtype=None, metadata=None,
                            d=metadata, overwrite=overwrite)
     elif metadatapath.exists():  # no metadata but file exists, remove it
         metadatapath.unlink()
-    ra = RaggedArray(path=path, accessmode=accessmode)
-    ra._update_readmetxt()
+    ra = RaggedArray(path=path, accessmode='r+')
+    # also writes the array descriptions and README files
+    ra.iterappend(arrayiterable)
     return RaggedArray(path=path, accessmode=accessmode)
 
 
@@ -578,7 +906,7 @@ def create_raggedarray(path, atom=(), dtype='float64', metadata=None,
                        overwrite=overwrite)
     # the current ragged array has one element, which is an empty array
     # but we want an empty ragged array => we should get rid of the indices
-    create_array(path=ra._indicespath, shape=(0,2), dtype=np.int64,
+    create_array(path=ra._indicespath, shape=(0,2), dtype=indextype,
                  overwrite=True)
     ra._update_arraydescr(len=0, size=0)
     return RaggedArray(ra.path, accessmode=accessmode)
@@ -660,19 +988,97 @@ def dimensionstxt(ra, firstnmax=5):
     return '\n'.join(lines)
 
 
+# code sections of README texts of ragged arrays, by the properties that
+# they depend on, with placeholder lengths
+_readcodetxtcache = OrderedDict()
+_readcodetxtcachesize = 256
+
+
+class _ReadcodeTxtRaggedArray:
+    """Stand-in for a ragged array in the generation of the code section of
+    its README text, with different numbers of subarrays and values."""
+
+    def __init__(self, ra, narrays, nvalues):
+        self._indices = _ReadcodeTxtArray(ra._indices, narrays)
+        self._values = _ReadcodeTxtArray(ra._values, nvalues)
+        self._arrayinfo = ra._arrayinfo
+        self._indicesdirname = ra._indicesdirname
+        self._valuesdirname = ra._valuesdirname
+        self.atom = ra.atom
+        self.dtype = ra.dtype
+
+    def __len__(self):
+        return self._indices.shape[0]
+
+
 def readcodetxt(ra):
     """Returns text on how to read a Darr ragged array numeric binary data in
     various programming languages.
 
+    The code section of the text is cached, like the texts of arrays (see
+    `darr.array.readcodetxt`), so that appending to a ragged array does not
+    require generating it again.
+
     Parameters
     ----------
     ra: Darr raggedarray
 
     """
+    return readmetxt(ra) + _readcodetxtsection(ra)
+
+
+def _readcodetxtkey(ra, narrays, nvalues):
+    """Private function that returns the key of the code section of the
+    README text of a ragged array in the cache, and the numbers in it that
+    depend on the numbers of subarrays and values."""
+    rowsize = product(ra.atom)
+    numbers = _lengthnumbers(narrays, 2) + _lengthnumbers(nvalues, rowsize)
+    v, i = ra._values._arrayinfo, ra._indices._arrayinfo
+    # the code is different for the first three subarrays, and R cannot
+    # read more than 2 ** 31 - 1 values
+    return (v['numtype'], v['byteorder'], tuple(ra.atom), i['numtype'],
+            i['byteorder'], min(narrays, 3),
+            nvalues * rowsize > 2147483647, tuple(len(n) for n in numbers)), \
+        numbers
+
+
+def _readcodetxtsection(ra):
+    narrays, nvalues = len(ra), ra._values.shape[0]
+    key, numbers = _readcodetxtkey(ra, narrays, nvalues)
+    if key in _readcodetxtcache:
+        _readcodetxtcache.move_to_end(key)
+        cached = _readcodetxtcache[key]
+        if cached is None:  # lengths cannot be substituted
+            return _generatereadcodetxtsection(ra)
+        return _filltemplate(cached, numbers)
+    txt = _generatereadcodetxtsection(ra)
+    cached = _lengthtemplate(txt, numbers)
+    # check that the numbers of subarrays and of values can be substituted
+    # independently of each other, and of other numbers in the text, against
+    # the texts for different numbers with the same key. If there are none,
+    # the key determines the number.
+    for others in (((narrays + 1, nvalues), (narrays - 1, nvalues)),
+                   ((narrays, nvalues + 1), (narrays, nvalues - 1))):
+        for othernarrays, othernvalues in others:
+            if (cached is None) or (min(othernarrays, othernvalues) < 0):
+                continue
+            otherkey, othernumbers = _readcodetxtkey(ra, othernarrays,
+                                                     othernvalues)
+            if otherkey == key:
+                othertxt = _generatereadcodetxtsection(
+                    _ReadcodeTxtRaggedArray(ra, othernarrays, othernvalues))
+                if _filltemplate(cached, othernumbers) != othertxt:
+                    cached = None
+                break
+    _readcodetxtcache[key] = cached
+    while len(_readcodetxtcache) > _readcodetxtcachesize:
+        _readcodetxtcache.popitem(last=False)
+    return txt
+
 
-    s = readmetxt(ra)
-    s += wrap(f'Example code for reading the data') + '\n' + \
-         wrap(f'=================================') + '\n\n'
+def _generatereadcodetxtsection(ra):
+    s = wrap(f'Example code for reading the data') + '\n' + \
+        wrap(f'=================================') + '\n\n'
     languages = (
         ("Python with Darr:", "darr"),
         ("Python with Numpy (memmap):", "numpymemmap"),
@@ -748,23 +1154,23 @@ def truncate_raggedarray(ra, index):
     # FIXME allow for numpy ints
     if not isinstance(index, int):
         raise TypeError(f"'index' should be an int (is {type(index)})")
-    with ra._indices._open_array() as (mmap, _):
-        newlen = len(mmap[:index])
-    del mmap
     ra._values.check_arraywriteable()
     ra._indices.check_arraywriteable()
-    if 0 <= newlen < len(ra):
-        truncate_array(ra._indices, index=newlen)
-        if newlen == 0:
-            vi = 0
+    with ra.locked():
+        with ra._indices._open_array() as (mmap, _):
+            newlen = len(mmap[:index])
+        del mmap
+        if 0 <= newlen < len(ra):
+            truncate_array(ra._indices, index=newlen)
+            if newlen == 0:
+                vi = 0
+            else:
+                vi = int(ra._indices[-1][-1])
+            truncate_array(ra._values, index=vi)
+            ra._update_len()
         else:
-            vi = int(ra._indices[-1][-1])
-        truncate_array(ra._values, index=vi)
-        ra._update_readmetxt()
-        ra._update_arraydescr(len=len(ra._indices), size=ra._values.size)
-    else:
-        raise IndexError(f"'index' {index} would yield a ragged array of "
-                         f"length {newlen}, which is invalid (current length "
-                         f"is {len(ra)})")
+            raise IndexError(f"'index' {index} would yield a ragged array "
+                             f"of length {newlen}, which is invalid (current "
+                             f"length is {len(ra)})")
 
 
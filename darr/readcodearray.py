@@ -467,6 +467,31 @@ def readcodepython(numtype, shape, endianness, filepath='arrayvalues.bin',
     return ct
 
 
+def readcodenumpyblocks(numtype, shape, endianness, codec, blocklen,
+                        filepath='arrayvalues.bin',
+                        offsetspath='blockoffsets.bin', varname='a'):
+    """Code to read an array that is stored as compressed blocks. The codecs
+    are all part of the Python standard library."""
+    typedescr = f"{endianness_numpy[endianness]}{typedescr_numpy[numtype]}"
+    ct = f"import {codec}\n" \
+         f"import numpy as np\n" \
+         f"offsets = np.fromfile('{offsetspath}', dtype='<u8')\n" \
+         f"with open('{filepath}', 'rb') as f:\n" \
+         f"    blocks = [{codec}.decompress(f.read(end - start))\n" \
+         f"              for start, end in zip(offsets[:-1], offsets[1:])]\n" \
+         f"{varname} = np.frombuffer(b''.join(blocks), dtype='{typedescr}')\n"
+    if len(shape) > 1:  # multidimensional, we need reshape
+        ct += f"{varname} = {varname}.reshape({shape}, order='C')\n"
+    return ct
+
+
+# languages for which we can produce code to read compressed arrays
+readcodefunc_compressed = {
+        'darr': readcodedarr,
+        'numpy': readcodenumpyblocks,
+}
+
+
 readcodefunc = {
         'darr': readcodedarr,
         'idl': readcodeidl,
@@ -509,13 +534,28 @@ def readcode(da, language, abspath=False, basepath=None, varname='a',**kwargs):
     numtype = d['numtype']
     shape = d['shape']
     endianness = d['byteorder']
-    if abspath:
-        filepath = da._datapath.absolute().resolve()
-    elif basepath is not None:
-        filepath = Path(basepath) / da._datapath.name
-    else:
-        filepath = Path(da._datapath.name)
-    filepath = filepath.as_posix()
+
+    def getpath(path):
+        if abspath:
+            path = path.absolute().resolve()
+        elif basepath is not None:
+            path = Path(basepath) / path.name
+        else:
+            path = Path(path.name)
+        return path.as_posix()
+
+    filepath = getpath(da._datapath)
+    if 'compression' in d:
+        if language not in readcodefunc_compressed:
+            return None
+        if language == 'numpy':
+            kwargs.update(codec=d['compression']['codec'],
+                          blocklen=d['compression']['blocklen'],
+                          offsetspath=getpath(da.path /
+                                              da._blockoffsetsfilename))
+        return readcodefunc_compressed[language](
+            numtype=numtype, shape=shape, endianness=endianness,
+            filepath=filepath, varname=varname, **kwargs)
     return readcodefunc[language](numtype=numtype, shape=shape,
                                   endianness=endianness, filepath=filepath,
                                   varname=varname, **kwargs)
@@ -0,0 +1,212 @@
+"""Optional instrumentation of the disk operations of Darr.
+
+When enabled, Darr records for each type of operation how often it is
+performed, how many bytes it reads or writes, and how long it takes. This
+shows where time goes, e.g. in opening files, in writing JSON files or in
+writing data. Recording is disabled by default, and then costs next to
+nothing.
+
+Operations that are recorded:
+
+- 'array.open': opening the data file of an array and memory mapping it.
+- 'array.read': reading values by indexing an array.
+- 'array.append': writing appended data to disk.
+- 'array.update_len': updating the array description, README.txt and
+  checksums after a change in length (including the JSON and text writes).
+- 'metadata.read': reading a metadata file.
+- 'datadir.read_json': reading a JSON file, such as an array description.
+- 'json.write': writing a JSON file (array descriptions, metadata).
+- 'datadir.write_txt': writing a text file, such as README.txt.
+
+Examples
+--------
+>>> import darr
+>>> with darr.stats.recording():
+...     a = darr.asarray('test.darr', range(1000), accessmode='r+',
+...                      overwrite=True)
+...     for i in range(10):
+...         a.append([i])
+>>> darr.stats.get_stats()['array.append']['count']
+10
+>>> print(darr.stats.report())
+
+"""
+import time
+
+from contextlib import contextmanager
+from threading import Lock
+
+__all__ = ['enable', 'disable', 'isenabled', 'recording', 'reset',
+           'get_stats', 'report', 'add_hook', 'remove_hook', 'starttimer',
+           'record']
+
+_enabled = False
+_lock = Lock()
+_stats = {}  # operation: _OperationStats
+_hooks = []
+
+
+class _OperationStats:
+
+    # upper bounds of the latency histogram bins, in seconds; from 1 µs
+    # upwards in powers of 2, the last bin is for anything slower
+    nbins = 28
+
+    def __init__(self):
+        self.count = 0
+        self.nbytes = 0
+        self.totaltime = 0.
+        self.maxtime = 0.
+        self.histogram = [0] * (self.nbins + 1)
+
+    def add(self, duration, nbytes):
+        self.count += 1
+        self.nbytes += nbytes
+        self.totaltime += duration
+        self.maxtime = max(self.maxtime, duration)
+        binindex = min(int(duration * 1e6).bit_length(), self.nbins)
+        self.histogram[binindex] += 1
+
+    def asdict(self):
+        histogram = {}
+        for i, count in enumerate(self.histogram):
+            if count:
+                upperbound = 2 ** i * 1e-6 if i < self.nbins else float('inf')
+                histogram[upperbound] = count
+        return {'count': self.count,
+                'nbytes': self.nbytes,
+                'totaltime': self.totaltime,
+                'meantime': self.totaltime / self.count,
+                'maxtime': self.maxtime,
+                'histogram': histogram}
+
+
+def enable():
+    """Start recording statistics of disk operations."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording statistics of disk operations. Statistics recorded so
+    far are kept."""
+    global _enabled
+    _enabled = False
+
+
+def isenabled():
+    """Returns True if statistics are being recorded."""
+    return _enabled
+
+
+def reset():
+    """Clear all recorded statistics."""
+    with _lock:
+        _stats.clear()
+
+
+@contextmanager
+def recording(clear=True):
+    """Context manager that records statistics of disk operations within it.
+
+    Parameters
+    ----------
+    clear: bool, default True
+        Clear statistics that were recorded before, as `reset` does.
+
+    """
+    wasenabled = _enabled
+    if clear:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        if not wasenabled:
+            disable()
+
+
+def get_stats():
+    """Returns the statistics that were recorded.
+
+    Returns
+    -------
+    dict
+        For each operation, a dictionary with the number of times it was
+        performed ('count'), the number of bytes read or written ('nbytes'),
+        the total, mean and maximum duration in seconds ('totaltime',
+        'meantime', 'maxtime'), and a latency histogram ('histogram'). The
+        latter is a dictionary of the upper bounds of duration bins in
+        seconds (powers of 2 times 1 µs) and the number of operations in
+        them. Empty bins are left out.
+
+    """
+    with _lock:
+        return {operation: opstats.asdict()
+                for operation, opstats in sorted(_stats.items())}
+
+
+def report():
+    """Returns a text table that summarizes the statistics that were
+    recorded."""
+    lines = [f"{'operation':20} {'count':>8} {'bytes':>12} {'total s':>10} "
+             f"{'mean ms':>9} {'max ms':>9}"]
+    for operation, s in get_stats().items():
+        lines.append(f"{operation:20} {s['count']:8d} {s['nbytes']:12d} "
+                     f"{s['totaltime']:10.4f} {s['meantime'] * 1e3:9.3f} "
+                     f"{s['maxtime'] * 1e3:9.3f}")
+    return '\n'.join(lines)
+
+
+def add_hook(func):
+    """Add a function that is called for every recorded operation, while
+    recording is enabled.
+
+    Parameters
+    ----------
+    func: callable
+        Called with the name of the operation, its duration in seconds and
+        the number of bytes read or written. It is called in the thread
+        that performed the operation, and should be fast.
+
+    """
+    _hooks.append(func)
+
+
+def remove_hook(func):
+    """Remove a function that was added by `add_hook`."""
+    _hooks.remove(func)
+
+
+def starttimer():
+    """Returns the start time of an operation to be recorded by `record`, or
+    None if recording is disabled."""
+    if _enabled:
+        return time.perf_counter()
+    return None
+
+
+def record(operation, starttime, nbytes=0):
+    """Record an operation that started at `starttime`, as returned by
+    `starttimer`. Nothing is recorded if `starttime` is None.
+
+    Parameters
+    ----------
+    operation: str
+        Name of the operation.
+    starttime: <float, None>
+        Value returned by `starttimer` at the start of the operation.
+    nbytes: int, default 0
+        Number of bytes read or written.
+
+    """
+    if starttime is None:
+        return
+    duration = time.perf_counter() - starttime
+    with _lock:
+        opstats = _stats.get(operation)
+        if opstats is None:
+            opstats = _stats[operation] = _OperationStats()
+        opstats.add(duration, nbytes)
+    for hook in _hooks:
+        hook(operation, duration, nbytes)
@@ -8,9 +8,16 @@ from . import test_utils
 from . import test_numtype
 from . import test_datadir
 from . import test_metadata
+from . import test_archive
+from . import test_importtime
+from . import test_stats
+from . import test_aio
+from . import test_filelock
 
 modules = [test_array, test_raggedarray, test_datadir, test_basedatadir,
-           test_utils, test_numtype, test_datadir, test_metadata]
+           test_utils, test_numtype, test_datadir, test_metadata,
+           test_archive, test_importtime, test_stats, test_aio,
+           test_filelock]
 
 def test(verbosity=1, buffer=True):
     suite = TestSuite()
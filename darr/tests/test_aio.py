@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from darr import aio
+from darr.array import Array, asarray
+from darr.raggedarray import RaggedArray, create_raggedarray
+from darr.utils import tempdirfile
+
+
+async def _aiterate(iterable):
+    for item in iterable:
+        await asyncio.sleep(0)
+        yield item
+
+
+class AsyncArray(unittest.IsolatedAsyncioTestCase):
+
+    async def test_asarrayread(self):
+        with tempdirfile() as filename:
+            a = await aio.asarray(filename, np.arange(12).reshape(6, 2))
+            self.assertEqual(a.shape, (6, 2))
+            self.assertEqual(len(a), 6)
+            np.testing.assert_array_equal(await a.read(),
+                                          np.arange(12).reshape(6, 2))
+            np.testing.assert_array_equal(await a.read(slice(1, 3)),
+                                          [[2, 3], [4, 5]])
+            np.testing.assert_array_equal(await a.read(-1), [10, 11])
+
+    async def test_append(self):
+        with tempdirfile() as filename:
+            asarray(filename, [0, 1], accessmode='r+')
+            async with await aio.open_array(filename, accessmode='r+') as a:
+                self.assertTrue(a.array.keepopen)
+                await a.append([2, 3])
+                await a.append(4)
+                await a.write(0, 5)
+                np.testing.assert_array_equal(await a.read(), [5, 1, 2, 3, 4])
+            np.testing.assert_array_equal(Array(filename)[:], [5, 1, 2, 3, 4])
+            self.assertFalse(a.array.keepopen)
+
+    async def test_providedarraynotclosed(self):
+        with tempdirfile() as filename:
+            asarray(filename, [0, 1])
+            array = Array(filename, keepopen=True)
+            async with aio.AsyncArray(array) as a:
+                np.testing.assert_array_equal(await a.read(), [0, 1])
+            self.assertTrue(array.keepopen)
+            array.close()
+
+    async def test_iterappend(self):
+        with tempdirfile() as filename:
+            a = await aio.asarray(filename, [0], accessmode='r+')
+            await a.iterappend([[1, 2], [3]])
+            await a.iterappend(_aiterate([[4], [5, 6]]))
+            np.testing.assert_array_equal(await a.read(), np.arange(7))
+            self.assertEqual(Array(filename).shape, (7,))
+
+    async def test_iterchunks(self):
+        with tempdirfile() as filename:
+            a = await aio.asarray(filename, np.arange(10))
+            for prefetch in (0, 1, 3, 20):
+                chunks = [c async for c in a.iterchunks(3, prefetch=prefetch)]
+                self.assertEqual(len(chunks), 4)
+                np.testing.assert_array_equal(np.concatenate(chunks),
+                                              np.arange(10))
+            chunks = [c async for c in a.iterchunks(2, stepsize=3,
+                                                    startindex=1,
+                                                    include_remainder=False)]
+            np.testing.assert_array_equal(chunks, [[1, 2], [4, 5], [7, 8]])
+
+    async def test_iterchunksbreak(self):
+        with tempdirfile() as filename:
+            a = await aio.asarray(filename, np.arange(100))
+            async for chunk in a.iterchunks(10, prefetch=5):
+                break
+            np.testing.assert_array_equal(chunk, np.arange(10))
+            # pending reads do not get in the way of other operations
+            np.testing.assert_array_equal(await a.read(slice(-2, None)),
+                                          [98, 99])
+
+    async def test_negativeprefetch(self):
+        with tempdirfile() as filename:
+            a = await aio.asarray(filename, np.arange(10))
+            with self.assertRaises(ValueError):
+                async for chunk in a.iterchunks(3, prefetch=-1):
+                    pass
+
+    async def test_concurrentarrays(self):
+        with tempdirfile() as filename1, tempdirfile() as filename2, \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            a1 = await aio.asarray(filename1, [0], accessmode='r+',
+                                   executor=executor)
+            a2 = await aio.asarray(filename2, [0], accessmode='r+',
+                                   executor=executor)
+            await asyncio.gather(*[a.append([i]) for i in range(1, 21)
+                                   for a in (a1, a2)])
+            for a in (a1, a2):
+                np.testing.assert_array_equal(await a.read(), np.arange(21))
+
+
+class AsyncRaggedArray(unittest.IsolatedAsyncioTestCase):
+
+    async def test_asraggedarray(self):
+        arrays = [np.arange(i) for i in range(10)]
+        with tempdirfile() as filename:
+            ra = await aio.asraggedarray(filename, arrays)
+            self.assertEqual(len(ra), 10)
+            np.testing.assert_array_equal(await ra.read(3), arrays[3])
+            subarrays = await ra.read(slice(2, 5))
+            self.assertEqual(len(subarrays), 3)
+            np.testing.assert_array_equal(subarrays[2], arrays[4])
+
+    async def test_appenditerate(self):
+        arrays = [np.arange(i) for i in range(25)]
+        with tempdirfile() as filename:
+            create_raggedarray(filename, atom=(), dtype='int64')
+            ra = await aio.open_raggedarray(filename, accessmode='r+')
+            await ra.append(arrays[0])
+            await ra.iterappend(arrays[1:10])
+            await ra.iterappend(_aiterate(arrays[10:]), batchlen=4)
+            self.assertEqual(len(RaggedArray(filename)), 25)
+            subarrays = [a async for a in ra.iter_arrays(batchlen=4,
+                                                         prefetch=2)]
+            self.assertEqual(len(subarrays), 25)
+            for a1, a2 in zip(subarrays, arrays):
+                np.testing.assert_array_equal(a1, a2)
+            subarrays = [a async for a in ra.iter_arrays(startindex=20)]
+            self.assertEqual(len(subarrays), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import tarfile
+import unittest
+import numpy as np
+
+from pathlib import Path
+from unittest.mock import patch
+
+from darr import asarray, asraggedarray, Array, RaggedArray, \
+    extract_archive
+from darr.archive import _codecs, _memberranges
+from darr.utils import tempdir
+
+
+class ParallelArchive(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempdir()
+        self.dirname = Path(self._tempdir.__enter__())
+        self.values = np.arange(100_000, dtype='float64').reshape(-1, 4)
+        self.array = asarray(self.dirname / 'a.darr', self.values)
+
+    def tearDown(self):
+        self._tempdir.__exit__(None, None, None)
+
+    def check_extracted(self, dirpath):
+        self.assertEqual(dirpath.name, 'a.darr')
+        a = Array(dirpath)
+        self.assertArrayIdentical(a[:], self.values)
+
+    def assertArrayIdentical(self, x, y):
+        self.assertEqual(x.dtype, y.dtype)
+        self.assertEqual(x.shape, y.shape)
+        self.assertEqual(np.sum((x - y) ** 2), 0)
+
+    def test_readablebytarfile(self):
+        for compressiontype in ('xz', 'gz', 'bz2'):
+            with self.subTest(compressiontype=compressiontype):
+                archivepath = self.array.archive(
+                    self.dirname / f'a.tar.{compressiontype}',
+                    compressiontype=compressiontype, workers=2,
+                    blocksize=100_000)
+                with tarfile.open(archivepath,
+                                  f'r:{compressiontype}') as tf:
+                    with tf.extractfile('a.darr/arrayvalues.bin') as f:
+                        values = np.frombuffer(f.read(), dtype='<f8')
+                self.assertArrayIdentical(values, self.values.ravel())
+
+    def test_memberranges(self):
+        for compressiontype in ('xz', 'gz'):
+            with self.subTest(compressiontype=compressiontype):
+                archivepath = self.array.archive(
+                    self.dirname / f'a.tar.{compressiontype}',
+                    compressiontype=compressiontype, workers=2,
+                    blocksize=100_000)
+                comptype, ranges = _memberranges(archivepath)
+                self.assertEqual(comptype, compressiontype)
+                self.assertGreater(len(ranges), 1)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1],
+                                 archivepath.stat().st_size)
+
+    def test_extractparallel(self):
+        for compressiontype in ('xz', 'gz', 'bz2'):
+            with self.subTest(compressiontype=compressiontype):
+                archivepath = self.array.archive(
+                    self.dirname / f'a.tar.{compressiontype}',
+                    compressiontype=compressiontype, workers=2,
+                    blocksize=100_000)
+                dirpath = extract_archive(
+                    archivepath, path=self.dirname / compressiontype,
+                    workers=2)
+                self.check_extracted(dirpath)
+
+    def test_extractsequential(self):
+        archivepath = self.array.archive(workers=2, blocksize=100_000)
+        dirpath = extract_archive(archivepath, path=self.dirname / 'x')
+        self.check_extracted(dirpath)
+
+    def test_extractserialarchive(self):
+        # archives that were not created in parallel are extracted
+        # sequentially
+        for compressiontype in ('xz', 'gz'):
+            with self.subTest(compressiontype=compressiontype):
+                archivepath = self.array.archive(
+                    compressiontype=compressiontype)
+                dirpath = extract_archive(
+                    archivepath, path=self.dirname / compressiontype,
+                    workers=2)
+                self.check_extracted(dirpath)
+
+    def test_extractdefaultpath(self):
+        (self.dirname / 'b').mkdir()
+        archivepath = self.array.archive(self.dirname / 'b' / 'a.tar.xz',
+                                         workers=2)
+        dirpath = extract_archive(archivepath, workers=2)
+        self.assertEqual(dirpath, self.dirname / 'b' / 'a.darr')
+        self.check_extracted(dirpath)
+
+    def test_extractoverwrite(self):
+        archivepath = self.array.archive(workers=2)
+        self.assertRaises(OSError, extract_archive, archivepath,
+                          path=self.dirname, workers=2)
+        dirpath = extract_archive(archivepath, path=self.dirname, workers=2,
+                                  overwrite=True)
+        self.check_extracted(dirpath)
+
+    def test_archiveoverwrite(self):
+        self.array.archive(workers=2)
+        self.assertRaises(OSError, self.array.archive, workers=2)
+        self.array.archive(workers=2, overwrite=True)
+
+    def test_failedarchive(self):
+        # a failed archive leaves neither a partial file, nor a temporary
+        # one, and does not affect an existing archive that it would
+        # overwrite
+        def compress(data):
+            raise RuntimeError('compression failed')
+        with patch.dict(_codecs, xz=(compress, _codecs['xz'][1])):
+            self.assertRaises(RuntimeError, self.array.archive, workers=2)
+            self.assertEqual(list(self.dirname.iterdir()),
+                             [self.dirname / 'a.darr'])
+        archivepath = self.array.archive(workers=2)
+        data = archivepath.read_bytes()
+        with patch.dict(_codecs, xz=(compress, _codecs['xz'][1])):
+            self.assertRaises(RuntimeError, self.array.archive, workers=2,
+                              overwrite=True)
+        self.assertEqual(archivepath.read_bytes(), data)
+        self.assertEqual(len(list(self.dirname.iterdir())), 2)
+
+    def test_corruptarchive(self):
+        for compressiontype in ('xz', 'gz'):
+            with self.subTest(compressiontype=compressiontype):
+                archivepath = self.array.archive(
+                    compressiontype=compressiontype, workers=2,
+                    blocksize=100_000)
+                data = bytearray(archivepath.read_bytes())
+                data[len(data) // 2] ^= 0xff
+                archivepath.write_bytes(data)
+                with self.assertRaises(Exception):
+                    extract_archive(archivepath,
+                                    path=self.dirname / compressiontype,
+                                    workers=2)
+
+    def test_wrongblocksize(self):
+        self.assertRaises(ValueError, self.array.archive, workers=2,
+                          blocksize=0)
+
+    def test_raggedarray(self):
+        ra = asraggedarray(self.dirname / 'r.darr',
+                           [[1, 2], [3, 4, 5], [6]])
+        archivepath = ra.archive(workers=2, blocksize=1000)
+        dirpath = extract_archive(archivepath, path=self.dirname / 'x',
+                                  workers=2)
+        self.assertEqual([list(a) for a in RaggedArray(dirpath)],
+                         [[1, 2], [3, 4, 5], [6]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,21 @@
+import multiprocessing
 import os
+import threading
+import time
 import unittest
+import warnings
 import tempfile
 import shutil
 
 import numpy as np
+from pathlib import Path
+from unittest.mock import patch
 
 import darr
 from darr.array import asarray, create_array, create_datadir, Array, \
     numtypesdescr, truncate_array, delete_array, AppendDataError, \
     numtypedescriptiontxt
+from darr.checksums import ChecksumManifest
 from darr.utils import tempdir, tempdirfile
 
 
@@ -269,6 +276,102 @@ class CreateDiskArray(DarrTestCase):
                               shape=(1,), fill=1, fillfunc=fillfunc,
                               dtype='int32', overwrite=True)
 
+    def test_zerofillsameasgenerated(self):
+        # fast path for zero fill should give the same files as writing
+        # zeros
+        for dtype, fill in (('float64', None), ('int16', 0), ('>f4', 0.),
+                            ('complex64', 0j)):
+            with self.subTest(dtype=dtype, fill=fill), \
+                    tempdirfile() as path1, tempdirfile() as path2:
+                dar1 = create_array(path=path1, shape=(7, 3), dtype=dtype,
+                                    fill=fill, overwrite=True)
+                dar2 = asarray(path=path2, array=np.zeros((7, 3), dtype=dtype),
+                               accessmode='r+', overwrite=True)
+                for filename in ('arrayvalues.bin', 'arraydescription.json',
+                                 'README.txt'):
+                    self.assertEqual(dar1.path.joinpath(filename).read_bytes(),
+                                     dar2.path.joinpath(filename).read_bytes())
+
+    def test_negativezerofill(self):
+        # -0.0 is not stored as zero bytes
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(4,), fill=-0.,
+                               overwrite=True)
+            self.assertTrue(np.all(np.signbit(dar[:])))
+
+    def test_zerofillsparse(self):
+        shape = (2 ** 22, 4)
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=shape, dtype='float64',
+                               overwrite=True)
+            self.assertEqual(dar.shape, shape)
+            self.assertEqual(os.path.getsize(dar._datapath), dar.nbytes)
+            self.assertEqual(dar[-1, -1], 0.)
+            dar[-1] = 1.
+            self.assertArrayIdentical(Array(filename)[-1], np.ones(4))
+
+    @unittest.skipUnless(hasattr(os, 'posix_fallocate'),
+                         'requires posix_fallocate')
+    def test_zerofillpreallocate(self):
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(1024, 8),
+                               preallocate=True, overwrite=True)
+            st = os.stat(dar._datapath)
+            self.assertEqual(st.st_size, dar.nbytes)
+            self.assertGreaterEqual(st.st_blocks * 512, dar.nbytes)
+            self.assertArrayIdentical(dar[:], np.zeros((1024, 8)))
+
+    def test_zerofillwrongdtype(self):
+        with tempdirfile() as filename:
+            self.assertRaises(TypeError, create_array, path=filename,
+                              shape=(2,), dtype='U3', overwrite=True)
+
+    def test_zerofillwrongshape(self):
+        with tempdirfile() as filename:
+            self.assertRaises(ValueError, create_array, path=filename,
+                              shape=(-2,), overwrite=True)
+
+    def test_parallelfillidentical(self):
+        fillfuncs = (lambda i: i * 2.5, lambda i: np.sin(i) * i,
+                     lambda i: i * [1, 2, 3])
+        for fillfunc in fillfuncs:
+            for chunklen in (1, 4, 13, 50):
+                with self.subTest(chunklen=chunklen), \
+                        tempdirfile() as path1, tempdirfile() as path2:
+                    dar1 = create_array(path=path1, shape=(13, 3),
+                                        fillfunc=fillfunc, chunklen=chunklen,
+                                        overwrite=True)
+                    dar2 = create_array(path=path2, shape=(13, 3),
+                                        fillfunc=fillfunc, chunklen=chunklen,
+                                        workers=3, overwrite=True)
+                    for filename in ('arrayvalues.bin',
+                                     'arraydescription.json', 'README.txt'):
+                        self.assertEqual(
+                            dar1.path.joinpath(filename).read_bytes(),
+                            dar2.path.joinpath(filename).read_bytes())
+
+    def test_parallelfillvalue(self):
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(10, 2), dtype='>i2',
+                               fill=7, chunklen=3, workers=2,
+                               metadata={'a': 1}, overwrite=True)
+            self.assertArrayIdentical(dar[:], np.full((10, 2), 7, dtype='>i2'))
+            self.assertEqual(dict(dar.metadata), {'a': 1})
+
+    def test_parallelfillandfillfunc(self):
+        with tempdirfile() as filename:
+            self.assertRaises(ValueError, create_array, path=filename,
+                              shape=(4,), fill=1, fillfunc=lambda i: i,
+                              workers=2, overwrite=True)
+
+    def test_parallelfillexception(self):
+        def fillfunc(i):
+            raise ZeroDivisionError
+        with tempdirfile() as filename:
+            self.assertRaises(ZeroDivisionError, create_array, path=filename,
+                              shape=(4,), fillfunc=fillfunc, chunklen=1,
+                              workers=2, overwrite=True)
+
 
 class TestArray(DarrTestCase):
 
@@ -343,6 +446,35 @@ class TestArray(DarrTestCase):
         self.assertArrayIdentical(self.tempar[:], dar2[:])
         self.assertEqual(dict(self.tempar.metadata), dict(dar2.metadata))
 
+    def test_copydtype(self):
+        dar2 = self.tempar.copy(path=self.tempnonarpath, dtype='float32',
+                                chunklen=5, overwrite=True)
+        self.assertArrayIdentical(self.tempar[:].astype('float32'), dar2[:])
+        self.assertEqual(dict(self.tempar.metadata), dict(dar2.metadata))
+
+    def test_copysamedtype(self):
+        self.tempar[:] = np.arange(12)
+        dar2 = self.tempar.copy(path=self.tempnonarpath, dtype='int64',
+                                accessmode='r+', overwrite=True)
+        self.assertArrayIdentical(self.tempar[:], dar2[:])
+        self.assertEqual(dar2.accessmode, 'r+')
+        self.assertNotIn('dtypedescr', dar2._datadir.read_jsondict(
+            dar2._arraydescrfilename))
+        self.assertIn('Array length: 12',
+                      dar2._datadir.read_txt('README.txt'))
+
+    def test_copynometadata(self):
+        del self.tempar.metadata['a']
+        dar2 = self.tempar.copy(path=self.tempnonarpath, overwrite=True)
+        self.assertFalse(dar2.metadata.path.exists())
+
+    def test_copytosamepath(self):
+        self.assertRaises(ValueError, self.tempar.copy, path=self.temparpath,
+                          overwrite=True)
+
+    def test_copynooverwrite(self):
+        self.assertRaises(OSError, self.tempar.copy, path=self.tempnonarpath)
+
     # FIXME more tests open accessmode
     def test_open(self):
         with self.tempar.open_array() as r:
@@ -426,6 +558,36 @@ class TestReadArrayDescr(DarrTestCase):
             self.assertRaises(ValueError, Array, dirname)
 
 
+    def test_arrayinfocached(self):
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(2,), fill=0,
+                               dtype='int64', accessmode='r+', overwrite=True)
+            with patch.object(Array, '_read_arraydescr') as read:
+                _ = dar[0]
+                dar[1] = 3
+                dar.append([4, 5])
+                self.assertEqual(read.call_count, 0)
+            self.assertEqual(dar._arrayinfo['shape'], (4,))
+            self.assertEqual(Array(filename)._arrayinfo, dar._arrayinfo)
+
+    def test_arrayinfocachenotmutable(self):
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(2,), fill=0,
+                               dtype='int64', overwrite=True)
+            dar._arrayinfo['shape'] = (3,)
+            self.assertEqual(dar._arrayinfo['shape'], (2,))
+
+    def test_invalidatearrayinfo(self):
+        with tempdirfile() as filename:
+            dar = create_array(path=filename, shape=(2,), fill=0,
+                               dtype='int64', overwrite=True)
+            dar._datadir._update_jsondict(dar._arraydescrfilename,
+                                          {'arrayorder': 'F'})
+            self.assertEqual(dar._arrayinfo['arrayorder'], 'C')
+            dar._invalidate_arrayinfo()
+            self.assertEqual(dar._arrayinfo['arrayorder'], 'F')
+
+
 class TestConsistency(DarrTestCase):
 
     def test_consistencycorrect(self):
@@ -524,6 +686,79 @@ class IterFrames(DarrTestCase):
             self.assertEqual(len(l), 6)
             self.assertArrayIdentical(np.concatenate(l), self.tempoar[:12])
 
+    def test_nocopy(self):
+        self.tempoar.accessmode = 'r+'
+        self.tempoar[:] = np.arange(13)
+        l = [c for c in self.tempoar.iterchunks(chunklen=4, copy=False)]
+        self.assertEqual(len(l), 4)
+        for c in l:
+            self.assertIs(type(c), np.ndarray)
+            self.assertFalse(c.flags.writeable)
+            self.assertFalse(c.flags.owndata)
+        # views remain valid after iteration
+        self.assertArrayIdentical(np.concatenate(l), self.tempoar[:])
+
+    def test_outbuffer(self):
+        dar = asarray(path=self.tempnonarpath,
+                      array=np.arange(26, dtype='>i4').reshape(13, 2),
+                      overwrite=True)
+        out = np.empty((4, 2), dtype='>i4')
+        l = []
+        for c in dar.iterchunks(chunklen=4, stepsize=3, out=out):
+            self.assertTrue(np.shares_memory(c, out))
+            l.append(c.copy())
+        self.assertEqual([len(c) for c in l], [4, 4, 4, 4])
+        self.assertArrayIdentical(l[1], dar[3:7])
+        self.assertArrayIdentical(l[-1], dar[9:])
+        l = [c.copy() for c in dar.iterchunks(chunklen=4, out=out)]
+        self.assertEqual([len(c) for c in l], [4, 4, 4, 1])
+        self.assertArrayIdentical(l[-1], dar[12:])
+
+    def test_outbufferforder(self):
+        dar = asarray(path=self.tempnonarpath,
+                      array=np.arange(24, dtype='float64').reshape(12, 2),
+                      overwrite=True)
+        dar._update_arrayinfo({'arrayorder': 'F'})
+        out = np.empty((5, 2))
+        l = [c.copy() for c in dar.iterchunks(chunklen=5, out=out)]
+        self.assertArrayIdentical(np.concatenate(l), dar[:])
+
+    def test_outbufferwrong(self):
+        for out, error in ((np.empty(2, dtype='int64'), ValueError),
+                           (np.empty(4, dtype='int32'), TypeError),
+                           (np.empty((4, 1), dtype='int64'), ValueError),
+                           (np.empty(8, dtype='int64')[::2], ValueError),
+                           ([0, 0, 0, 0], TypeError)):
+            with self.subTest(out=out):
+                with self.assertRaises(error):
+                    next(self.tempear.iterchunks(chunklen=4, out=out))
+
+    def test_prefetch(self):
+        dar = asarray(path=self.tempnonarpath,
+                      array=np.arange(26, dtype='int32').reshape(13, 2),
+                      overwrite=True)
+        for prefetch in (1, 3, 10):
+            for copy in (True, False):
+                with self.subTest(prefetch=prefetch, copy=copy):
+                    l = list(dar.iterchunks(chunklen=4, stepsize=3,
+                                            prefetch=prefetch, copy=copy))
+                    self.assertEqual([len(c) for c in l], [4, 4, 4, 4])
+                    self.assertArrayIdentical(l[1], dar[3:7])
+                    self.assertArrayIdentical(l[-1], dar[9:])
+
+    def test_prefetchclose(self):
+        chunks = self.tempoar.iterchunks(chunklen=2, prefetch=2)
+        self.assertArrayIdentical(next(chunks), self.tempoar[:2])
+        chunks.close()
+        self.assertIsNone(self.tempoar._memmap)
+
+    def test_prefetchwrong(self):
+        self.assertRaises(ValueError, next,
+                          self.tempear.iterchunks(chunklen=2, prefetch=-1))
+        self.assertRaises(ValueError, next,
+                          self.tempear.iterchunks(chunklen=2, prefetch=2,
+                                                  out=np.empty(2, 'int64')))
+
 
 class AppendData(DarrTestCase):
 
@@ -759,5 +994,989 @@ class DeleteArray(DarrTestCase):
             bd._write_jsondict('test.json', {'a': 1})
             self.assertRaises(TypeError, delete_array, filename)
 
+class KeepOpen(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempar = create_array(path=self.temparpath, shape=(6, 2),
+                                   fillfunc=lambda i: i, dtype='int64',
+                                   overwrite=True)
+        self.tempar = Array(self.temparpath, accessmode='r+', keepopen=True)
+
+    def tearDown(self):
+        self.tempar.close()
+        shutil.rmtree(str(self.temparpath))
+
+    def test_keepsfileopen(self):
+        self.assertTrue(self.tempar.keepopen)
+        fd = self.tempar._valuesfd
+        self.assertFalse(fd.closed)
+        _ = self.tempar[2]
+        self.assertIs(self.tempar._valuesfd, fd)
+        self.assertFalse(fd.closed)
+
+    def test_read(self):
+        self.assertArrayIdentical(self.tempar[2:4],
+                                  np.array([[2, 2], [3, 3]], dtype='int64'))
+
+    def test_setvalues(self):
+        self.tempar[0] = [7, 8]
+        self.assertArrayIdentical(self.tempar[0],
+                                  np.array([7, 8], dtype='int64'))
+        self.assertArrayIdentical(Array(self.temparpath)[0],
+                                  np.array([7, 8], dtype='int64'))
+
+    def test_append(self):
+        self.tempar.append([[6, 6], [7, 7]])
+        self.assertEqual(self.tempar.shape, (8, 2))
+        self.assertArrayIdentical(self.tempar[-2:],
+                                  np.array([[6, 6], [7, 7]], dtype='int64'))
+        self.assertEqual(self.tempar._memmap.shape, (8, 2))
+
+    def test_appendtoempty(self):
+        dar = create_array(path=self.temparpath, shape=(0, 2),
+                           dtype='int64', overwrite=True)
+        dar = Array(self.temparpath, accessmode='r+', keepopen=True)
+        dar.append([[1, 2]])
+        self.assertArrayIdentical(dar[:], np.array([[1, 2]], dtype='int64'))
+        dar.close()
+
+    def test_truncate(self):
+        truncate_array(self.tempar, 2)
+        self.assertEqual(self.tempar.shape, (2, 2))
+        self.assertEqual(self.tempar._memmap.shape, (2, 2))
+        self.assertArrayIdentical(self.tempar[:],
+                                  np.array([[0, 0], [1, 1]], dtype='int64'))
+
+    def test_setaccessmode(self):
+        self.tempar.accessmode = 'r'
+        self.assertFalse(self.tempar._memmap.flags.writeable)
+        self.assertRaises(OSError, self.tempar.check_arraywriteable)
+
+    def test_openreadonly(self):
+        fd = self.tempar._valuesfd
+        with self.tempar._open_array(accessmode='r') as (ar, _):
+            self.assertFalse(ar.flags.writeable)
+        self.assertIs(self.tempar._valuesfd, fd)
+        self.assertTrue(self.tempar._memmap.flags.writeable)
+
+    def test_openwriteable(self):
+        self.tempar.accessmode = 'r'
+        with self.tempar.open_array(accessmode='r+'):
+            self.tempar[0] = [7, 8]
+        self.assertFalse(self.tempar._memmap.flags.writeable)
+        self.assertFalse(self.tempar._valuesfd.closed)
+        self.assertArrayIdentical(Array(self.temparpath)[0],
+                                  np.array([7, 8], dtype='int64'))
+
+    def test_close(self):
+        fd = self.tempar._valuesfd
+        self.tempar.close()
+        self.assertTrue(fd.closed)
+        self.assertFalse(self.tempar.keepopen)
+        self.assertIsNone(self.tempar._memmap)
+        self.assertArrayIdentical(self.tempar[1],
+                                  np.array([1, 1], dtype='int64'))
+        self.assertIsNone(self.tempar._valuesfd)
+
+
+class AccessHints(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        # 64 rows of 4096 bytes, i.e. of a page on most systems
+        self.values = np.arange(64 * 512, dtype='float64').reshape(64, 512)
+        asarray(self.temparpath, self.values, overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def test_values(self):
+        for access in (None, 'normal', 'sequential', 'random', 'willneed',
+                       'dontneed'):
+            with self.subTest(access=access):
+                a = Array(self.temparpath, access=access)
+                self.assertEqual(a.access, access)
+                self.assertArrayIdentical(a[3:5], self.values[3:5])
+                for kwargs in ({}, {'copy': False}, {'prefetch': 2},
+                               {'copy': False, 'prefetch': 2}):
+                    chunks = list(a.iterchunks(chunklen=10, access=access,
+                                               **kwargs))
+                    self.assertArrayIdentical(np.concatenate(chunks),
+                                              self.values)
+                with a.open_array(access=access):
+                    self.assertArrayIdentical(a[-1], self.values[-1])
+
+    def test_wrongaccess(self):
+        self.assertRaises(ValueError, Array, self.temparpath,
+                          access='often')
+        a = Array(self.temparpath)
+        self.assertRaises(ValueError, next, a.iterchunks(10, access='often'))
+        with self.assertRaises(ValueError):
+            with a.open_array(access='often'):
+                pass
+
+    def test_dropbehind(self):
+        a = Array(self.temparpath)
+        for access, dropcache in (('sequential', False), ('dontneed', True)):
+            with self.subTest(access=access), \
+                    patch('darr.array.madvise') as madvise, \
+                    patch('darr.array.fadvise') as fadvise, \
+                    patch('darr.array.mmap.PAGESIZE', 4096):
+                chunks = list(a.iterchunks(chunklen=16, stepsize=16,
+                                           access=access))
+                self.assertEqual(len(chunks), 4)
+                dropped = [c.args[2:] for c in madvise.call_args_list
+                           if c.args[1] == 'DONTNEED']
+                self.assertEqual(dropped, [(i * 65536, 65536)
+                                           for i in range(4)])
+                fadvised = [c.args[1:] for c in fadvise.call_args_list
+                            if c.args[3] == 'DONTNEED']
+                if dropcache:
+                    self.assertIn((0, 65536, 'DONTNEED'), fadvised)
+                else:
+                    self.assertEqual(fadvised, [])
+
+    def test_nodropbehind(self):
+        a = Array(self.temparpath)
+        with patch('darr.array.madvise') as madvise:
+            list(a.iterchunks(chunklen=16, access='random'))
+        self.assertNotIn('DONTNEED', [c.args[1] for c in
+                                      madvise.call_args_list])
+
+    def test_keepopenoverride(self):
+        a = Array(self.temparpath, keepopen=True, access='random')
+        self.assertEqual(a._handleaccess, 'random')
+        with a.open_array(access='sequential'):
+            self.assertEqual(a._handleaccess, 'sequential')
+        self.assertEqual(a._handleaccess, 'random')
+        list(a.iterchunks(chunklen=16, access='dontneed'))
+        self.assertEqual(a._handleaccess, 'random')
+        a.close()
+        self.assertIsNone(a._handleaccess)
+
+
+class ArrayDescription(DarrTestCase):
+
+    def assertDescrKeysUnchanged(self, a, keys):
+        d = a._datadir.read_jsondict(a._arraydescrfilename)
+        self.assertEqual(set(d), keys)
+
+    def test_keysunchanged(self):
+        with tempdirfile() as filename:
+            a = asarray(filename, [1, 2, 3], dtype='int64', accessmode='r+')
+            keys = set(a._datadir.read_jsondict(a._arraydescrfilename))
+            self.assertNotIn('dtypedescr', keys)
+            a.append([4])
+            self.assertDescrKeysUnchanged(a, keys)
+            a.iterappend([[5], [6, 7]])
+            self.assertDescrKeysUnchanged(a, keys)
+            truncate_array(a, 5)
+            self.assertDescrKeysUnchanged(a, keys)
+            self.assertEqual(Array(filename).shape, (5,))
+
+    def test_keysunchangedflush(self):
+        with tempdirfile() as filename:
+            a = asarray(filename, [1, 2, 3], dtype='int64', accessmode='r+')
+            keys = set(a._datadir.read_jsondict(a._arraydescrfilename))
+            with a.deferred_updates():
+                a.append([4])
+                a.flush()
+                self.assertDescrKeysUnchanged(a, keys)
+                a.append([5])
+            self.assertDescrKeysUnchanged(a, keys)
+            # crash recovery rewrites the description too
+            a._update_arrayinfo({Array._updatependingkey: True})
+            with open(a._datapath, 'ab') as f:
+                np.array([6], dtype='int64').tofile(f)
+            with self.assertWarns(UserWarning):
+                a = Array(filename, accessmode='r+')
+            self.assertEqual(a.shape, (6,))
+            self.assertDescrKeysUnchanged(a, keys)
+
+
+class SWMR(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.writer = create_array(self.temparpath, shape=(2, 3),
+                                   dtype='int32', fill=1, accessmode='r+',
+                                   overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def test_refresh(self):
+        reader = Array(self.temparpath, swmr=True)
+        self.assertTrue(reader.swmr)
+        self.assertEqual(reader.refresh(), 0)
+        self.writer.append(np.full((3, 3), 2, dtype='int32'))
+        self.assertEqual(reader.shape, (2, 3))
+        self.assertEqual(reader.refresh(), 3)
+        self.assertEqual(reader.shape, (5, 3))
+        self.assertArrayIdentical(reader[-1],
+                                  np.array([2, 2, 2], dtype='int32'))
+        self.assertEqual(reader.refresh(), 0)
+
+    def test_refreshkeepopen(self):
+        reader = Array(self.temparpath, swmr=True, keepopen=True)
+        self.writer.append(np.full((3, 3), 2, dtype='int32'))
+        reader.refresh()
+        self.assertEqual(reader._memmap.shape, (5, 3))
+        self.assertArrayIdentical(reader[4],
+                                  np.array([2, 2, 2], dtype='int32'))
+        reader.close()
+
+    def test_refreshdeferredupdates(self):
+        reader = Array(self.temparpath, swmr=True)
+        with self.writer.deferred_updates():
+            self.writer.append(np.full((3, 3), 2, dtype='int32'))
+            self.assertEqual(reader.refresh(), 3)
+            # new reader, while description is not yet updated
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                reader2 = Array(self.temparpath, swmr=True)
+            self.assertEqual(reader2.shape, (5, 3))
+        self.assertEqual(reader.refresh(), 0)
+
+    def test_openwhileappending(self):
+        # data is written before the array description is updated
+        with open(self.writer._datapath, 'ab') as f:
+            f.write(np.zeros(3, dtype='int32').tobytes())
+        self.assertRaises(ValueError, Array, self.temparpath)
+        reader = Array(self.temparpath, swmr=True)
+        self.assertEqual(reader.shape, (2, 3))
+
+    def test_atomicdescription(self):
+        with patch('darr.utils.os.replace',
+                   side_effect=os.replace) as replace:
+            self.writer.append([[3, 3, 3]])
+        replacedpaths = [c.args[1].name for c in replace.call_args_list]
+        self.assertIn('arraydescription.json', replacedpaths)
+
+    def test_tail(self):
+        reader = Array(self.temparpath, swmr=True)
+        writer = self.writer
+
+        def append():
+            for i in range(5):
+                time.sleep(0.02)
+                writer.append(np.full((2, 3), i, dtype='int32'))
+
+        thread = threading.Thread(target=append)
+        thread.start()
+        chunks = list(reader.tail(chunklen=3, poll=0.005, timeout=0.5))
+        thread.join()
+        values = np.concatenate(chunks)
+        self.assertTrue(all(len(c) <= 3 for c in chunks))
+        self.assertArrayIdentical(values, writer[2:])
+
+    def test_tailstartindex(self):
+        reader = Array(self.temparpath, swmr=True)
+        chunks = list(reader.tail(chunklen=1, startindex=-2, poll=0.001,
+                                  timeout=0.01))
+        self.assertEqual(len(chunks), 2)
+        self.assertArrayIdentical(np.concatenate(chunks), self.writer[:])
+        self.assertRaises(ValueError, next, reader.tail(chunklen=0))
+
+
+def _crashindeferredupdates(path):
+    a = Array(path, accessmode='r+')
+    with a.deferred_updates():
+        os._exit(0)
+
+
+class DeferredUpdates(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempar = create_array(path=self.temparpath, shape=(2,),
+                                   dtype='int64', overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def readshape(self):
+        return tuple(self.tempar._datadir.read_jsondict(
+            self.tempar._arraydescrfilename)['shape'])
+
+    def test_deferredappend(self):
+        with self.tempar.deferred_updates():
+            self.tempar.append([1, 2])
+            self.tempar.iterappend([[3], [4, 5]])
+            self.assertEqual(self.tempar.shape, (7,))
+            self.assertEqual(self.readshape(), (2,))
+            self.assertIn('Array length: 2',
+                          self.tempar._datadir.read_txt('README.txt'))
+        self.assertEqual(self.readshape(), (7,))
+        self.assertIn('Array length: 7',
+                      self.tempar._datadir.read_txt('README.txt'))
+        self.assertNotIn(Array._updatependingkey,
+                         self.tempar._datadir.read_jsondict(
+                             self.tempar._arraydescrfilename))
+        self.assertArrayIdentical(Array(self.temparpath)[:],
+                                  np.array([0, 0, 1, 2, 3, 4, 5],
+                                           dtype='int64'))
+
+    def test_flush(self):
+        with self.tempar.deferred_updates():
+            self.tempar.append([1, 2])
+            self.tempar.flush()
+            self.assertEqual(self.readshape(), (4,))
+            self.tempar.append([3])
+        self.assertEqual(self.readshape(), (5,))
+
+    def test_nested(self):
+        with self.tempar.deferred_updates():
+            with self.tempar.deferred_updates():
+                self.tempar.append([1, 2])
+            self.assertEqual(self.readshape(), (2,))
+        self.assertEqual(self.readshape(), (4,))
+
+    def test_truncate(self):
+        with self.tempar.deferred_updates():
+            truncate_array(self.tempar, 1)
+            self.assertEqual(self.readshape(), (2,))
+        self.assertEqual(self.readshape(), (1,))
+
+    def simulatecrash(self):
+        # a process that crashed within the deferred_updates context
+        self.tempar._update_arrayinfo({Array._updatependingkey: True})
+        with open(self.tempar._datapath, 'ab') as f:
+            np.array([1, 2], dtype='int64').tofile(f)
+
+    def test_recoverlenreadonly(self):
+        self.simulatecrash()
+        with self.assertWarns(UserWarning):
+            a = Array(self.temparpath, accessmode='r')
+        self.assertEqual(a.shape, (4,))
+        self.assertArrayIdentical(a[:], np.array([0, 0, 1, 2],
+                                                 dtype='int64'))
+        self.assertEqual(self.readshape(), (2,))
+
+    def test_recoverlenreadwrite(self):
+        self.simulatecrash()
+        with open(self.tempar._datapath, 'ab') as f:
+            f.write(b'\x01\x02\x03')  # incompletely written row
+        with self.assertWarns(UserWarning):
+            a = Array(self.temparpath, accessmode='r+')
+        self.assertEqual(a.shape, (4,))
+        self.assertEqual(self.readshape(), (4,))
+        self.assertEqual(a._datapath.stat().st_size, 4 * 8)
+        self.assertIsNone(Array(self.temparpath)._check_arrayinfoconsistency())
+
+    def test_noninterruptedinconsistencyraises(self):
+        with open(self.tempar._datapath, 'ab') as f:
+            f.write(bytes(8))
+        self.assertRaises(ValueError, Array, self.temparpath)
+
+    def test_crashbeforeappend(self):
+        p = multiprocessing.Process(target=_crashindeferredupdates,
+                                    args=(self.temparpath,))
+        p.start()
+        p.join()
+        self.assertEqual(p.exitcode, 0)
+        self.assertIn(Array._updatependingkey,
+                      self.tempar._datadir.read_jsondict(
+                          self.tempar._arraydescrfilename))
+        a = Array(self.temparpath, accessmode='r+')
+        self.assertEqual(a.shape, (2,))
+        self.assertNotIn(Array._updatependingkey,
+                         a._datadir.read_jsondict(a._arraydescrfilename))
+        with open(self.tempar._datapath, 'ab') as f:
+            f.write(bytes(8))
+        self.assertRaises(ValueError, Array, self.temparpath)
+
+    def test_appendremovesstalemarker(self):
+        self.tempar._update_arrayinfo({Array._updatependingkey: True})
+        a = Array(self.temparpath, accessmode='r')  # cannot repair
+        self.assertIn(Array._updatependingkey, a._arrayinfo)
+        self.tempar.append([1, 2, 3])
+        d = self.tempar._datadir.read_jsondict(
+            self.tempar._arraydescrfilename)
+        self.assertEqual(d['shape'], [5])
+        self.assertNotIn(Array._updatependingkey, d)
+
+
+class BufferedAppend(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempar = create_array(path=self.temparpath, shape=(1, 2),
+                                   dtype='int64', overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def test_writebuffered(self):
+        with self.tempar.appender(buffersize=4) as ap:
+            ap.write([[1, 1]])
+            ap.write([[2, 2], [3, 3]])
+            self.assertEqual(self.tempar.shape, (1, 2))
+            ap.write([[4, 4]])  # fills buffer
+            self.assertEqual(self.tempar.shape, (5, 2))
+            ap.write([[5, 5]])
+        self.assertTrue(ap.closed)
+        expected = np.repeat(np.arange(6, dtype='int64'), 2).reshape(6, 2)
+        self.assertArrayIdentical(self.tempar[:], expected)
+        self.assertArrayIdentical(Array(self.temparpath)[:], expected)
+
+    def test_writelargerthanbuffer(self):
+        ap = self.tempar.appender(buffersize=2)
+        ap.write([[1, 1]])
+        ap.write(np.ones((5, 2), dtype='int64'))
+        self.assertEqual(self.tempar.shape, (7, 2))
+        ap.close()
+        self.assertEqual(self.tempar.shape, (7, 2))
+
+    def test_flush(self):
+        ap = self.tempar.appender()
+        ap.write([[1, 1]])
+        self.assertEqual(self.tempar.shape, (1, 2))
+        ap.flush()
+        self.assertEqual(self.tempar.shape, (2, 2))
+        self.assertEqual(Array(self.temparpath).shape, (2, 2))
+        ap.close()
+
+    def test_appendtoempty(self):
+        dar = create_array(path=self.temparpath, shape=(0,),
+                           dtype='float32', overwrite=True)
+        with dar.appender() as ap:
+            for i in range(10):
+                ap.write(i)
+        self.assertArrayIdentical(dar[:], np.arange(10, dtype='float32'))
+
+    def test_defaultbuffersize(self):
+        with self.tempar.appender() as ap:
+            self.assertEqual(ap.buffersize, 8 * 1024 ** 2 // 16)
+
+    def test_wrongshape(self):
+        with self.tempar.appender() as ap:
+            self.assertRaises(TypeError, ap.write, [[1, 2, 3]])
+
+    def test_writeclosed(self):
+        ap = self.tempar.appender()
+        ap.close()
+        self.assertRaises(ValueError, ap.write, [[1, 2]])
+
+    def test_readonly(self):
+        self.tempar.accessmode = 'r'
+        self.assertRaises(OSError, self.tempar.appender)
+
+    def test_unclosed(self):
+        ap = self.tempar.appender()
+        ap.write([[1, 1]])
+        with self.assertWarns(ResourceWarning):
+            del ap
+        self.assertEqual(self.tempar.shape, (2, 2))
+        self.assertEqual(Array(self.temparpath).shape, (2, 2))
+
+
+def _chunksum(chunk):
+    # must be a top-level function to be sent to worker processes
+    return chunk.sum(axis=0)
+
+
+class MapReduce(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempoutpath = tempfile.mkdtemp()
+        self.tempar = asarray(path=self.temparpath,
+                              array=np.arange(30.).reshape(10, 3),
+                              overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+        shutil.rmtree(str(self.tempoutpath))
+
+    def test_mapchunkstoarray(self):
+        out = self.tempar.map_chunks(np.sqrt, chunklen=3, workers=2,
+                                     out=self.tempoutpath, overwrite=True)
+        self.assertArrayIdentical(out[:], np.sqrt(self.tempar[:]))
+        self.assertArrayIdentical(Array(self.tempoutpath)[:], out[:])
+
+    def test_mapchunksdtype(self):
+        out = self.tempar.map_chunks(lambda c: c * 2, chunklen=4,
+                                     out=self.tempoutpath, dtype='int16',
+                                     overwrite=True)
+        self.assertArrayIdentical(out[:],
+                                  (self.tempar[:] * 2).astype('int16'))
+
+    def test_mapchunksorder(self):
+        # many more chunks than in-flight slots
+        results = list(self.tempar.map_chunks(lambda c: c[0, 0], chunklen=1,
+                                              workers=2))
+        self.assertEqual(results, list(range(0, 30, 3)))
+
+    def test_mapchunksprocess(self):
+        results = list(self.tempar.map_chunks(_chunksum, chunklen=4,
+                                              workers=2,
+                                              executor='process'))
+        self.assertEqual(len(results), 3)
+        self.assertArrayIdentical(np.sum(results, axis=0),
+                                  self.tempar[:].sum(axis=0))
+
+    def test_mapchunkssamepath(self):
+        self.assertRaises(ValueError, self.tempar.map_chunks, np.sqrt,
+                          out=self.temparpath, overwrite=True)
+
+    def test_mapchunkswrongexecutor(self):
+        self.assertRaises(ValueError, self.tempar.map_chunks, np.sqrt,
+                          executor='gpu')
+
+    def test_mapchunkswrongarguments(self):
+        # raised when called, also when an iterator is returned
+        for kwargs in ({'chunklen': 0}, {'chunklen': 2.5}, {'workers': 0}):
+            with self.subTest(**kwargs):
+                self.assertRaises(ValueError, self.tempar.map_chunks,
+                                  np.sqrt, **kwargs)
+        self.assertRaises(TypeError, self.tempar.map_chunks, 'sqrt')
+
+    def test_mapchunksexception(self):
+        def func(chunk):
+            raise ZeroDivisionError
+        self.assertRaises(ZeroDivisionError, list,
+                          self.tempar.map_chunks(func, chunklen=2))
+
+    def test_reduce(self):
+        for executor in ('thread', 'process'):
+            with self.subTest(executor=executor):
+                total = self.tempar.reduce(_chunksum, np.add, chunklen=3,
+                                           workers=3, executor=executor)
+                self.assertArrayIdentical(total, self.tempar[:].sum(axis=0))
+
+    def test_reduceinitial(self):
+        total = self.tempar.reduce(lambda c: len(c), lambda x, y: x + y,
+                                   chunklen=4, initial=100)
+        self.assertEqual(total, 110)
+
+    def test_reduceempty(self):
+        dar = create_array(path=self.tempoutpath, shape=(0, 3),
+                           overwrite=True)
+        self.assertEqual(dar.reduce(len, max, initial=0), 0)
+        self.assertRaises(ValueError, dar.reduce, len, max)
+
+
+class Reductions(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.ndarray = rng.normal(1e6, 1., size=(103, 4, 3))
+        self.tempar = asarray(path=self.temparpath, array=self.ndarray,
+                              overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def test_reductions(self):
+        for funcname in ('sum', 'mean', 'min', 'max', 'var', 'std'):
+            for axis in (None, 0, 1, -1, (0, 2), (1, 2)):
+                with self.subTest(funcname=funcname, axis=axis):
+                    result = getattr(self.tempar, funcname)(axis=axis,
+                                                            chunklen=10)
+                    expected = getattr(np, funcname)(self.ndarray,
+                                                     axis=axis)
+                    self.assertEqual(np.shape(result), np.shape(expected))
+                    np.testing.assert_allclose(result, expected,
+                                               rtol=1e-8)
+
+    def test_varstable(self):
+        # large offset relative to spread would break the naive
+        # sum-of-squares formula
+        var = self.tempar.var(axis=0, chunklen=1)
+        np.testing.assert_allclose(var, self.ndarray.var(axis=0),
+                                   rtol=1e-8)
+
+    def test_ddof(self):
+        np.testing.assert_allclose(self.tempar.std(ddof=1, chunklen=7),
+                                   self.ndarray.std(ddof=1), rtol=1e-8)
+
+    def test_parallel(self):
+        np.testing.assert_allclose(self.tempar.mean(axis=0, chunklen=5,
+                                                    workers=3),
+                                   self.ndarray.mean(axis=0), rtol=1e-8)
+
+    def test_dtypes(self):
+        dar = asarray(path=self.temparpath, array=np.arange(10, dtype='int32'),
+                      overwrite=True)
+        self.assertEqual(dar.sum(chunklen=3), 45)
+        self.assertEqual(dar.mean(chunklen=3).dtype, np.float64)
+        self.assertEqual(dar.mean(dtype='float32', chunklen=3).dtype,
+                         np.float32)
+        self.assertEqual(dar.max(chunklen=3).dtype, np.int32)
+        self.assertAlmostEqual(dar.var(chunklen=3), np.var(np.arange(10)))
+
+    def test_empty(self):
+        dar = create_array(path=self.temparpath, shape=(0, 3),
+                           overwrite=True)
+        self.assertArrayIdentical(dar.sum(axis=0), np.zeros(3))
+        self.assertRaises(ValueError, dar.max)
+
+    def test_wrongaxis(self):
+        self.assertRaises(ValueError, self.tempar.sum, axis=3)
+        self.assertRaises(ValueError, self.tempar.sum, axis=(0, 0))
+
+
+class CompressedArray(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempnonarpath = tempfile.mkdtemp()
+        self.ndarray = np.arange(300, dtype='>i4').reshape(50, 3, 2)
+        self.tempar = asarray(path=self.temparpath, array=self.ndarray,
+                              compression='zlib', blocklen=7, chunklen=4,
+                              metadata={'a': 1}, overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+        shutil.rmtree(str(self.tempnonarpath))
+
+    def test_roundtrip(self):
+        for codec in ('zlib', 'lzma', 'bz2'):
+            for blocklen in (1, 4, 50, 100, None):
+                with self.subTest(codec=codec, blocklen=blocklen):
+                    dar = asarray(path=self.tempnonarpath,
+                                  array=self.ndarray, compression=codec,
+                                  blocklen=blocklen, compressionlevel=1,
+                                  overwrite=True)
+                    self.assertEqual(dar.compression, codec)
+                    self.assertArrayIdentical(dar[:], self.ndarray)
+                    self.assertArrayIdentical(Array(self.tempnonarpath)[:],
+                                              self.ndarray)
+
+    def test_emptyarray(self):
+        dar = asarray(path=self.tempnonarpath, array=np.zeros((0, 2)),
+                      compression='bz2', overwrite=True)
+        self.assertEqual(dar.shape, (0, 2))
+        self.assertArrayIdentical(dar[:], np.zeros((0, 2)))
+
+    def test_generatorinput(self):
+        dar = asarray(path=self.tempnonarpath,
+                      array=(np.arange(i, i + 3) for i in range(0, 30, 3)),
+                      compression='zlib', blocklen=4, overwrite=True)
+        self.assertArrayIdentical(dar[:], np.arange(30))
+
+    def test_indexing(self):
+        indices = (0, -1, 49, slice(None), slice(3, 17), slice(None, None, 5),
+                   slice(40, 2, -3), slice(60, 70), [3, 3, 45, 0],
+                   np.array([[1, 2], [48, -2]]), self.ndarray[:, 0, 0] % 3 == 0,
+                   (5, 1), (slice(2, 30, 4), 2, 1), ([1, 20], slice(None), 1),
+                   ([1, 20], [0, 2]), (slice(10, 30), [0, 2], [1, 0]),
+                   (0, slice(None), [0, 1]), Ellipsis, (Ellipsis, 1),
+                   (None, 3), np.int64(12), [], [True] * 25 + [False] * 25,
+                   (None, None, slice(3, 9)), (None, Ellipsis, 1),
+                   (Ellipsis, 7, 1, 0), (Ellipsis, None),
+                   (None, [1, 20], slice(None), 1), (None, 5, None, 1))
+        for index in indices:
+            with self.subTest(index=index):
+                self.assertArrayIdentical(self.tempar[index],
+                                          self.ndarray[index])
+
+    def test_indexerrors(self):
+        self.assertRaises(IndexError, self.tempar.__getitem__, 50)
+        self.assertRaises(IndexError, self.tempar.__getitem__, [0, -51])
+        self.assertRaises(IndexError, self.tempar.__getitem__, [True, False])
+        self.assertRaises(IndexError, self.tempar.__getitem__, 1.5)
+
+    def test_onlyneededblocksread(self):
+        dar = Array(self.temparpath)
+        self.assertArrayIdentical(dar[15], self.ndarray[15])
+        self.assertEqual(list(dar._blockcache._blocks), [2])
+        self.assertArrayIdentical(dar[[1, 48]], self.ndarray[[1, 48]])
+        self.assertEqual(sorted(dar._blockcache._blocks), [0, 2, 6])
+        # also when the index starts with newaxis or Ellipsis
+        self.assertArrayIdentical(dar[None, 22:24], self.ndarray[None, 22:24])
+        self.assertArrayIdentical(dar[..., 30, 1, 0],
+                                  self.ndarray[..., 30, 1, 0])
+        self.assertEqual(sorted(dar._blockcache._blocks), [0, 2, 3, 4, 6])
+
+    def test_blockcachebounded(self):
+        dar = Array(self.temparpath)
+        dar._blockcache._maxblocks = 2
+        self.assertArrayIdentical(dar[:], self.ndarray)
+        self.assertEqual(list(dar._blockcache._blocks), [6, 7])
+        with patch('zlib.decompress') as decompress:
+            dar[49]
+            decompress.assert_not_called()
+
+    def test_readonly(self):
+        dar = Array(self.temparpath, accessmode='r+')
+        with self.assertRaises(OSError):
+            dar[0] = 1
+        self.assertRaises(OSError, dar.append, self.ndarray[:1])
+        self.assertRaises(OSError, dar.appender)
+        self.assertRaises(OSError, truncate_array, dar, 2)
+        dar.metadata['b'] = 2  # metadata can be changed
+        self.assertEqual(Array(self.temparpath).metadata['b'], 2)
+
+    def test_iterchunks(self):
+        out = np.empty((8, 3, 2), dtype='>i4')
+        for kwargs in ({}, {'copy': False}, {'out': out}):
+            with self.subTest(kwargs=kwargs):
+                l = [c.copy() for c in self.tempar.iterchunks(chunklen=8,
+                                                             **kwargs)]
+                self.assertArrayIdentical(np.concatenate(l),
+                                          self.ndarray.astype('int32'))
+
+    def test_reductions(self):
+        self.assertEqual(self.tempar.sum(chunklen=6, workers=2),
+                         self.ndarray.sum())
+        self.assertArrayIdentical(self.tempar.max(axis=0, chunklen=6),
+                                  self.ndarray.max(axis=0))
+
+    def test_copy(self):
+        dar = self.tempar.copy(self.tempnonarpath, overwrite=True)
+        self.assertEqual(dar.compression, 'zlib')
+        self.assertArrayIdentical(dar[:], self.ndarray)
+        self.assertEqual(dict(dar.metadata), {'a': 1})
+        dar = self.tempar.copy(self.tempnonarpath, dtype='float64',
+                               overwrite=True)
+        self.assertEqual(dar.compression, 'zlib')
+        self.assertEqual(dar._arrayinfo['compression']['blocklen'], 7)
+        self.assertArrayIdentical(dar[:], self.ndarray.astype('float64'))
+
+    def test_decompress(self):
+        dar = asarray(path=self.tempnonarpath, array=self.tempar,
+                      overwrite=True)
+        self.assertIsNone(dar.compression)
+        self.assertArrayIdentical(dar[:], self.ndarray)
+        self.assertFalse(dar.path.joinpath('blockoffsets.bin').exists())
+
+    def test_inconsistentoffsets(self):
+        offsetspath = self.tempar.path.joinpath('blockoffsets.bin')
+        offsets = np.fromfile(offsetspath, dtype='<u8')
+        offsets[:-1].tofile(offsetspath)
+        self.assertRaises(ValueError, Array, self.temparpath)
+        offsets[-1] += 1
+        offsets.tofile(offsetspath)
+        self.assertRaises(ValueError, Array, self.temparpath)
+
+    def test_readcode(self):
+        self.assertEqual(self.tempar.readcodelanguages, ('darr', 'numpy'))
+        code = self.tempar.readcode('numpy', abspath=True)
+        namespace = {}
+        exec(code, namespace)
+        self.assertArrayIdentical(namespace['a'], self.ndarray)
+        readme = self.tempar.datadir.read_txt('README.txt')
+        self.assertIn('blockoffsets.bin', readme)
+        self.assertIn('zlib.decompress', readme)
+
+    def test_delete(self):
+        delete_array(Array(self.temparpath, accessmode='r+'))
+        self.assertFalse(os.path.exists(self.temparpath))
+        os.mkdir(self.temparpath)  # for tearDown
+
+    def test_wrongcodec(self):
+        self.assertRaises(ValueError, asarray, path=self.tempnonarpath,
+                          array=self.ndarray, compression='zip',
+                          overwrite=True)
+
+
+class Checksums(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.ndarray = np.arange(100, dtype='i4').reshape(50, 2)
+        self.tempar = asarray(path=self.temparpath, array=self.ndarray,
+                              accessmode='r+', overwrite=True)
+        self.tempar.update_checksums(blocklen=8)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def corrupt(self, row):
+        offset = row * 2 * self.ndarray.itemsize
+        with open(self.tempar._datapath, 'r+b') as f:
+            f.seek(offset)
+            b = f.read(1)
+            f.seek(offset)
+            f.write(bytes([b[0] ^ 0xff]))
+
+    def test_manifest(self):
+        d = self.tempar.datadir.read_jsondict('checksums.json')
+        self.assertEqual(d['algorithm'], 'sha256')
+        self.assertEqual(d['blocklen'], 8)
+        self.assertEqual(d['nrows'], 50)
+        self.assertEqual(len(d['blocks']), 7)
+
+    def test_verifyintact(self):
+        for workers in (None, 1, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.tempar.verify_checksums(
+                    workers=workers), [])
+
+    def test_verifycorrupt(self):
+        self.corrupt(20)
+        self.corrupt(49)
+        self.assertEqual(self.tempar.verify_checksums(workers=2),
+                         [(16, 24), (48, 50)])
+        self.assertEqual(self.tempar.verify_checksums(startindex=30),
+                         [(48, 50)])
+        self.assertEqual(self.tempar.verify_checksums(startindex=24,
+                                                      endindex=48), [])
+        self.assertEqual(self.tempar.verify_checksums(startindex=-2),
+                         [(48, 50)])
+
+    def test_append(self):
+        self.tempar.append([[1, 2], [3, 4]])
+        self.tempar.iterappend([[[5, 6]]] * 20)
+        self.assertEqual(self.tempar.verify_checksums(), [])
+        d = self.tempar.datadir.read_jsondict('checksums.json')
+        self.assertEqual(d['nrows'], 72)
+        self.assertEqual(len(d['blocks']), 9)
+        # only the last block was rehashed, corruption in earlier blocks
+        # remains detectable
+        self.corrupt(3)
+        self.tempar.append([[7, 8]])
+        self.assertEqual(self.tempar.verify_checksums(), [(0, 8)])
+
+    def test_appendcontinueshash(self):
+        # the hash of the incomplete last block is continued with appended
+        # rows, so rows that were hashed before are not read again
+        self.tempar.append([[1, 2]])
+        self.corrupt(48)
+        self.tempar.append([[3, 4]])
+        self.assertEqual(self.tempar.verify_checksums(), [(48, 52)])
+
+    def test_deferredsetitem(self):
+        with patch.object(ChecksumManifest, 'write', autospec=True,
+                          side_effect=ChecksumManifest.write) as write:
+            with self.tempar.deferred_updates():
+                self.tempar[9] = [-1, -1]
+                self.tempar.append([[1, 2]])
+                self.tempar[30:35, 0] = 0
+            self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.tempar.verify_checksums(), [])
+
+    def test_appender(self):
+        with self.tempar.appender(buffersize=4) as app:
+            for i in range(10):
+                app.write([[i, i]])
+        self.assertEqual(self.tempar.verify_checksums(), [])
+
+    def test_deferredupdates(self):
+        with self.tempar.deferred_updates():
+            for i in range(10):
+                self.tempar.append([[i, i]])
+        self.assertEqual(self.tempar.verify_checksums(), [])
+
+    def test_truncate(self):
+        truncate_array(self.tempar, 21)
+        self.assertEqual(self.tempar.verify_checksums(), [])
+        d = self.tempar.datadir.read_jsondict('checksums.json')
+        self.assertEqual(len(d['blocks']), 3)
+
+    def test_setitem(self):
+        self.tempar[9] = [-1, -1]
+        self.tempar[30:35, 0] = 0
+        self.tempar[[1, 2]] = 0
+        self.assertEqual(self.tempar.verify_checksums(), [])
+
+    def test_outofdate(self):
+        manifestpath = os.path.join(self.temparpath, 'checksums.json')
+        with open(manifestpath) as f:
+            oldmanifest = f.read()
+        self.tempar.append([[1, 2]])
+        with open(manifestpath, 'w') as f:
+            f.write(oldmanifest)
+        self.assertRaises(ValueError, self.tempar.verify_checksums)
+        self.tempar.update_checksums()
+        self.assertEqual(self.tempar.verify_checksums(), [])
+
+    def test_nomanifestlookup(self):
+        # writes do not look for a manifest on disk when there is none
+        with tempdirfile() as filename:
+            a = asarray(filename, self.ndarray, accessmode='r+')
+            a[0] = [1, 1]
+            with patch.object(Path, 'exists', autospec=True,
+                              side_effect=Path.exists) as exists:
+                a[1] = [1, 1]
+            self.assertEqual(exists.call_count, 0)
+            # manifest created through another object is found when
+            # truncating
+            b = Array(filename, accessmode='r+')
+            b.update_checksums(blocklen=8)
+            truncate_array(a, 40)
+            a[0] = [-1, -1]
+            b.refresh()
+            self.assertEqual(b.verify_checksums(), [])
+
+    def test_nochecksums(self):
+        dar = asarray(path=self.temparpath, array=self.ndarray,
+                      overwrite=True)
+        self.assertFalse(os.path.exists(os.path.join(self.temparpath,
+                                                     'checksums.json')))
+        self.assertRaises(OSError, dar.verify_checksums)
+
+    def test_readonly(self):
+        dar = Array(self.temparpath, accessmode='r')
+        self.assertRaises(OSError, dar.update_checksums)
+        self.assertEqual(dar.verify_checksums(), [])
+
+    def test_delete(self):
+        delete_array(self.tempar)
+        self.assertFalse(os.path.exists(self.temparpath))
+        os.mkdir(self.temparpath)  # for tearDown
+
+
+class ReadmeTxt(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempar = asarray(path=self.temparpath, array=np.zeros((4, 2)),
+                              accessmode='r+', overwrite=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def readme(self):
+        return self.tempar.datadir.read_txt('README.txt')
+
+    def test_sameasgenerated(self):
+        for array in (np.zeros((4, 2)), np.arange(5, dtype='>u2'),
+                      np.zeros((2, 3, 4), dtype='complex64')):
+            with self.subTest(shape=array.shape):
+                dar = asarray(path=self.temparpath, array=array,
+                              overwrite=True)
+                self.assertEqual(dar.datadir.read_txt('README.txt'),
+                                 darr.array._generatereadcodetxt(dar))
+                self.assertEqual(darr.array.readcodetxt(dar),
+                                 darr.array._generatereadcodetxt(dar))
+
+    def test_updatedafterappend(self):
+        self.tempar.append(np.ones((3, 2)))
+        self.assertIn('(7, 2)', self.readme())
+        self.assertEqual(self.readme(),
+                         darr.array._generatereadcodetxt(self.tempar))
+
+    def test_cachedforappends(self):
+        generatereadcodetxt = darr.array._generatereadcodetxt
+        self.tempar.append(np.ones((6, 2)))  # numbers of digits stay equal
+        with patch('darr.array._generatereadcodetxt',
+                   wraps=generatereadcodetxt) as generate:
+            for i in range(3):
+                self.tempar.append(np.ones((1, 2)))
+                self.assertEqual(self.readme(),
+                                 generatereadcodetxt(self.tempar))
+            self.assertEqual(generate.call_count, 0)
+        self.assertIn('(13, 2)', self.readme())
+
+    def test_updatedaftermetadata(self):
+        self.assertNotIn('metadata.json', self.readme())
+        self.tempar.metadata['a'] = 1
+        self.assertIn('metadata.json', self.readme())
+        del self.tempar.metadata['a']
+        self.assertNotIn('metadata.json', self.readme())
+
+    def test_notrewrittenwhenunchanged(self):
+        with patch.object(self.tempar.datadir, '_write_txt') as write:
+            self.tempar._update_readmetxt()
+            self.assertEqual(write.call_count, 0)
+            self.tempar.append(np.ones((1, 2)))
+            self.assertEqual(write.call_count, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -146,5 +146,11 @@ class TestArchiving(unittest.TestCase):
             checksums = bdd.sha256[str(bdd.path / filename)]
             self.assertEqual(checksums, filesha256(bdd.path / filename))
 
+    def test_sha256checksumsparallel(self):
+        with create_testbasedatadir() as bdd:
+            bdd._write_jsondict('test2.json', {'b': 2})
+            self.assertEqual(bdd.sha256checksums(workers=2),
+                             bdd.sha256checksums())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
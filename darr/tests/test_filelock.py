@@ -0,0 +1,188 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+
+from darr.array import Array, asarray, create_array, delete_array, \
+    truncate_array
+from darr.filelock import FileLock, fcntl
+from darr.raggedarray import RaggedArray, asraggedarray
+from darr.utils import tempdirfile
+from .test_array import DarrTestCase
+
+
+def _appendrows(path, value, n):
+    a = Array(path, accessmode='r+')
+    for i in range(n):
+        a.append([[value, i]])
+        a.metadata[f'process{value}'] = i
+
+
+@unittest.skipIf(fcntl is None, 'fcntl.flock not available')
+class FileLockTests(unittest.TestCase):
+
+    def test_reentrant(self):
+        with tempdirfile() as filename:
+            filename.mkdir()
+            lock = FileLock(filename / 'darr.lock')
+            self.assertIsNone(lock.mode)
+            with lock.acquired(shared=True) as acquired:
+                self.assertTrue(acquired)
+                self.assertEqual(lock.mode, 'shared')
+                with lock.acquired(shared=True) as acquired:
+                    self.assertFalse(acquired)
+                with lock.acquired() as acquired:  # upgrade
+                    self.assertTrue(acquired)
+                    self.assertEqual(lock.mode, 'exclusive')
+                    with lock.acquired(shared=True) as acquired:
+                        self.assertFalse(acquired)
+                        self.assertEqual(lock.mode, 'exclusive')
+                self.assertEqual(lock.mode, 'shared')
+            self.assertIsNone(lock.mode)
+            self.assertRaises(RuntimeError, lock.release)
+
+    def test_exclusion(self):
+        with tempdirfile() as filename:
+            filename.mkdir()
+            lock1 = FileLock(filename / 'darr.lock')
+            lock2 = FileLock(filename / 'darr.lock')
+            with lock1.acquired():
+                self.assertRaises(BlockingIOError, lock2.acquire,
+                                  shared=True, blocking=False)
+            with lock1.acquired(shared=True):
+                with lock2.acquired(shared=True, blocking=False):
+                    pass
+                self.assertRaises(BlockingIOError, lock2.acquire,
+                                  blocking=False)
+            with lock2.acquired(blocking=False):
+                pass
+
+    def test_generation(self):
+        with tempdirfile() as filename:
+            filename.mkdir()
+            lock1 = FileLock(filename / 'darr.lock')
+            lock2 = FileLock(filename / 'darr.lock')
+            self.assertIsNone(lock1.read_generation())  # not opened yet
+            with lock1.acquired():
+                self.assertEqual(lock1.read_generation(), 0)
+                self.assertEqual(lock1.increment_generation(), 1)
+            with lock2.acquired(shared=True):
+                self.assertEqual(lock2.read_generation(), 1)
+
+    def test_missingdirectory(self):
+        with tempdirfile() as filename:
+            lock = FileLock(filename / 'darr.lock')  # does not exist
+            with lock.acquired():
+                self.assertEqual(lock.mode, 'exclusive')
+
+
+@unittest.skipIf(fcntl is None, 'fcntl.flock not available')
+class ArrayLocking(DarrTestCase):
+
+    def test_lockedarray(self):
+        with tempdirfile() as filename:
+            a = asarray(filename, [[0, 0]], accessmode='r+')
+            b = Array(filename, accessmode='r+')
+            with a.locked():
+                self.assertRaises(BlockingIOError, b._lock.acquire,
+                                  blocking=False)
+                a.append([[1, 1]])  # reentrant
+            with a.locked(shared=True):
+                with b.locked(shared=True):
+                    self.assertEqual(len(b), 2)
+
+    def test_stalewriters(self):
+        # writers bring themselves up to date before changing the array
+        with tempdirfile() as filename:
+            a = asarray(filename, [[0, 0]], accessmode='r+')
+            b = Array(filename, accessmode='r+')
+            a.append([[1, 1]])
+            b.append([[2, 2]])
+            a.iterappend([[[3, 3]], [[4, 4]]])
+            with b.appender() as ap:
+                ap.write([[5, 5]])
+            a[0] = [6, 6]
+            truncate_array(b, -1)
+            a.append([[7, 7]])
+            self.assertArrayIdentical(
+                Array(filename)[:, 0], np.array([6, 1, 2, 3, 4, 7]))
+            b.refresh()
+            self.assertEqual(len(b), 6)
+
+    def test_deferredupdates(self):
+        with tempdirfile() as filename:
+            a = create_array(filename, shape=(0,), dtype='int64',
+                             accessmode='r+')
+            b = Array(filename, accessmode='r+')
+            with a.deferred_updates():
+                a.append([1])
+                with b.deferred_updates():
+                    b.append([2])
+                a.append([3])
+            self.assertArrayIdentical(Array(filename)[:],
+                                      np.array([1, 2, 3]))
+            d = a._datadir.read_jsondict(a._arraydescrfilename)
+            self.assertNotIn(Array._updatependingkey, d)
+
+    def test_metadata(self):
+        with tempdirfile() as filename:
+            a = create_array(filename, shape=(2,), accessmode='r+')
+            b = Array(filename, accessmode='r+')
+            with a.metadata.batch():
+                a.metadata['a'] = 1
+                self.assertRaises(BlockingIOError, b._lock.acquire,
+                                  blocking=False)
+            b.metadata['b'] = 2
+            self.assertEqual(dict(a.metadata.items()), {'a': 1, 'b': 2})
+
+    def test_delete(self):
+        with tempdirfile() as filename:
+            a = asarray(filename, [0], accessmode='r+')
+            a.append([1])
+            self.assertTrue((filename / 'darr.lock').exists())
+            delete_array(a)
+            self.assertFalse(filename.exists())
+
+    def test_processes(self):
+        nprocesses, nrows = 3, 20
+        with tempdirfile() as filename:
+            create_array(filename, shape=(0, 2), dtype='int64')
+            processes = [multiprocessing.Process(target=_appendrows,
+                                                 args=(filename, i, nrows))
+                         for i in range(nprocesses)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+            self.assertEqual([p.exitcode for p in processes],
+                             [0] * nprocesses)
+            a = Array(filename)
+            self.assertEqual(a.shape, (nprocesses * nrows, 2))
+            for i in range(nprocesses):
+                rows = a[a[:, 0] == i]
+                self.assertArrayIdentical(rows[:, 1], np.arange(nrows))
+                self.assertEqual(a.metadata[f'process{i}'], nrows - 1)
+
+
+@unittest.skipIf(fcntl is None, 'fcntl.flock not available')
+class RaggedArrayLocking(DarrTestCase):
+
+    def test_stalewriters(self):
+        with tempdirfile() as filename:
+            ra = asraggedarray(filename, [[1], [2, 3]], accessmode='r+')
+            rb = RaggedArray(filename, accessmode='r+')
+            ra.append([4, 5, 6])
+            rb.iterappend([[7], [8, 9]])
+            ra.append([10])
+            rc = RaggedArray(filename)
+            self.assertEqual(len(rc), 6)
+            np.testing.assert_array_equal(rc[3], [7])
+            np.testing.assert_array_equal(rc[-1], [10])
+            with ra.locked():
+                for a in (rb._lock, rb._values._lock, rb._indices._lock):
+                    self.assertRaises(BlockingIOError, a.acquire,
+                                      blocking=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
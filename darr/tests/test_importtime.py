@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from pathlib import Path
+
+import darr
+
+
+def _rundarrimport(code='import darr'):
+    """Import darr in a new Python process and return that process."""
+    env = dict(os.environ)
+    # the darr that is being tested
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(Path(darr.__file__).parent.parent)] +
+        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    return subprocess.run([sys.executable, '-c', code], env=env,
+                          capture_output=True, text=True, check=True)
+
+
+class ImportTime(unittest.TestCase):
+
+    # modules that are only needed for rarely used functionality, and that
+    # should not be imported by 'import darr', as they are slow to import
+    # or, in the case of versioneer, run git. Import times themselves are
+    # timed by benchmarks/bench_importtime.py, as they depend on the machine.
+    lazymodules = ('darr.tests', 'darr.archive', 'darr.aio', 'darr._version',
+                   'asyncio', 'concurrent.futures.process', 'multiprocessing',
+                   'packaging', 'subprocess', 'tarfile', 'unittest')
+
+    def test_lazymodules(self):
+        code = f"import darr, sys; " \
+               f"print(','.join(m for m in {self.lazymodules} " \
+               f"if m in sys.modules))"
+        imported = _rundarrimport(code=code).stdout.strip()
+        self.assertEqual(imported, '')
+
+    def test_lazyattributes(self):
+        code = "import darr; print(darr.__version__); " \
+               "print(callable(darr.extract_archive), callable(darr.test), " \
+               "callable(darr.aio.AsyncArray))"
+        lines = _rundarrimport(code=code).stdout.splitlines()
+        self.assertEqual(lines[0], darr.__version__)
+        self.assertEqual(lines[1], 'True True True')
+        self.assertRaises(AttributeError, getattr, darr, 'nonexisting')
+
+
+if __name__ == '__main__':
+    unittest.main()
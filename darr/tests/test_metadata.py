@@ -1,7 +1,13 @@
+import json
 import tempfile
 import shutil
 import unittest
+import numpy as np
 
+from unittest.mock import patch
+
+import darr.metadata
+from darr.utils import write_jsonfile
 from .test_array import DarrTestCase, create_array
 
 class MetaData(DarrTestCase):
@@ -85,5 +91,91 @@ class MetaData(DarrTestCase):
         self.assertTrue('fs' in self.tempar.metadata)
         self.assertFalse('a' in self.tempar.metadata)
 
+
+class CachedMetaData(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = tempfile.mkdtemp()
+        self.tempar = create_array(path=self.temparpath, shape=(12,),
+                                   dtype='int64', metadata={'fs': 20000},
+                                   accessmode='r+', overwrite=True)
+        self.metadata = self.tempar.metadata
+
+    def tearDown(self):
+        shutil.rmtree(str(self.temparpath))
+
+    def test_readsfileonce(self):
+        self.metadata['fs']
+        with patch('darr.metadata.json.load', side_effect=json.load) as load:
+            for i in range(10):
+                self.assertEqual(self.metadata['fs'], 20000)
+                self.assertIn('fs', self.metadata)
+                self.assertEqual(len(self.metadata), 1)
+        self.assertEqual(load.call_count, 0)
+
+    def test_nocache(self):
+        md = darr.metadata.MetaData(self.metadata.path, cache=False)
+        with patch('darr.metadata.json.load', side_effect=json.load) as load:
+            for i in range(3):
+                self.assertEqual(md['fs'], 20000)
+        self.assertEqual(load.call_count, 3)
+
+    def test_externalchange(self):
+        self.assertEqual(self.metadata['fs'], 20000)
+        other = darr.metadata.MetaData(self.metadata.path, accessmode='r+')
+        other['fs'] = 30000
+        self.assertEqual(self.metadata['fs'], 30000)
+        other.pop('fs')
+        self.assertNotIn('fs', self.metadata)
+
+    def test_mutablevalue(self):
+        self.metadata['a'] = [1, 2]
+        self.metadata['a'].append(3)
+        self.assertEqual(self.metadata['a'], [1, 2])
+
+    def test_numpyvalue(self):
+        self.metadata['a'] = np.arange(3)
+        self.assertEqual(self.metadata['a'], [0, 1, 2])
+
+    def test_batch(self):
+        with patch('darr.metadata.write_jsonfile',
+                   side_effect=write_jsonfile) as write:
+            with self.metadata.batch():
+                self.metadata['a'] = 1
+                self.metadata.update(b=2, c=3)
+                del self.metadata['fs']
+                self.assertEqual(self.metadata['a'], 1)
+                self.assertNotIn('fs', self.metadata)
+                with self.metadata.batch():  # nested
+                    self.metadata['d'] = 4
+                self.assertEqual(write.call_count, 0)
+        self.assertEqual(write.call_count, 1)
+        md = darr.metadata.MetaData(self.metadata.path)
+        self.assertDictEqual(dict(md), {'a': 1, 'b': 2, 'c': 3, 'd': 4})
+
+    def test_batchexception(self):
+        with self.assertRaises(KeyError):
+            with self.metadata.batch():
+                self.metadata['a'] = 1
+                del self.metadata['b']
+        self.assertDictEqual(dict(self.metadata), {'fs': 20000})
+
+    def test_batchreadonly(self):
+        self.metadata.accessmode = 'r'
+        with self.assertRaises(OSError):
+            with self.metadata.batch():
+                pass
+
+    def test_batchdeleteall(self):
+        with self.metadata.batch():
+            self.metadata.pop('fs')
+        self.assertFalse(self.metadata.path.exists())
+        self.assertNotIn('metadata.json',
+                         self.tempar.datadir.read_txt('README.txt'))
+        with self.metadata.batch():
+            self.metadata['a'] = 1
+        self.assertIn('metadata.json',
+                      self.tempar.datadir.read_txt('README.txt'))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
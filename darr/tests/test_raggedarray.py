@@ -5,8 +5,11 @@ import tempfile
 import darr
 from numpy.testing import assert_equal, assert_array_equal
 from pathlib import Path
+from unittest.mock import patch
+from darr.array import AppendDataError
 from darr.raggedarray import create_raggedarray, asraggedarray, \
-    delete_raggedarray, truncate_raggedarray, RaggedArray, create_datadir
+    delete_raggedarray, truncate_raggedarray, RaggedArray, create_datadir, \
+    Array
 from darr.readcoderaggedarray import readcode
 
 from darr.utils import tempdirfile
@@ -118,6 +121,66 @@ class RaggedArrayIndexing(DarrTestCase):
         self.assertArrayIdentical(ars[1], self.input[1])
 
 
+class RaggedArrayMultiIndexing(DarrTestCase):
+
+    def setUp(self):
+        self.temparpath = Path(tempfile.mkdtemp()) / 'testra.ra'
+        self.input = [np.arange(i * 2, dtype='int32').reshape(i, 2)
+                      for i in (3, 0, 1, 4, 2)]
+        self.tempar = asraggedarray(self.temparpath, self.input)
+
+    def tearDown(self):
+        delete_raggedarray(self.tempar)
+
+    def assertSubarraysIdentical(self, subarrays, indices):
+        self.assertIsInstance(subarrays, list)
+        self.assertEqual(len(subarrays), len(indices))
+        for sa, i in zip(subarrays, indices):
+            self.assertArrayIdentical(sa, self.input[i])
+
+    def test_slice(self):
+        self.assertSubarraysIdentical(self.tempar[:], range(5))
+        self.assertSubarraysIdentical(self.tempar[1:4], range(1, 4))
+        self.assertSubarraysIdentical(self.tempar[::2], (0, 2, 4))
+        self.assertSubarraysIdentical(self.tempar[::-1], (4, 3, 2, 1, 0))
+        self.assertSubarraysIdentical(self.tempar[3:1], ())
+
+    def test_intsequence(self):
+        self.assertSubarraysIdentical(self.tempar[[3, 0, 3, -1]],
+                                      (3, 0, 3, 4))
+        self.assertSubarraysIdentical(self.tempar[np.array([1, 2, 3])],
+                                      (1, 2, 3))
+        self.assertSubarraysIdentical(self.tempar[[]], ())
+
+    def test_booleanmask(self):
+        mask = np.array([True, False, False, True, True])
+        self.assertSubarraysIdentical(self.tempar[mask], (0, 3, 4))
+
+    def test_subarraysindependent(self):
+        sa = self.tempar[2:4]
+        sa[0][:] = 99
+        self.assertArrayIdentical(sa[1], self.input[3])
+
+    def test_toohighindex(self):
+        self.assertRaises(IndexError, self.tempar.__getitem__, [1, 5])
+
+    def test_nonvalidindex(self):
+        self.assertRaises(TypeError, self.tempar.__getitem__, [1.0, 2.0])
+        self.assertRaises(TypeError, self.tempar.__getitem__, [[1, 2]])
+        self.assertRaises(TypeError, self.tempar.__getitem__, (1, 2))
+
+    def test_iterarraysprefetch(self):
+        for prefetch in (None, 1, 3):
+            with self.subTest(prefetch=prefetch):
+                subarrays = list(self.tempar.iter_arrays(startindex=1,
+                                                         prefetch=prefetch))
+                self.assertEqual(len(subarrays), 4)
+                for sa, i in zip(subarrays, range(1, 5)):
+                    self.assertArrayIdentical(sa, self.input[i])
+                    # copies, not views of the memory map
+                    self.assertTrue(sa.flags.owndata)
+
+
 
 # FIXME not complete
 class RaggedArrayAttrs(unittest.TestCase):
@@ -154,6 +217,92 @@ class IterAppendRaggedArray(unittest.TestCase):
             self.assertEqual(len(dal), 3)
 
 
+class BatchedIterAppend(DarrTestCase):
+
+    def setUp(self):
+        self.input = [np.arange(i, dtype='int16') for i in (3, 0, 1, 4, 2)]
+
+    def test_batchlen(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int16')
+            for batchlen in (1, 2, 5, 6):
+                with self.subTest(batchlen=batchlen):
+                    ra.iterappend(self.input, batchlen=batchlen)
+                    for sa, a in zip(ra[-5:], self.input):
+                        self.assertArrayIdentical(sa, a)
+            self.assertEqual(len(ra), 20)
+            assert_array_equal(ra._indices[:5],
+                               [[0, 3], [3, 3], [3, 4], [4, 8], [8, 10]])
+            self.assertEqual(RaggedArray(filename).size, 40)
+
+    def test_2datom(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(2,), dtype='int16')
+            ra.iterappend([np.ones((i, 2)) for i in range(4)], batchlen=3)
+            self.assertEqual(len(ra), 4)
+            self.assertArrayIdentical(ra[3], np.ones((3, 2), dtype='int16'))
+
+    def test_iterablefails(self):
+        def gen():
+            yield from self.input
+            raise ValueError
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int16')
+            with self.assertRaises(AppendDataError) as cm:
+                ra.iterappend(gen(), batchlen=2)
+            self.assertIsInstance(cm.exception.__cause__, ValueError)
+            self.assertEqual(len(ra), 5)
+            ra = RaggedArray(filename)
+            self.assertEqual(len(ra), 5)
+            self.assertArrayIdentical(ra[3], self.input[3])
+
+    def test_wrongatom(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(2,), dtype='int16')
+            self.assertRaises(AppendDataError, ra.iterappend,
+                              [np.ones((2, 2)), np.ones((2, 3))])
+            self.assertEqual(len(RaggedArray(filename)), 1)
+
+    def test_scalar(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int16')
+            self.assertRaises(AppendDataError, ra.append, 5)
+            self.assertRaises(AppendDataError, ra.iterappend, [[1, 2], 5])
+            self.assertEqual(len(RaggedArray(filename)), 1)
+
+    def test_indextypeoverflow(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int16',
+                                    indextype='int8')
+            self.assertRaises(AppendDataError, ra.iterappend,
+                              [np.ones(100), np.ones(100)])
+            self.assertEqual(len(RaggedArray(filename)), 0)
+
+    def test_batchpartiallywritten(self):
+        # values of a batch were written, but its indices not
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int16')
+            ra.iterappend(self.input[:2])
+            with patch.object(ra._indices, '_append', side_effect=OSError):
+                self.assertRaises(AppendDataError, ra.iterappend,
+                                  self.input[2:], batchlen=2)
+            for r in (ra, RaggedArray(filename)):
+                self.assertEqual(len(r), 2)
+                self.assertEqual(r._values.shape[0],
+                                 sum(len(a) for a in self.input[:2]))
+            ra.append([1, 2])
+            self.assertArrayIdentical(RaggedArray(filename)[2],
+                                      np.array([1, 2], dtype='int16'))
+
+    def test_readonly(self):
+        with tempdirfile() as filename:
+            create_raggedarray(filename, atom=(), dtype='int16')
+            ra = RaggedArray(filename)
+            self.assertRaises(OSError, ra.iterappend, [[1, 2]])
+            ra = RaggedArray(filename, accessmode='r+')
+            self.assertRaises(TypeError, ra.iterappend, 5)
+
+
 class ClassAsRaggedArray(unittest.TestCase):
 
     def test_1darray(self):
@@ -178,6 +327,40 @@ class ClassCopyRaggedArray(unittest.TestCase):
                 assert_array_equal(dal1[0], dal2[0])
                 self.assertEqual(dal1.dtype, dal2.dtype)
 
+    def test_copy2d(self):
+        with tempdirfile() as filename1, tempdirfile() as filename2:
+            input = [np.ones((i, 3), dtype='int32') * i for i in range(5)]
+            md = {'fs': 20000}
+            dal1 = asraggedarray(filename1, input, metadata=md,
+                                 indextype='int32')
+            dal2 = dal1.copy(path=filename2, accessmode='r+')
+            self.assertEqual(dal2.accessmode, 'r+')
+            self.assertEqual(len(dal2), 5)
+            self.assertEqual(dal2.atom, (3,))
+            self.assertEqual(dal2._indices.dtype, np.int32)
+            self.assertDictEqual(dict(dal2.metadata), md)
+            for sa1, sa2 in zip(dal1[:], dal2[:]):
+                assert_array_equal(sa1, sa2)
+            self.assertEqual(dal1._datadir.read_txt('README.txt'),
+                             dal2._datadir.read_txt('README.txt'))
+
+    def test_copydtype(self):
+        with tempdirfile() as filename1, tempdirfile() as filename2:
+            input = [np.arange(i, dtype='int32') for i in range(5)]
+            dal1 = asraggedarray(filename1, input)
+            dal2 = dal1.copy(path=filename2, dtype='float64', chunklen=3)
+            self.assertEqual(dal2.dtype, np.float64)
+            self.assertEqual(dal2._arrayinfo['numtype'], 'float64')
+            for sa1, sa2 in zip(input, dal2[:]):
+                assert_array_equal(sa1, sa2)
+            self.assertEqual(RaggedArray(filename2).dtype, np.float64)
+
+    def test_copytosamepath(self):
+        with tempdirfile() as filename:
+            dal = create_raggedarray(filename, atom=(), dtype='float64')
+            self.assertRaises(ValueError, dal.copy, path=filename,
+                              overwrite=True)
+
 
 class DeleteRaggedArray(unittest.TestCase):
 
@@ -280,9 +463,95 @@ class TestReadCodeArray(DarrTestCase):
             self.assertIsInstance(ra.readcodelanguages, tuple)
             self.assertIn('numpymemmap', ra.readcodelanguages)
 
+    def test_readcodetxtcachedforappends(self):
+        generate = darr.raggedarray._generatereadcodetxtsection
+        with tempdirfile() as filename:
+            ra = asraggedarray(path=filename,
+                               arrayiterable=[[0, 1, 2]] * 20,
+                               dtype='float64', accessmode='r+')
+            with patch('darr.raggedarray._generatereadcodetxtsection',
+                       wraps=generate) as generatepatched:
+                for i in range(3):
+                    ra.append([0, 1, 2, 3])
+                    self.assertEqual(ra._datadir.read_txt('README.txt'),
+                                     darr.raggedarray.readmetxt(ra) +
+                                     generate(ra))
+                self.assertEqual(generatepatched.call_count, 0)
+
 
 
 # this is already tested with simple Arrays, so a brief check will suffice
+class DeferredUpdates(DarrTestCase):
+
+    def test_deferredappend(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int64')
+            with ra.deferred_updates():
+                ra.append([1, 2])
+                ra.iterappend([[3], [4, 5, 6]])
+                self.assertEqual(len(ra), 3)
+                d = ra._datadir.read_jsondict(ra._arraydescrfilename)
+                self.assertEqual(d['len'], 0)
+            d = ra._datadir.read_jsondict(ra._arraydescrfilename)
+            self.assertEqual(d['len'], 3)
+            self.assertEqual(d['size'], 6)
+            ra = RaggedArray(filename)
+            assert_array_equal(ra[2], [4, 5, 6])
+            self.assertIn('sequence of 3 subarrays',
+                          ra._datadir.read_txt('README.txt'))
+
+    def test_recover(self):
+        with tempdirfile() as filename:
+            ra = create_raggedarray(filename, atom=(), dtype='int64')
+            # simulate a process that crashed within the deferred_updates
+            # context, after writing values that were not indexed yet
+            for a, data in ((ra._values, [1, 2, 3, 4, 5]),
+                            (ra._indices, [[0, 2], [2, 3]])):
+                a._update_arrayinfo({Array._updatependingkey: True})
+                with open(a._datapath, 'ab') as f:
+                    np.array(data, dtype='int64').tofile(f)
+            with self.assertWarns(UserWarning):
+                ra = RaggedArray(filename, accessmode='r+')
+            self.assertEqual(len(ra), 2)
+            self.assertEqual(len(ra._values), 3)
+            assert_array_equal(ra[1], [3])
+            d = ra._datadir.read_jsondict(ra._arraydescrfilename)
+            self.assertEqual(d['len'], 2)
+
+
+
+class SWMR(DarrTestCase):
+
+    def test_refresh(self):
+        with tempdirfile() as filename:
+            writer = asraggedarray(filename, [[1, 2], [3]], accessmode='r+')
+            reader = RaggedArray(filename, swmr=True)
+            self.assertEqual(reader.refresh(), 0)
+            writer.iterappend([[4, 5, 6], [7]])
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(reader.refresh(), 2)
+            self.assertEqual(len(reader), 4)
+            assert_array_equal(reader[2], [4, 5, 6])
+            with writer.deferred_updates():
+                writer.append([8, 9])
+                self.assertEqual(reader.refresh(), 1)
+                assert_array_equal(reader[-1], [8, 9])
+
+
+class Checksums(DarrTestCase):
+
+    def test_appendandverify(self):
+        with tempdirfile() as filename:
+            ra = asraggedarray(filename, [[1, 2], [3], [4, 5, 6]])
+            ra.update_checksums(workers=2)
+            ra.iterappend([[7], [8, 9]])
+            self.assertEqual(ra.verify_checksums(workers=2),
+                             {'values': [], 'indices': []})
+            with open(ra._values._datapath, 'r+b') as f:
+                f.write(b'x')
+            self.assertEqual(ra.verify_checksums()['values'], [(0, 9)])
+
+
 class MetaData(unittest.TestCase):
 
     def test_createwithmetadata(self):
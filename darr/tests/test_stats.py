@@ -0,0 +1,89 @@
+import unittest
+
+from darr import stats
+from darr.utils import tempdirfile
+from .test_array import DarrTestCase, create_array
+
+
+class Stats(DarrTestCase):
+
+    def tearDown(self):
+        stats.disable()
+        stats.reset()
+
+    def test_disabledbydefault(self):
+        self.assertFalse(stats.isenabled())
+        with tempdirfile() as filename:
+            a = create_array(filename, shape=(0,), dtype='int64',
+                             accessmode='r+')
+            a.append([1, 2])
+        self.assertDictEqual(stats.get_stats(), {})
+
+    def test_recording(self):
+        with tempdirfile() as filename:
+            a = create_array(filename, shape=(0, 2), dtype='int64',
+                             accessmode='r+')
+            with stats.recording():
+                self.assertTrue(stats.isenabled())
+                a.append([[1, 2], [3, 4]])
+                a.append([[5, 6]])
+                a[1:]
+                a.metadata['x'] = 1
+                a.metadata['x']
+            self.assertFalse(stats.isenabled())
+            a.append([[7, 8]])  # not recorded
+        s = stats.get_stats()
+        self.assertEqual(s['array.append']['count'], 2)
+        self.assertEqual(s['array.append']['nbytes'], 48)
+        self.assertEqual(s['array.read']['nbytes'], 32)
+        self.assertGreaterEqual(s['array.update_len']['count'], 2)
+        self.assertEqual(s['metadata.read']['count'], 1)
+        self.assertGreaterEqual(s['array.open']['count'], 3)
+        self.assertGreaterEqual(s['json.write']['count'], 3)
+        self.assertGreaterEqual(s['datadir.write_txt']['count'], 2)
+        for opstats in s.values():
+            self.assertEqual(sum(opstats['histogram'].values()),
+                             opstats['count'])
+            self.assertLessEqual(opstats['maxtime'], opstats['totaltime'])
+        self.assertIn('array.append', stats.report())
+
+    def test_appender(self):
+        with tempdirfile() as filename:
+            a = create_array(filename, shape=(0,), dtype='int32',
+                             accessmode='r+')
+            with stats.recording(), a.appender(buffersize=10) as ap:
+                for i in range(25):
+                    ap.write([i])
+        s = stats.get_stats()['array.append']
+        self.assertEqual(s['count'], 3)
+        self.assertEqual(s['nbytes'], 100)
+
+    def test_reset(self):
+        with tempdirfile() as filename:
+            with stats.recording():
+                create_array(filename, shape=(2,))
+            self.assertNotEqual(stats.get_stats(), {})
+            with stats.recording():
+                pass
+            self.assertDictEqual(stats.get_stats(), {})
+
+    def test_hook(self):
+        events = []
+        hook = lambda *args: events.append(args)
+        stats.add_hook(hook)
+        try:
+            with tempdirfile() as filename:
+                a = create_array(filename, shape=(2,), dtype='int8')
+                with stats.recording():
+                    a[:]
+        finally:
+            stats.remove_hook(hook)
+        operations = [e[0] for e in events]
+        self.assertIn('array.read', operations)
+        readevent = events[operations.index('array.read')]
+        self.assertEqual(readevent[2], 2)
+        self.assertGreaterEqual(readevent[1], 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import numpy as np
 import shutil
 from pathlib import Path
 from darr.utils import fit_frames, write_jsonfile, product
-from darr.utils import tempdir, tempdirfile
+from darr.utils import tempdir, tempdirfile, prefetching
 
 
 class Product(unittest.TestCase):
@@ -176,5 +176,37 @@ class CreateTempDirFile(unittest.TestCase):
         shutil.rmtree(td.parent)
 
 
+class Prefetching(unittest.TestCase):
+
+    def test_items(self):
+        for prefetch in (1, 2, 100):
+            with self.subTest(prefetch=prefetch):
+                self.assertEqual(list(prefetching(range(10), prefetch)),
+                                 list(range(10)))
+        self.assertEqual(list(prefetching([], 2)), [])
+
+    def test_exception(self):
+        def items():
+            yield 1
+            raise KeyError('test')
+        it = prefetching(items(), 2)
+        self.assertEqual(next(it), 1)
+        self.assertRaises(KeyError, next, it)
+
+    def test_close(self):
+        produced = []
+        def items():
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        it = prefetching(items(), 2)
+        self.assertEqual(next(it), 0)
+        it.close()
+        self.assertLess(len(produced), 10)
+
+    def test_wrongprefetch(self):
+        self.assertRaises(ValueError, next, prefetching(range(2), 0))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,14 +1,20 @@
 import hashlib
+import mmap
+import os
 import textwrap
 import json
 import numpy as np
 from pathlib import Path
-from functools import reduce
+from functools import lru_cache, reduce
 from operator import mul
+import queue
 import shutil
 import tempfile as tf
+import threading
 from contextlib import contextmanager
 
+from . import stats
+
 # believe it or not Python <3.8 does not have such a function
 # and numpy.product returns int32 by default (!) causing disaster
 # when calculating the size of large files
@@ -16,6 +22,25 @@ def product(iterable):
     return reduce(mul, iterable, 1)
 
 
+@lru_cache(maxsize=None)
+def darrversion():
+    """Returns the version of Darr. It is determined only once per process,
+    as this involves running git when Darr is used from a source tree."""
+    from ._version import get_versions
+    return get_versions()['version']
+
+
+# access pattern hints for data files (see `madvise` and `fadvise`)
+accesshints = ('normal', 'sequential', 'random', 'willneed', 'dontneed')
+
+
+def check_access(access):
+    if (access is not None) and (access not in accesshints):
+        raise ValueError(f"'access' should be None or one of {accesshints}, "
+                         f"not '{access}'")
+    return access
+
+
 def check_accessmode(accessmode, validmodes=('r', 'r+'), makebinary=False):
     if accessmode not in validmodes:
         raise ValueError(f"Mode should be one of {validmodes}, not "
@@ -48,8 +73,12 @@ class DDJSONEncoder(json.JSONEncoder):
 
 
 def write_jsonfile(path, data, sort_keys=True, indent=4, ensure_ascii=True,
-                   skipkeys=False, cls=None, overwrite=False):
+                   skipkeys=False, cls=None, overwrite=False, atomic=False):
+    """Write data to a JSON file. If `atomic`, the data is written to a
+    temporary file first, which then replaces `path`, so that readers never
+    see a partially written file."""
     path = Path(path)
+    starttime = stats.starttimer()
     if cls is None:
         cls = DDJSONEncoder
     if path.exists() and not overwrite:
@@ -65,9 +94,23 @@ def write_jsonfile(path, data, sort_keys=True, indent=4, ensure_ascii=True,
             f"and dictionaries as objects."
         raise TypeError(s)
     else:
-        # utf-8 is ascii compatible
-        with open(path, 'w', encoding='utf-8') as fp:
-            fp.write(json_string)
+        if atomic:
+            # not a tempfile.mkstemp file, which would not get the default
+            # permissions
+            temppath = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+            try:
+                with open(temppath, 'w', encoding='utf-8') as fp:
+                    fp.write(json_string)
+                os.replace(temppath, path)
+            except BaseException:
+                if temppath.exists():
+                    temppath.unlink()
+                raise
+        else:
+            # utf-8 is ascii compatible
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write(json_string)
+        stats.record('json.write', starttime, nbytes=len(json_string))
 
 
 def fit_frames(totallen, chunklen, steplen=None):
@@ -107,6 +150,17 @@ def fit_frames(totallen, chunklen, steplen=None):
     remainder = totallen - newsize
     return nchunks, newsize, remainder
 
+def filestat(path):
+    """Returns the properties of a file that show whether it changed (its
+    modification time, size and inode number), or None if it does not
+    exist. Files that are replaced atomically get a new inode number."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
 def filesha256(filepath, blocksize=2 ** 20):
     """Compute the checksum of a file."""
     m = hashlib.sha256()
@@ -118,6 +172,110 @@ def filesha256(filepath, blocksize=2 ** 20):
             m.update(buf)
     return m.hexdigest()
 
+def prefetching(iterable, prefetch):
+    """Iterate over `iterable` in a background thread, which runs up to
+    `prefetch` items ahead of the consumer, so that producing items (e.g.
+    reading them from disk) overlaps with processing them. Exceptions are
+    raised in the consumer. The thread is stopped when the generator is
+    closed."""
+    if prefetch < 1:
+        raise ValueError(f"'prefetch' should be at least 1 ({prefetch})")
+    items = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as exception:
+            put((end, exception))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, exception = items.get()
+            if exception is not None:
+                raise exception
+            if item is end:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def readahead(fd, offset, length, buffer):
+    """Read a byte range of an open file into `buffer`, piece by piece,
+    only so that it is in the page cache when it is accessed through a
+    memory map. Where positional reads are not available, the operating
+    system is advised that the range will be needed instead."""
+    if length <= 0:
+        return
+    if not hasattr(os, 'preadv'):
+        fadvise(fd, offset, length, 'WILLNEED')
+        return
+    end = offset + length
+    while offset < end:
+        view = memoryview(buffer)[:end - offset]
+        nread = os.preadv(fd.fileno(), [view], offset)
+        if nread == 0:  # end of file
+            return
+        offset += nread
+
+
+def madvise(mm, advice, offset=0, length=None):
+    """Advise the operating system about how a byte range of a memory map
+    will be accessed, if the platform supports it (see `mmap.madvise`).
+    `advice` is the name of the advice without prefix, e.g. 'SEQUENTIAL'.
+    The range is extended to start at a page boundary. Does nothing on
+    other platforms, or if `mm` is None."""
+    advice = getattr(mmap, f'MADV_{advice}', None)
+    if (mm is None) or (advice is None) or mm.closed:
+        return
+    start = offset - offset % mmap.PAGESIZE
+    if length is None:
+        length = len(mm) - start
+    else:
+        length = min(length + offset - start, len(mm) - start)
+    if length <= 0:
+        return
+    try:
+        mm.madvise(advice, start, length)
+    except (OSError, ValueError):
+        pass
+
+
+def fadvise(fd, offset, length, advice):
+    """Advise the operating system about how a byte range of an open file
+    will be accessed, if the platform supports it (see
+    `os.posix_fadvise`). `advice` is the name of the advice without prefix,
+    e.g. 'WILLNEED'. A `length` of 0 means up to the end of the file. Does
+    nothing on other platforms."""
+    advice = getattr(os, f'POSIX_FADV_{advice}', None)
+    if (advice is None) or (fd is None) or fd.closed or (length < 0):
+        return
+    try:
+        os.posix_fadvise(fd.fileno(), offset, length, advice)
+    except OSError:  # e.g. file systems that do not support it
+        pass
+
+
+# README texts are generated often and consist largely of the same
+# paragraphs, which are slow to wrap
+@lru_cache(maxsize=1024)
 def wrap(s):
     return textwrap.fill(s, width=78, replace_whitespace=False)
 